@@ -1,9 +1,9 @@
 from importlib.metadata import entry_points
 
 from .brain import Brain
-from .processor.registry import register_processor, registry
+from .processor.registry import register_processor, registry, warmup
 
-__all__ = ["Brain", "registry", "register_processor"]
+__all__ = ["Brain", "registry", "register_processor", "warmup"]
 
 
 def register_entries():
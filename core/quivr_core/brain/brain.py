@@ -26,17 +26,40 @@ from quivr_core.brain.serialization import (
 )
 from quivr_core.rag.entities.chat import ChatHistory
 from quivr_core.rag.entities.config import RetrievalConfig
-from quivr_core.files.file import load_qfile
+from quivr_core.embeddings.cache import CachedEmbeddings
+from quivr_core.embeddings.scheduler import EmbeddingSchedulerConfig
+from quivr_core.ingestion.checkpoint import IngestionCheckpoint
+from quivr_core.ingestion.metrics import IngestionMetrics, ProgressCallback
+from quivr_core.ingestion.pipeline import (
+    FileIngestionResult,
+    IngestionPipeline,
+    PipelineConfig,
+)
+from quivr_core.ingestion.sync import DirectorySyncResult, diff_directory
 from quivr_core.llm import LLMEndpoint
 from quivr_core.rag.entities.models import (
     ParsedRAGChunkResponse,
     QuivrKnowledge,
     SearchResult,
 )
+from quivr_core.processor.parse_cache import ParseCache
+from quivr_core.processor.pool import ProcessorPool
 from quivr_core.processor.registry import get_processor_class
 from quivr_core.rag.quivr_rag_langgraph import QuivrQARAGLangGraph
 from quivr_core.storage.local_storage import LocalStorage, TransparentStorage
 from quivr_core.storage.storage_base import StorageBase
+from quivr_core.vectorstore.bm25 import BM25Index
+from quivr_core.vectorstore.index import (
+    VectorIndexConfig,
+    adelete_chunks,
+    is_faiss,
+    set_search_params,
+    with_search_params,
+)
+from quivr_core.vectorstore.metadata_index import (
+    MetadataIndex,
+    filtered_similarity_search,
+)
 
 from .brain_defaults import build_default_vectordb, default_embedder, default_llm
 
@@ -61,29 +84,64 @@ async def process_files(
     """
 
     knowledge = []
-    for file in await storage.get_files():
-        try:
-            if file.file_extension:
-                processor_cls = get_processor_class(file.file_extension)
-                logger.debug(f"processing {file} using class {processor_cls.__name__}")
-                processor = processor_cls(**processor_kwargs)
-                docs = await processor.process_file(file)
-                knowledge.extend(docs)
-            else:
-                logger.error(f"can't find processor for {file}")
+    async with ProcessorPool() as pool:
+        for file in await storage.get_files():
+            try:
+                if file.file_extension:
+                    processor_cls = get_processor_class(file.file_extension)
+                    logger.debug(
+                        f"processing {file} using class {processor_cls.__name__}"
+                    )
+                    processor = pool.get(processor_cls, **processor_kwargs)
+                    docs = await processor.process_file(file)
+                    knowledge.extend(docs)
+                else:
+                    logger.error(f"can't find processor for {file}")
+                    if skip_file_error:
+                        continue
+                    else:
+                        raise ValueError(
+                            f"can't parse {file}. can't find file extension"
+                        )
+            except KeyError as e:
                 if skip_file_error:
                     continue
                 else:
-                    raise ValueError(f"can't parse {file}. can't find file extension")
-        except KeyError as e:
-            if skip_file_error:
-                continue
-            else:
-                raise Exception(f"Can't parse {file}. No available processor") from e
+                    raise Exception(
+                        f"Can't parse {file}. No available processor"
+                    ) from e
 
     return knowledge
 
 
+def _index_file_chunks(vector_db: VectorStore | None) -> dict[UUID, list[str]]:
+    """Map each file id to the ids of its chunks, from the `qfile_id` chunk metadata."""
+    file_chunk_ids: dict[UUID, list[str]] = {}
+    if vector_db is None:
+        return file_chunk_ids
+    try:
+        from langchain_community.vectorstores import FAISS
+    except ImportError:
+        return file_chunk_ids
+    if not isinstance(vector_db, FAISS):
+        return file_chunk_ids
+
+    from quivr_core.vectorstore import PagedDocstore
+
+    if isinstance(vector_db.docstore, PagedDocstore):
+        # Read from the chunk index, without decoding the chunks
+        return vector_db.docstore.file_chunk_ids()
+
+    for chunk_id in vector_db.index_to_docstore_id.values():
+        doc = vector_db.docstore.search(chunk_id)
+        if isinstance(doc, Document) and "qfile_id" in doc.metadata:
+            file_id = doc.metadata["qfile_id"]
+            if not isinstance(file_id, UUID):
+                file_id = UUID(str(file_id))
+            file_chunk_ids.setdefault(file_id, []).append(chunk_id)
+    return file_chunk_ids
+
+
 class Brain:
     """
     A class representing a Brain.
@@ -105,6 +163,11 @@ class Brain:
         llm (LLMEndpoint): The language model used to generate the answer.
         vector_db (VectorStore): The vector store used to store the processed files.
         embedder (Embeddings): The embeddings used to create the index of the processed files.
+        vector_index_config (VectorIndexConfig): Index type and search knobs of the
+            default FAISS vector store.
+        sparse_index (BM25Index | None): BM25 index of the chunks, for hybrid retrieval.
+            Built from the FAISS vector store when `vector_index_config.sparse_index`
+            is set and none is given.
     """
 
     def __init__(
@@ -116,6 +179,8 @@ class Brain:
         vector_db: VectorStore | None = None,
         embedder: Embeddings | None = None,
         storage: StorageBase | None = None,
+        vector_index_config: VectorIndexConfig | None = None,
+        sparse_index: BM25Index | None = None,
     ):
         self.id = id
         self.name = name
@@ -129,6 +194,24 @@ class Brain:
         self.llm = llm
         self.vector_db = vector_db
         self.embedder = embedder
+        self.vector_index_config = vector_index_config or VectorIndexConfig()
+        if is_faiss(vector_db):
+            set_search_params(vector_db.index, self.vector_index_config)  # type: ignore
+            if sparse_index is None and self.vector_index_config.sparse_index:
+                sparse_index = BM25Index.from_faiss(vector_db)  # type: ignore
+        self.sparse_index = sparse_index
+
+        # Per-file outcome and metrics of the last ingestion
+        self.ingestion_results: list[FileIngestionResult] = []
+        self.ingestion_metrics: IngestionMetrics | None = None
+
+        # File id -> ids of its chunks in the vector store. Read from the chunk
+        # metadata of FAISS stores on the first removal, not at load time.
+        self._file_chunk_ids: dict[UUID, list[str]] | None = (
+            None if is_faiss(vector_db) else {}
+        )
+        # Inverted index of the chunk metadata, built on the first filtered search
+        self._metadata_index: MetadataIndex | None = None
 
     def __repr__(self) -> str:
         pp = PrettyPrinter(width=80, depth=None, compact=False, sort_dicts=False)
@@ -141,11 +224,17 @@ class Brain:
         console.print(panel)
 
     @classmethod
-    def load(cls, folder_path: str | Path) -> Self:
+    def load(cls, folder_path: str | Path, mmap: bool = False) -> Self:
         """
         Load a brain from a folder path.
+
+        Chunks of brains saved in the paged format are read on demand. With `mmap`,
+        their FAISS index is memory-mapped: worker processes serving the same brain
+        share the page cache and start answering without reading the index.
+
         Args:
             folder_path (str | Path): The path to the folder containing the brain.
+            mmap (bool): Whether to memory-map the FAISS index, for read-mostly brains.
         Returns:
             Brain: The brain loaded from the folder path.
         Example:
@@ -184,14 +273,27 @@ class Brain:
         if bserialized.vectordb_config.vectordb_type == "faiss":
             from langchain_community.vectorstores import FAISS
 
-            vector_db = FAISS.load_local(
-                folder_path=bserialized.vectordb_config.vectordb_folder_path,
-                embeddings=embedder,
-                allow_dangerous_deserialization=True,
-            )
+            if bserialized.vectordb_config.storage_format == "paged":
+                from quivr_core.vectorstore import load_paged_faiss
+
+                vector_db = load_paged_faiss(
+                    bserialized.vectordb_config.vectordb_folder_path,
+                    embedder,
+                    mmap=mmap,
+                )
+            else:
+                vector_db = FAISS.load_local(
+                    folder_path=bserialized.vectordb_config.vectordb_folder_path,
+                    embeddings=embedder,
+                    allow_dangerous_deserialization=True,
+                )
         else:
             raise ValueError("Unsupported vectordb")
 
+        sparse_index = None
+        if bserialized.vectordb_config.sparse_index_path is not None:
+            sparse_index = BM25Index.load(bserialized.vectordb_config.sparse_index_path)
+
         return cls(
             id=bserialized.id,
             name=bserialized.name,
@@ -199,6 +301,8 @@ class Brain:
             llm=LLMEndpoint.from_config(bserialized.llm_config),
             storage=storage,
             vector_db=vector_db,
+            vector_index_config=bserialized.vectordb_config.index_config,
+            sparse_index=sparse_index,
         )
 
     async def save(self, folder_path: str | Path):
@@ -222,16 +326,30 @@ class Brain:
         from langchain_community.vectorstores import FAISS
 
         if isinstance(self.vector_db, FAISS):
+            from quivr_core.vectorstore import save_paged_faiss
+
             vectordb_path = os.path.join(brain_path, "vector_store")
-            os.makedirs(vectordb_path, exist_ok=True)
-            self.vector_db.save_local(folder_path=vectordb_path)
-            vector_store = FAISSConfig(vectordb_folder_path=vectordb_path)
+            await asyncio.to_thread(save_paged_faiss, self.vector_db, vectordb_path)
+            sparse_index_path = None
+            if self.sparse_index is not None:
+                sparse_index_path = os.path.join(brain_path, "sparse_index")
+                await asyncio.to_thread(self.sparse_index.save, sparse_index_path)
+            vector_store = FAISSConfig(
+                vectordb_folder_path=vectordb_path,
+                storage_format="paged",
+                index_config=self.vector_index_config,
+                sparse_index_path=sparse_index_path,
+            )
         else:
             raise Exception("can't serialize other vector stores for now")
 
-        if isinstance(self.embedder, OpenAIEmbeddings):
+        embedder = self.embedder
+        # The embedding cache is local to the machine, only the embedder is serialized
+        if isinstance(embedder, CachedEmbeddings):
+            embedder = embedder.embedder
+        if isinstance(embedder, OpenAIEmbeddings):
             embedder_config = EmbedderConfig(
-                config=self.embedder.dict(exclude={"openai_api_key"})
+                config=embedder.dict(exclude={"openai_api_key"})
             )
         else:
             raise Exception("can't serialize embedder other than openai for now")
@@ -305,6 +423,11 @@ class Brain:
         embedder: Embeddings | None = None,
         skip_file_error: bool = False,
         processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+        checkpoint_dir: str | Path | None = None,
+        progress_callback: ProgressCallback | None = None,
+        vector_index_config: VectorIndexConfig | None = None,
     ):
         """
         Create a brain from a list of file paths.
@@ -317,8 +440,24 @@ class Brain:
             embedder (Embeddings | None): The embeddings used to create the index of the processed files.
             skip_file_error (bool): Whether to skip files that cannot be processed.
             processor_kwargs (dict[str, Any] | None): Additional arguments for the processor.
+            pipeline_config (PipelineConfig | None): Concurrency settings of the ingestion pipeline.
+            parse_cache (ParseCache | None): On-disk cache of parsed chunks. Files already
+                parsed with the same processor configuration are not parsed again.
+            checkpoint_dir (str | Path | None): Directory where the progress of the
+                ingestion is journaled. Calling again with the same directory after a
+                failure resumes the ingestion from the last checkpoint. Parsed chunks
+                are cached in this directory unless `parse_cache` is set. The directory
+                can be deleted once the brain is saved.
+            progress_callback (ProgressCallback | None): Called with the live
+                `IngestionMetrics` each time a file is ingested or fails: throughput,
+                per stage and per processor latencies, queue depths and failures.
+            vector_index_config (VectorIndexConfig | None): Index type of the default
+                FAISS vector store (HNSW, IVF, PQ or scalar quantized), flat by default.
+                With `sparse_index`, a BM25 index of the chunks is built along.
         Returns:
-            Brain: The brain created from the file paths.
+            Brain: The brain created from the file paths. The outcome of each file is
+            available in `brain.ingestion_results`, the final metrics in
+            `brain.ingestion_metrics`.
         Example:
         ```python
         brain = await Brain.afrom_files(name="My Brain", file_paths=["file1.pdf", "file2.pdf"])
@@ -331,41 +470,58 @@ class Brain:
         if embedder is None:
             embedder = default_embedder()
 
-        processor_kwargs = processor_kwargs or {}
+        checkpoint = None
+        if checkpoint_dir is not None:
+            checkpoint = IngestionCheckpoint(checkpoint_dir)
+            if parse_cache is None:
+                parse_cache = ParseCache(checkpoint.checkpoint_dir / "parse")
 
-        brain_id = uuid4()
-
-        # TODO: run in parallel using tasks
+        brain_id = (checkpoint.brain_id if checkpoint else None) or uuid4()
 
-        for path in file_paths:
-            file = await load_qfile(brain_id, path)
-            await storage.upload_file(file)
-
-        logger.debug(f"uploaded all files to {storage}")
+        sparse_index = None
+        if (vector_index_config or VectorIndexConfig()).sparse_index and (
+            vector_db is None or is_faiss(vector_db)
+        ):
+            sparse_index = BM25Index()
 
-        # Parse files
-        docs = await process_files(
+        pipeline = IngestionPipeline(
+            brain_id=brain_id,
             storage=storage,
+            embedder=embedder,
+            vector_db=vector_db,
             skip_file_error=skip_file_error,
-            **processor_kwargs,
+            processor_kwargs=processor_kwargs,
+            config=pipeline_config,
+            parse_cache=parse_cache,
+            checkpoint=checkpoint,
+            progress_callback=progress_callback,
+            vector_index_config=vector_index_config,
+            sparse_index=sparse_index,
         )
+        results = await pipeline.run(file_paths)
 
-        # Building brain's vectordb
-        if vector_db is None:
-            vector_db = await build_default_vectordb(docs, embedder)
-        else:
-            await vector_db.aadd_documents(docs)
+        if pipeline.vector_db is None:
+            raise ValueError("can't initialize brain without documents")
+        vector_db = pipeline.vector_db
 
-        logger.debug(f"added {len(docs)} chunks to vectordb")
+        logger.debug(
+            f"added {sum(r.n_chunks for r in results)} chunks from {len(results)} files to vectordb"
+        )
 
-        return cls(
+        brain = cls(
             id=brain_id,
             name=name,
             storage=storage,
             llm=llm,
             embedder=embedder,
             vector_db=vector_db,
+            vector_index_config=vector_index_config,
+            sparse_index=sparse_index,
         )
+        brain.ingestion_results = results
+        brain.ingestion_metrics = pipeline.metrics
+        brain._record_ingestion(results)
+        return brain
 
     @classmethod
     def from_files(
@@ -379,6 +535,11 @@ class Brain:
         embedder: Embeddings | None = None,
         skip_file_error: bool = False,
         processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+        checkpoint_dir: str | Path | None = None,
+        progress_callback: ProgressCallback | None = None,
+        vector_index_config: VectorIndexConfig | None = None,
     ) -> Self:
         loop = asyncio.get_event_loop()
         return loop.run_until_complete(
@@ -391,6 +552,11 @@ class Brain:
                 embedder=embedder,
                 skip_file_error=skip_file_error,
                 processor_kwargs=processor_kwargs,
+                pipeline_config=pipeline_config,
+                parse_cache=parse_cache,
+                checkpoint_dir=checkpoint_dir,
+                progress_callback=progress_callback,
+                vector_index_config=vector_index_config,
             )
         )
 
@@ -404,6 +570,8 @@ class Brain:
         storage: StorageBase = TransparentStorage(),
         llm: LLMEndpoint | None = None,
         embedder: Embeddings | None = None,
+        embedding_config: EmbeddingSchedulerConfig | None = None,
+        vector_index_config: VectorIndexConfig | None = None,
     ) -> Self:
         """
         Create a brain from a list of langchain documents.
@@ -414,6 +582,9 @@ class Brain:
             storage (StorageBase): The storage used to store the files.
             llm (LLMEndpoint | None): The language model used to generate the answer.
             embedder (Embeddings | None): The embeddings used to create the index of the processed files.
+            embedding_config (EmbeddingSchedulerConfig | None): Batching and rate limits of the embedding calls.
+            vector_index_config (VectorIndexConfig | None): Index type of the default
+                FAISS vector store, flat by default.
         Returns:
             Brain: The brain created from the langchain documents.
         Example:
@@ -435,10 +606,22 @@ class Brain:
 
         # Building brain's vectordb
         if vector_db is None:
-            vector_db = await build_default_vectordb(langchain_documents, embedder)
+            vector_db = await build_default_vectordb(
+                langchain_documents, embedder, embedding_config, vector_index_config
+            )
         else:
             await vector_db.aadd_documents(langchain_documents)
 
+        sparse_index = None
+        if (vector_index_config or VectorIndexConfig()).sparse_index and is_faiss(
+            vector_db
+        ):
+            # Built off the event loop, not by the constructor
+            sparse_index = await asyncio.to_thread(
+                BM25Index.from_faiss,
+                vector_db,  # type: ignore
+            )
+
         return cls(
             id=brain_id,
             name=name,
@@ -446,6 +629,8 @@ class Brain:
             llm=llm,
             embedder=embedder,
             vector_db=vector_db,
+            vector_index_config=vector_index_config,
+            sparse_index=sparse_index,
         )
 
     async def asearch(
@@ -457,11 +642,17 @@ class Brain:
     ) -> list[SearchResult]:
         """
         Search for relevant documents in the brain based on a query.
+
+        With the default FAISS vector store, dict filters are resolved by an
+        inverted index of the chunk metadata before searching: the search returns
+        `n_results` chunks however selective the filter is, e.g. the chunks of one
+        file (`{"qfile_id": file_id}`). Callable filters are applied to the
+        `fetch_n_neighbors` nearest chunks.
         Args:
             query (str | Document): The query to search for.
             n_results (int): The number of results to return.
             filter (Callable | Dict[str, Any] | None): The filter to apply to the search.
-            fetch_n_neighbors (int): The number of neighbors to fetch.
+            fetch_n_neighbors (int): The number of neighbors to fetch, with callable filters.
         Returns:
             list[SearchResult]: The list of retrieved chunks.
         Example:
@@ -475,6 +666,23 @@ class Brain:
         if not self.vector_db:
             raise ValueError("No vector db configured for this brain")
 
+        if isinstance(filter, dict) and is_faiss(self.vector_db):
+            vector_db = self.vector_db
+            index = self._metadata_index
+            if index is None or index.vector_db is not vector_db:
+                index = self._metadata_index = MetadataIndex(vector_db)  # type: ignore
+            text = query.page_content if isinstance(query, Document) else query
+            embedding = await vector_db.embeddings.aembed_query(text)  # type: ignore
+            result = await asyncio.to_thread(
+                filtered_similarity_search,
+                vector_db,  # type: ignore
+                embedding,
+                n_results,
+                filter,
+                index,
+            )
+            return [SearchResult(chunk=d, distance=s) for d, s in result]
+
         result = await self.vector_db.asimilarity_search_with_score(
             query, k=n_results, filter=filter, fetch_k=fetch_n_neighbors
         )
@@ -484,11 +692,315 @@ class Brain:
     def get_chat_history(self, chat_id: UUID):
         return self._chats[chat_id]
 
-    # TODO(@aminediro)
-    def add_file(self) -> None:
-        # add it to storage
-        # add it to vectorstore
-        raise NotImplementedError
+    async def _chunk_ids_by_file(self) -> dict[UUID, list[str]]:
+        if self._file_chunk_ids is None:
+            self._file_chunk_ids = await asyncio.to_thread(
+                _index_file_chunks, self.vector_db
+            )
+        return self._file_chunk_ids
+
+    def _record_ingestion(self, results: list[FileIngestionResult]):
+        if self._file_chunk_ids is None:
+            # Not indexed yet: the new chunks are read with the others
+            return
+        for result in results:
+            if result.file is not None and result.success:
+                self._file_chunk_ids[result.file.id] = result.chunk_ids
+
+    async def aadd_file(
+        self,
+        file_path: str | Path,
+        processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+    ) -> FileIngestionResult:
+        """
+        Add a single file to the brain: store it, parse it and embed only its chunks
+        into the existing vector store.
+        Args:
+            file_path (str | Path): The path of the file to add.
+            processor_kwargs (dict[str, Any] | None): Additional arguments for the processor.
+            pipeline_config (PipelineConfig | None): Concurrency settings of the ingestion pipeline.
+            parse_cache (ParseCache | None): On-disk cache of parsed chunks.
+        Returns:
+            FileIngestionResult: The outcome of the ingestion, `result.file.id` identifies
+            the file in the brain.
+        Raises:
+            ValueError: If the file cannot be processed.
+        Example:
+        ```python
+        result = await brain.aadd_file("file3.pdf")
+        await brain.aremove_file(result.file.id)
+        ```
+        """
+        (result,) = await self._aingest(
+            [file_path],
+            processor_kwargs=processor_kwargs,
+            pipeline_config=pipeline_config,
+            parse_cache=parse_cache,
+        )
+        logger.debug(f"added {result.n_chunks} chunks of {result.file} to vectordb")
+        return result
+
+    async def _aingest(
+        self,
+        file_paths: list[str | Path],
+        skip_file_error: bool = False,
+        processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+        progress_callback: ProgressCallback | None = None,
+        upload_exists_ok: bool = False,
+    ) -> list[FileIngestionResult]:
+        if self.id is None:
+            raise ValueError("can't add files to a brain without id")
+        if self.embedder is None:
+            raise ValueError("No embedder configured for this brain")
+        if self.storage is None:
+            self.storage = TransparentStorage()
+        if (
+            self.sparse_index is None
+            and self.vector_index_config.sparse_index
+            and self.vector_db is None
+        ):
+            # Filled along with the default FAISS store created by the pipeline
+            self.sparse_index = BM25Index()
+
+        pipeline = IngestionPipeline(
+            brain_id=self.id,
+            storage=self.storage,
+            embedder=self.embedder,
+            vector_db=self.vector_db,
+            skip_file_error=skip_file_error,
+            processor_kwargs=processor_kwargs,
+            config=pipeline_config,
+            parse_cache=parse_cache,
+            progress_callback=progress_callback,
+            vector_index_config=self.vector_index_config,
+            sparse_index=self.sparse_index,
+            upload_exists_ok=upload_exists_ok,
+        )
+        results = await pipeline.run(file_paths)
+        self.vector_db = pipeline.vector_db
+        self.ingestion_metrics = pipeline.metrics
+        self._record_ingestion(results)
+        return results
+
+    def add_file(
+        self,
+        file_path: str | Path,
+        processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+    ) -> FileIngestionResult:
+        loop = asyncio.get_event_loop()
+        return loop.run_until_complete(
+            self.aadd_file(
+                file_path,
+                processor_kwargs=processor_kwargs,
+                pipeline_config=pipeline_config,
+                parse_cache=parse_cache,
+            )
+        )
+
+    async def aremove_file(self, file_id: UUID) -> None:
+        """
+        Remove a file from the brain: delete its chunks from the vector store and
+        the file from the storage. Only the chunks of this file are touched, the
+        index is not rebuilt.
+
+        Chunks of FAISS stores are found from their metadata. Other vector stores
+        only know the chunks of the files ingested by this brain instance.
+        Args:
+            file_id (UUID): The id of the file to remove.
+        Raises:
+            FileNotFoundError: If the file is not in the brain's storage.
+            ValueError: If the chunks of the file can't be found in the vector store.
+        """
+        await self._aremove_files([file_id])
+
+    async def _aremove_files(self, file_ids: list[UUID]):
+        """Remove files and their chunks, with a single deletion in the vector store."""
+        file_chunk_ids = await self._chunk_ids_by_file()
+        unknown = [file_id for file_id in file_ids if file_id not in file_chunk_ids]
+        if unknown:
+            stored = await self.storage.get_files() if self.storage else []
+            missing = set(unknown).difference(f.id for f in stored)
+            if missing:
+                raise FileNotFoundError(f"files {missing} not found in brain")
+            if self.vector_db is not None and not is_faiss(self.vector_db):
+                raise ValueError(
+                    f"chunks of files {unknown} are unknown: "
+                    "they weren't ingested by this brain instance"
+                )
+        chunk_ids = [
+            chunk_id
+            for file_id in file_ids
+            for chunk_id in file_chunk_ids.pop(file_id, [])
+        ]
+        if chunk_ids and self.vector_db is not None:
+            await adelete_chunks(self.vector_db, chunk_ids)
+            if self.sparse_index is not None:
+                self.sparse_index.delete(chunk_ids)
+            logger.debug(f"removed {len(chunk_ids)} chunks of {len(file_ids)} files")
+        if self.storage is not None:
+            for file_id in file_ids:
+                await self.storage.remove_file(file_id)
+
+    def remove_file(self, file_id: UUID) -> None:
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(self.aremove_file(file_id))
+
+    async def areplace_file(
+        self,
+        file_id: UUID,
+        file_path: str | Path,
+        processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+    ) -> FileIngestionResult:
+        """
+        Replace a file of the brain by a new version: the new file is added, then the
+        old file and its chunks are removed. If the new file can't be ingested, the
+        old one is kept.
+        Args:
+            file_id (UUID): The id of the file to replace.
+            file_path (str | Path): The path of the new version of the file.
+            processor_kwargs (dict[str, Any] | None): Additional arguments for the processor.
+            pipeline_config (PipelineConfig | None): Concurrency settings of the ingestion pipeline.
+            parse_cache (ParseCache | None): On-disk cache of parsed chunks.
+        Returns:
+            FileIngestionResult: The outcome of the ingestion of the new file.
+        """
+        (result,) = await self._aingest(
+            [file_path],
+            processor_kwargs=processor_kwargs,
+            pipeline_config=pipeline_config,
+            parse_cache=parse_cache,
+            # The new version can have the content of the old one
+            upload_exists_ok=True,
+        )
+        await self.aremove_file(file_id)
+        return result
+
+    def replace_file(
+        self,
+        file_id: UUID,
+        file_path: str | Path,
+        processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+    ) -> FileIngestionResult:
+        loop = asyncio.get_event_loop()
+        return loop.run_until_complete(
+            self.areplace_file(
+                file_id,
+                file_path,
+                processor_kwargs=processor_kwargs,
+                pipeline_config=pipeline_config,
+                parse_cache=parse_cache,
+            )
+        )
+
+    async def async_directory(
+        self,
+        directory: str | Path,
+        recursive: bool = True,
+        skip_file_error: bool = False,
+        processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+        progress_callback: ProgressCallback | None = None,
+    ) -> DirectorySyncResult:
+        """
+        Bring the brain in step with a directory: add its new files, re-index its
+        modified files and remove the files deleted from it. Unchanged files are
+        neither parsed nor embedded again.
+        Files are compared by size and modification time first, and by SHA-1 only to
+        confirm a change. Brain files are matched to the directory by their
+        `source_path` metadata: files added with `from_files`, `add_file` or a
+        previous sync are tracked. Hidden files are ignored.
+        Args:
+            directory (str | Path): The directory to synchronize with.
+            recursive (bool): Whether to include the files of sub directories.
+            skip_file_error (bool): Whether to skip files that cannot be processed.
+            processor_kwargs (dict[str, Any] | None): Additional arguments for the processor.
+            pipeline_config (PipelineConfig | None): Concurrency settings of the ingestion pipeline.
+            parse_cache (ParseCache | None): On-disk cache of parsed chunks.
+            progress_callback (ProgressCallback | None): Called with the live
+                `IngestionMetrics` each time a file is ingested or fails.
+        Returns:
+            DirectorySyncResult: The files added, updated and removed.
+        Example:
+        ```python
+        brain = Brain.load("path/to/brain")
+        result = await brain.async_directory("path/to/shared/folder")
+        await brain.save("path/to/brain")
+        ```
+        """
+        directory = Path(directory)
+        if not directory.is_dir():
+            raise ValueError(f"{directory} is not a directory")
+
+        files = await self.storage.get_files() if self.storage else []
+        diff = await diff_directory(directory, files, recursive=recursive)
+        sync_result = DirectorySyncResult(n_unchanged=diff.n_unchanged)
+        if not diff.has_changes:
+            return sync_result
+
+        # New versions are ingested first: a modified file that fails keeps its
+        # previous version
+        results = await self._aingest(
+            [*diff.added, *(path for _, path in diff.modified)],
+            skip_file_error=skip_file_error,
+            processor_kwargs=processor_kwargs,
+            pipeline_config=pipeline_config,
+            parse_cache=parse_cache,
+            progress_callback=progress_callback,
+            # New files can have the content of a file of the brain, e.g. copies
+            upload_exists_ok=True,
+        )
+        sync_result.added = results[: len(diff.added)]
+        sync_result.updated = results[len(diff.added) :]
+        sync_result.removed = diff.removed
+
+        stale = [file.id for file in diff.removed]
+        stale.extend(
+            file.id
+            for (file, _), result in zip(diff.modified, sync_result.updated)
+            if result.success
+        )
+        if stale:
+            await self._aremove_files(stale)
+        self.ingestion_results = results
+        logger.debug(
+            f"synced brain {self.id} with {directory}: {len(sync_result.added)} added, "
+            f"{len(sync_result.updated)} updated, {len(sync_result.removed)} removed"
+        )
+        return sync_result
+
+    def sync_directory(
+        self,
+        directory: str | Path,
+        recursive: bool = True,
+        skip_file_error: bool = False,
+        processor_kwargs: dict[str, Any] | None = None,
+        pipeline_config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+        progress_callback: ProgressCallback | None = None,
+    ) -> DirectorySyncResult:
+        loop = asyncio.get_event_loop()
+        return loop.run_until_complete(
+            self.async_directory(
+                directory,
+                recursive=recursive,
+                skip_file_error=skip_file_error,
+                processor_kwargs=processor_kwargs,
+                pipeline_config=pipeline_config,
+                parse_cache=parse_cache,
+                progress_callback=progress_callback,
+            )
+        )
 
     async def ask_streaming(
         self,
@@ -524,12 +1036,39 @@ class Brain:
         else:
             retrieval_config = RetrievalConfig(llm_config=self.llm.get_config())
 
+        vector_db = self.vector_db
+        if retrieval_config.vector_index_config is not None and is_faiss(vector_db):
+            # Per question: the shared index keeps its own search knobs
+            vector_db = with_search_params(
+                vector_db,  # type: ignore
+                retrieval_config.vector_index_config,
+            )
+
         if rag_pipeline is None:
             rag_pipeline = QuivrQARAGLangGraph
 
-        rag_instance = rag_pipeline(
-            retrieval_config=retrieval_config, llm=llm, vector_store=self.vector_db
-        )
+        rag_instance: QuivrQARAG | QuivrQARAGLangGraph
+        if retrieval_config.hybrid_search is not None:
+            if not issubclass(rag_pipeline, QuivrQARAGLangGraph):
+                raise ValueError(
+                    f"{rag_pipeline.__name__} doesn't support hybrid search"
+                )
+            if self.sparse_index is None:
+                # Built at ingestion or load time, not on the first question
+                raise ValueError(
+                    "hybrid search requires a sparse index: build the brain with "
+                    "`VectorIndexConfig(sparse_index=True)`"
+                )
+            rag_instance = rag_pipeline(
+                retrieval_config=retrieval_config,
+                llm=llm,
+                vector_store=vector_db,
+                sparse_index=self.sparse_index,
+            )
+        else:
+            rag_instance = rag_pipeline(
+                retrieval_config=retrieval_config, llm=llm, vector_store=vector_db
+            )
 
         chat_history = self.default_chat if chat_history is None else chat_history
         list_files = [] if list_files is None else list_files
@@ -4,23 +4,54 @@ from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
 
+from quivr_core.embeddings.scheduler import (
+    EmbeddingScheduler,
+    EmbeddingSchedulerConfig,
+)
 from quivr_core.rag.entities.config import DefaultModelSuppliers, LLMEndpointConfig
 from quivr_core.llm import LLMEndpoint
+from quivr_core.vectorstore.index import VectorIndexConfig
 
 logger = logging.getLogger("quivr_core")
 
 
 async def build_default_vectordb(
-    docs: list[Document], embedder: Embeddings
+    docs: list[Document],
+    embedder: Embeddings,
+    embedding_config: EmbeddingSchedulerConfig | None = None,
+    index_config: VectorIndexConfig | None = None,
+) -> VectorStore:
+    if len(docs) == 0:
+        raise ValueError("can't initialize brain without documents")
+    # Batches of chunks are embedded concurrently
+    embeddings = await EmbeddingScheduler(embedder, embedding_config).aembed_documents(
+        docs
+    )
+    return build_default_vectordb_from_embeddings(
+        docs, embeddings, embedder, index_config
+    )
+
+
+def build_default_vectordb_from_embeddings(
+    docs: list[Document],
+    embeddings: list[list[float]],
+    embedder: Embeddings,
+    index_config: VectorIndexConfig | None = None,
 ) -> VectorStore:
     try:
-        from langchain_community.vectorstores import FAISS
+        import faiss  # noqa: F401
+
+        from quivr_core.vectorstore.index import build_faiss_store
 
         logger.debug("Using Faiss-CPU as vector store.")
-        # TODO(@aminediro) : embedding call is usually not concurrent for all documents but waits
         if len(docs) > 0:
-            vector_db = await FAISS.afrom_documents(documents=docs, embedding=embedder)
-            return vector_db
+            return build_faiss_store(
+                texts=[d.page_content for d in docs],
+                embeddings=embeddings,
+                metadatas=[d.metadata for d in docs],
+                embedder=embedder,
+                config=index_config or VectorIndexConfig(),
+            )
         else:
             raise ValueError("can't initialize brain without documents")
 
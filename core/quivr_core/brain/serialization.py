@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field, SecretStr
 from quivr_core.rag.entities.config import LLMEndpointConfig
 from quivr_core.rag.entities.models import ChatMessage
 from quivr_core.files.file import QuivrFileSerialized
+from quivr_core.vectorstore.index import VectorIndexConfig
 
 
 class EmbedderConfig(BaseModel):
@@ -27,6 +28,11 @@ class PGVectorConfig(BaseModel):
 class FAISSConfig(BaseModel):
     vectordb_type: Literal["faiss"] = "faiss"
     vectordb_folder_path: str
+    # `pickle`: FAISS.save_local format, `paged`: quivr_core.vectorstore format
+    storage_format: Literal["pickle", "paged"] = "pickle"
+    index_config: VectorIndexConfig = VectorIndexConfig()
+    # Folder of the BM25 index of the chunks, if any
+    sparse_index_path: str | None = None
 
 
 class LocalStorageConfig(BaseModel):
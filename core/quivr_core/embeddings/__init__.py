@@ -0,0 +1,3 @@
+from .cache import CachedEmbeddings, EmbeddingCache
+
+__all__ = ["CachedEmbeddings", "EmbeddingCache"]
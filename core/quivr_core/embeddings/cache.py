@@ -0,0 +1,330 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("quivr_core")
+
+
+@dataclass
+class EmbeddingCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EmbeddingCache:
+    """
+    Size bounded on-disk store of embedding vectors, keyed by the SHA-1 of the text.
+
+    The vectors live in a memory-mapped float32 array (`vectors.f32`). The index
+    (`index.log`) is an append-only log of `(key, slot)` records replayed on load.
+    When the cache is full, the least recently used slot is reused: the eviction
+    of its key is logged before the slot is overwritten, and the new key is bound
+    once its vector is on disk, so a crash never leaves a key on a wrong vector.
+    The log is compacted when it grows past twice the number of live entries.
+
+    A cache directory holds vectors of a single embedding model and should only
+    be written by one process at a time.
+
+    Args:
+        cache_dir (Path): Directory of the cache.
+        max_entries (int): Maximum number of vectors kept in the cache.
+    """
+
+    _RECORD = struct.Struct("<20sq")
+    _MIN_CAPACITY = 1024
+    # Slot of the records evicting a key
+    _EVICTED = -1
+
+    def __init__(self, cache_dir: Path, max_entries: int = 100_000):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._vectors_path = self.cache_dir / "vectors.f32"
+        self._index_path = self.cache_dir / "index.log"
+        self._meta_path = self.cache_dir / "meta.json"
+
+        # key -> slot, in least recently used first order
+        self._slots: OrderedDict[bytes, int] = OrderedDict()
+        self._n_records = 0
+        self._vectors: np.memmap | None = None
+        self.dim: int | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @staticmethod
+    def key(text: str, query: bool = False) -> bytes:
+        # Queries get their own keys: some models embed queries and documents differently
+        prefix = b"query\x00" if query else b""
+        return hashlib.sha1(prefix + text.encode("utf-8", "surrogatepass")).digest()
+
+    def _load(self):
+        if not self._meta_path.exists():
+            return
+        with open(self._meta_path) as f:
+            self.dim = json.load(f)["dim"]
+        self._open_vectors()
+        assert self._vectors is not None
+        capacity = self._vectors.shape[0]
+
+        if not self._index_path.exists():
+            return
+        slot_keys: dict[int, bytes] = {}
+        with open(self._index_path, "rb") as f:
+            data = f.read()
+        # Ignore a partially written trailing record
+        n_records = len(data) // self._RECORD.size
+        records = data[: n_records * self._RECORD.size]
+        for key, slot in self._RECORD.iter_unpack(records):
+            if slot == self._EVICTED:
+                evicted_slot = self._slots.pop(key, None)
+                if evicted_slot is not None and slot_keys.get(evicted_slot) == key:
+                    del slot_keys[evicted_slot]
+                continue
+            if slot >= capacity:
+                continue
+            previous_key = slot_keys.get(slot)
+            if previous_key is not None:
+                self._slots.pop(previous_key, None)
+            slot_keys[slot] = key
+            self._slots.pop(key, None)
+            self._slots[key] = slot
+        self._n_records = n_records
+
+    def _open_vectors(self, capacity: int | None = None):
+        assert self.dim is not None
+        row_size = self.dim * 4
+        if capacity is not None:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(capacity * row_size)
+        capacity = os.path.getsize(self._vectors_path) // row_size
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+        )
+
+    def get(self, keys: list[bytes]) -> list[list[float] | None]:
+        if self._vectors is None:
+            return [None] * len(keys)
+        vectors: list[list[float] | None] = []
+        for key in keys:
+            slot = self._slots.get(key)
+            if slot is None:
+                vectors.append(None)
+            else:
+                self._slots.move_to_end(key)
+                vectors.append(self._vectors[slot].tolist())
+        return vectors
+
+    def put(self, keys: list[bytes], vectors: list[list[float]]):
+        if not keys:
+            return
+        if self.dim is None:
+            self.dim = len(vectors[0])
+            with open(self._meta_path, "w") as f:
+                json.dump({"dim": self.dim}, f)
+            self._vectors_path.touch()
+            self._open_vectors(min(self.max_entries, self._MIN_CAPACITY))
+        assert self._vectors is not None
+
+        evicted: list[bytes] = []
+        added: dict[bytes, tuple[int, list[float]]] = {}
+        for key, vector in zip(keys, vectors):
+            if key in self._slots:
+                continue
+            slot, evicted_key = self._next_slot()
+            # Keys added and evicted by the same call are never logged
+            if evicted_key is not None and added.pop(evicted_key, None) is None:
+                evicted.append(evicted_key)
+            self._slots[key] = slot
+            added[key] = (slot, vector)
+
+        if evicted:
+            # Evictions are on disk before their slots are overwritten
+            self._append(
+                [self._RECORD.pack(key, self._EVICTED) for key in evicted], sync=True
+            )
+        if not added:
+            return
+        for slot, vector in added.values():
+            self._vectors[slot] = vector
+        # Vectors are on disk before the index references them
+        self._vectors.flush()
+        self._append([self._RECORD.pack(key, slot) for key, (slot, _) in added.items()])
+        if self._n_records > 2 * max(len(self._slots), self._MIN_CAPACITY):
+            self._compact()
+
+    def _append(self, records: list[bytes], sync: bool = False):
+        with open(self._index_path, "ab") as f:
+            f.write(b"".join(records))
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._n_records += len(records)
+
+    def _next_slot(self) -> tuple[int, bytes | None]:
+        """Free slot for a new key, with the key evicted to free it if any."""
+        assert self._vectors is not None
+        capacity = self._vectors.shape[0]
+        if len(self._slots) < capacity:
+            return len(self._slots), None
+        if capacity < self.max_entries:
+            self._open_vectors(min(self.max_entries, 2 * capacity))
+            return len(self._slots), None
+        # Evict the least recently used entry
+        key, slot = self._slots.popitem(last=False)
+        return slot, key
+
+    def _compact(self):
+        tmp_path = self._index_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(
+                b"".join(
+                    self._RECORD.pack(key, slot) for key, slot in self._slots.items()
+                )
+            )
+        os.replace(tmp_path, self._index_path)
+        self._n_records = len(self._slots)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper caching vectors on disk, keyed by (embedder model, text hash).
+
+    Identical texts are embedded once, across files, brains and runs. Query
+    embeddings share the same cache, so the vector store can use this
+    wrapper directly as its embedding function. The async methods read and write
+    the cache in a worker thread, accesses to the cache are serialized.
+
+    Args:
+        embedder (Embeddings): The wrapped embeddings.
+        cache_dir (Path | None): Root directory of the cache. Defaults to the environment
+            variable `QUIVR_EMBEDDING_CACHE` or `~/.cache/quivr/embeddings`.
+            Each embedder model gets its own subdirectory.
+        max_entries (int): Maximum number of vectors cached per model.
+        model_name (str | None): Name identifying the embedder model. Defaults to the
+            `model` attribute of the embedder, or its class name.
+        cache_queries (bool): Whether query embeddings are cached too.
+    """
+
+    def __init__(
+        self,
+        embedder: Embeddings,
+        cache_dir: Path | None = None,
+        max_entries: int = 100_000,
+        model_name: str | None = None,
+        cache_queries: bool = True,
+    ):
+        self.embedder = embedder
+        self.cache_queries = cache_queries
+        if cache_dir is None:
+            cache_dir = Path(
+                os.getenv("QUIVR_EMBEDDING_CACHE", "~/.cache/quivr/embeddings")
+            )
+        self.model_name = model_name or _embedder_model_name(embedder)
+        namespace = re.sub(r"[^A-Za-z0-9_.-]", "_", self.model_name)
+        self.cache = EmbeddingCache(
+            Path(cache_dir) / namespace, max_entries=max_entries
+        )
+        self.stats = EmbeddingCacheStats()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"CachedEmbeddings(model_name={self.model_name}, entries={len(self.cache)})"
+        )
+
+    def _lookup(
+        self, texts: list[str], query: bool = False
+    ) -> tuple[list[bytes], list[list[float] | None], list[str], list[bytes]]:
+        keys = [EmbeddingCache.key(text, query) for text in texts]
+        with self._lock:
+            vectors = self.cache.get(keys)
+        # Deduplicate the misses: identical texts are embedded once
+        missing: dict[bytes, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        n_misses = sum(v is None for v in vectors)
+        with self._lock:
+            self.stats.misses += n_misses
+            self.stats.hits += len(texts) - n_misses
+        return keys, vectors, list(missing.values()), list(missing.keys())
+
+    def _merge(
+        self,
+        keys: list[bytes],
+        vectors: list[list[float] | None],
+        missing_keys: list[bytes],
+        new_vectors: list[list[float]],
+    ) -> list[list[float]]:
+        with self._lock:
+            self.cache.put(missing_keys, new_vectors)
+        # Vectors are stored as float32: return the same values on hits and misses
+        new_vectors = np.asarray(new_vectors, dtype=np.float32).tolist()
+        computed = dict(zip(missing_keys, new_vectors))
+        return [v if v is not None else computed[k] for k, v in zip(keys, vectors)]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, vectors, missing_texts, missing_keys = self._lookup(texts)
+        new_vectors = (
+            self.embedder.embed_documents(missing_texts) if missing_texts else []
+        )
+        return self._merge(keys, vectors, missing_keys, new_vectors)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, vectors, missing_texts, missing_keys = await asyncio.to_thread(
+            self._lookup, texts
+        )
+        new_vectors = (
+            await self.embedder.aembed_documents(missing_texts) if missing_texts else []
+        )
+        return await asyncio.to_thread(
+            self._merge, keys, vectors, missing_keys, new_vectors
+        )
+
+    def embed_query(self, text: str) -> list[float]:
+        if not self.cache_queries:
+            return self.embedder.embed_query(text)
+        keys, vectors, missing_texts, missing_keys = self._lookup([text], query=True)
+        new_vectors = [self.embedder.embed_query(text)] if missing_texts else []
+        return self._merge(keys, vectors, missing_keys, new_vectors)[0]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        if not self.cache_queries:
+            return await self.embedder.aembed_query(text)
+        keys, vectors, missing_texts, missing_keys = await asyncio.to_thread(
+            self._lookup, [text], True
+        )
+        new_vectors = [await self.embedder.aembed_query(text)] if missing_texts else []
+        merged = await asyncio.to_thread(
+            self._merge, keys, vectors, missing_keys, new_vectors
+        )
+        return merged[0]
+
+
+def _embedder_model_name(embedder: Embeddings) -> str:
+    for attr in ("model", "model_name"):
+        name = getattr(embedder, attr, None)
+        if isinstance(name, str) and name:
+            return name
+    return type(embedder).__name__
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger("quivr_core")
+
+
+class EmbeddingSchedulerConfig(BaseModel):
+    """
+    Batching and rate limits of the embedding calls.
+
+    Chunks are packed in batches of at most `max_batch_tokens` tokens and
+    `max_batch_size` chunks. Up to `max_concurrency` batches are embedded at the same
+    time, within a budget of `tokens_per_minute` tokens if set.
+    """
+
+    max_batch_tokens: int = Field(default=20_000, ge=1)
+    max_batch_size: int = Field(default=512, ge=1)
+    max_concurrency: int = Field(default=4, ge=1)
+    tokens_per_minute: int | None = Field(default=None, ge=1)
+
+
+class _TokenBudget:
+    """Token bucket refilled continuously at `tokens_per_minute`."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60
+        self.tokens = float(tokens_per_minute)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, n_tokens: int):
+        # A batch larger than the budget waits for a full bucket
+        n_tokens = min(n_tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= n_tokens:
+                    self.tokens -= n_tokens
+                    return
+                await asyncio.sleep((n_tokens - self.tokens) / self.rate)
+
+
+class EmbeddingScheduler:
+    """
+    Embeds chunks in token-packed batches dispatched concurrently.
+
+    The token count of a chunk is read from its `chunk_size` metadata, set by the
+    processors, and estimated from its length otherwise. Vectors are returned in
+    the order of the input chunks. The concurrency and the token budget are shared by
+    all the calls made through the same scheduler. When a batch fails, the other
+    batches of the call are cancelled and its error is raised.
+
+    Args:
+        embedder (Embeddings): The embeddings used to embed the chunks.
+        config (EmbeddingSchedulerConfig | None): Batching and rate limits.
+    """
+
+    def __init__(
+        self, embedder: Embeddings, config: EmbeddingSchedulerConfig | None = None
+    ):
+        self.embedder = embedder
+        self.config = config or EmbeddingSchedulerConfig()
+        self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        self._budget = (
+            _TokenBudget(self.config.tokens_per_minute)
+            if self.config.tokens_per_minute
+            else None
+        )
+
+    @staticmethod
+    def n_tokens(doc: Document) -> int:
+        chunk_size = doc.metadata.get("chunk_size")
+        if isinstance(chunk_size, int):
+            return chunk_size
+        # ~4 characters per token
+        return len(doc.page_content) // 4 + 1
+
+    def pack(self, docs: list[Document]) -> list[list[int]]:
+        """Pack the chunks indices in batches, keeping the input order."""
+        batches: list[list[int]] = []
+        batch: list[int] = []
+        batch_tokens = 0
+        for idx, doc in enumerate(docs):
+            n_tokens = self.n_tokens(doc)
+            if batch and (
+                batch_tokens + n_tokens > self.config.max_batch_tokens
+                or len(batch) >= self.config.max_batch_size
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(idx)
+            batch_tokens += n_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def aembed_documents(self, docs: list[Document]) -> list[list[float]]:
+        vectors: list[list[float]] = [[] for _ in docs]
+
+        async def embed_batch(batch: list[int]):
+            n_tokens = sum(self.n_tokens(docs[i]) for i in batch)
+            async with self._semaphore:
+                if self._budget is not None:
+                    await self._budget.acquire(n_tokens)
+                batch_vectors = await self.embedder.aembed_documents(
+                    [docs[i].page_content for i in batch]
+                )
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+
+        batches = self.pack(docs)
+        logger.debug(f"embedding {len(docs)} chunks in {len(batches)} batches")
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for batch in batches:
+                    tg.create_task(embed_batch(batch))
+        except BaseExceptionGroup as eg:
+            # Surface the original error instead of the task group wrapper
+            raise eg.exceptions[0] from None
+        return vectors
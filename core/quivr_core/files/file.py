@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import mimetypes
 import os
@@ -5,7 +6,7 @@ import warnings
 from contextlib import asynccontextmanager
 from enum import Enum
 from pathlib import Path
-from typing import Any, AsyncGenerator, AsyncIterable, Self
+from typing import Any, AsyncGenerator, AsyncIterable, Self, Sequence
 from uuid import UUID, uuid4
 
 import aiofiles
@@ -66,17 +67,64 @@ def get_file_extension(file_path: Path) -> FileExtension | str:
         return file_path.suffix
 
 
-async def load_qfile(brain_id: UUID, path: str | Path):
+# Metadata keys of the source file a QuivrFile was loaded from
+SOURCE_PATH_KEY = "source_path"
+SOURCE_MTIME_KEY = "source_mtime_ns"
+
+# Files are hashed in fixed size blocks: memory stays flat whatever the file size
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(
+    path: Path, algorithms: Sequence[str] = ("sha1",), block_size: int = HASH_BLOCK_SIZE
+) -> dict[str, str]:
+    """
+    Compute the hex digests of a file, reading it once in blocks of `block_size` bytes.
+
+    Args:
+        path (Path): The file to hash.
+        algorithms (Sequence[str]): hashlib algorithm names, e.g. `("sha1", "blake2b")`.
+        block_size (int): Size of the read buffer.
+    Returns:
+        dict[str, str]: The hex digest for each algorithm.
+    """
+    hashers = {name: hashlib.new(name) for name in algorithms}
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buffer):
+            for hasher in hashers.values():
+                hasher.update(view[:n])
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+
+async def load_qfile(
+    brain_id: UUID, path: str | Path, extra_hashes: Sequence[str] = ()
+):
+    """
+    Load a file as a QuivrFile.
+
+    The file is hashed in a worker thread, so that many files can be hashed in
+    parallel without blocking the event loop. The absolute path and modification
+    time of the file are kept as `source_path` and `source_mtime_ns` metadata, to
+    detect changes of the source file later on.
+
+    Args:
+        brain_id (UUID): The brain the file belongs to.
+        path (str | Path): The path of the file.
+        extra_hashes (Sequence[str]): Additional digests computed alongside SHA-1,
+            stored as `file_<algorithm>` in the file metadata (e.g. `("blake2b",)`).
+    """
     if not isinstance(path, Path):
         path = Path(path)
 
     if not path.exists():
         raise FileExistsError(f"file {path} doesn't exist")
 
-    file_size = os.stat(path).st_size
+    stat = os.stat(path)
 
-    async with aiofiles.open(path, mode="rb") as f:
-        file_sha1 = hashlib.sha1(await f.read()).hexdigest()
+    digests = await asyncio.to_thread(hash_file, path, ("sha1", *extra_hashes))
+    file_sha1 = digests.pop("sha1")
 
     try:
         # NOTE: when loading from existing storage, file name will be uuid
@@ -90,8 +138,13 @@ async def load_qfile(brain_id: UUID, path: str | Path):
         path=path,
         original_filename=path.name,
         file_extension=get_file_extension(path),
-        file_size=file_size,
+        file_size=stat.st_size,
         file_sha1=file_sha1,
+        metadata={
+            SOURCE_PATH_KEY: str(path.absolute()),
+            SOURCE_MTIME_KEY: stat.st_mtime_ns,
+            **{f"file_{name}": digest for name, digest in digests.items()},
+        },
     )
 
 
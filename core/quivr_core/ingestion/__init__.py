@@ -0,0 +1,18 @@
+from .checkpoint import IngestionCheckpoint
+from .metrics import IngestionMetrics, LatencyHistogram, ProgressCallback, StageMetrics
+from .pipeline import FileIngestionResult, IngestionPipeline, PipelineConfig
+from .sync import DirectoryDiff, DirectorySyncResult, diff_directory
+
+__all__ = [
+    "IngestionPipeline",
+    "PipelineConfig",
+    "FileIngestionResult",
+    "IngestionCheckpoint",
+    "IngestionMetrics",
+    "StageMetrics",
+    "LatencyHistogram",
+    "ProgressCallback",
+    "DirectoryDiff",
+    "DirectorySyncResult",
+    "diff_directory",
+]
@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from uuid import UUID, uuid4
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from quivr_core.files.file import (
+    SOURCE_MTIME_KEY,
+    QuivrFile,
+    QuivrFileSerialized,
+)
+from quivr_core.vectorstore.index import is_faiss
+
+logger = logging.getLogger("quivr_core")
+
+# Maximum share of the ingestion time spent saving FAISS snapshots
+_MAX_FLUSH_OVERHEAD = 0.1
+
+
+@dataclass
+class CheckpointRecord:
+    """A file whose chunks were added to the vector store."""
+
+    path: Path
+    file: QuivrFile
+    chunk_ids: list[str]
+
+    def is_current(self) -> bool:
+        """Whether the source file is unchanged since it was ingested."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_size == self.file.file_size and stat.st_mtime_ns == (
+            self.file.additional_metadata.get(SOURCE_MTIME_KEY)
+        )
+
+
+class IngestionCheckpoint:
+    """
+    Journal of an ingestion, to resume it after a crash instead of starting over.
+
+    Completed files (uploaded, parsed and embedded) are buffered and committed every
+    `flush_every` files or `flush_interval` seconds. With a FAISS vector store, a
+    commit first saves a snapshot of the index, then appends a line referencing the
+    snapshot and the committed files to `journal.jsonl`: the journal never refers
+    to vectors that are not on disk. Other vector stores are expected to persist
+    their own state, their files are committed as soon as they are added.
+
+    A FAISS snapshot is a full save of the store: each commit is O(N) in the number
+    of chunks ingested so far. To bound that cost on large ingestions, commits are
+    spaced so that saving snapshots takes at most 10% of the ingestion time.
+
+    Args:
+        checkpoint_dir (Path): Directory of the checkpoint, reused across runs.
+        flush_every (int): Number of completed files between two commits.
+        flush_interval (float): Maximum number of seconds between two commits.
+    """
+
+    def __init__(
+        self,
+        checkpoint_dir: str | Path,
+        flush_every: int = 100,
+        flush_interval: float = 60.0,
+    ):
+        self.checkpoint_dir = Path(checkpoint_dir).expanduser()
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+        self._journal_path = self.checkpoint_dir / "journal.jsonl"
+        self._meta_path = self.checkpoint_dir / "meta.json"
+        self._pending: list[CheckpointRecord] = []
+        self._removed: list[Path] = []
+        self._last_flush = time.monotonic()
+        self._flush_seconds = 0.0
+        self._snapshot: str | None = None
+        # Flushes run in threads, which outlive cancelled runs
+        self._lock = threading.Lock()
+        self.records: dict[Path, CheckpointRecord] = {}
+
+        self.brain_id: UUID | None = None
+        if self._meta_path.exists():
+            with open(self._meta_path) as f:
+                self.brain_id = UUID(json.load(f)["brain_id"])
+        self._load_journal()
+
+        # Snapshots of a crashed run that were never committed
+        for path in self.checkpoint_dir.glob("vector_store_*"):
+            if path.name != self._snapshot:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def __repr__(self) -> str:
+        return f"IngestionCheckpoint(checkpoint_dir={self.checkpoint_dir}, files={len(self.records)})"
+
+    @property
+    def snapshot_path(self) -> Path | None:
+        """Path of the last committed FAISS snapshot."""
+        if self._snapshot is None:
+            return None
+        return self.checkpoint_dir / self._snapshot
+
+    def start(self, brain_id: UUID):
+        if self.brain_id is not None and self.brain_id != brain_id:
+            raise ValueError(
+                f"checkpoint {self.checkpoint_dir} belongs to brain {self.brain_id}"
+            )
+        if self.brain_id is None:
+            self.brain_id = brain_id
+            with open(self._meta_path, "w") as f:
+                json.dump({"brain_id": str(brain_id)}, f)
+
+    def _load_journal(self):
+        if not self._journal_path.exists():
+            return
+        with open(self._journal_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written last line of a crashed run
+                    logger.warning(f"ignoring truncated entry in {self._journal_path}")
+                    break
+                if entry["snapshot"] is not None:
+                    self._snapshot = entry["snapshot"]
+                for path in entry["removed"]:
+                    self.records.pop(Path(path), None)
+                for r in entry["files"]:
+                    record = _record_from_json(r)
+                    self.records[record.path] = record
+        logger.debug(
+            f"loaded checkpoint {self.checkpoint_dir}: {len(self.records)} files done"
+        )
+
+    def load_vector_db(self, embedder: Embeddings) -> VectorStore | None:
+        """Load the last committed FAISS snapshot, if any."""
+        if self.snapshot_path is None:
+            return None
+        from langchain_community.vectorstores import FAISS
+
+        from quivr_core.vectorstore import is_paged_faiss, load_paged_faiss
+
+        if is_paged_faiss(self.snapshot_path):
+            return load_paged_faiss(self.snapshot_path, embedder, mmap=False)
+        return FAISS.load_local(
+            folder_path=str(self.snapshot_path),
+            embeddings=embedder,
+            allow_dangerous_deserialization=True,
+        )
+
+    def add(self, path: Path, file: QuivrFile, chunk_ids: list[str]):
+        self._pending.append(CheckpointRecord(path, file, chunk_ids))
+
+    def forget(self, paths: list[Path]):
+        """Drop the records of files whose chunks were deleted from the vector store."""
+        for path in paths:
+            if self.records.pop(path, None) is not None:
+                self._removed.append(path)
+
+    def flush_due(self) -> bool:
+        elapsed = time.monotonic() - self._last_flush
+        if elapsed < self._flush_seconds * (1 / _MAX_FLUSH_OVERHEAD - 1):
+            return False
+        return bool(self._pending or self._removed) and (
+            len(self._pending) >= self.flush_every or elapsed >= self.flush_interval
+        )
+
+    def flush(self, vector_db: VectorStore | None):
+        """
+        Commit the pending changes, saving a snapshot of the vector store first if it
+        is a FAISS store. Blocking: must not run while chunks are added to the store.
+        Concurrent flushes are serialized.
+        """
+        with self._lock:
+            # Files completed during the flush are committed by the next one
+            pending, self._pending = self._pending, []
+            removed, self._removed = self._removed, []
+            try:
+                self._commit(vector_db, pending, removed)
+            except BaseException:
+                self._pending[:0] = pending
+                self._removed[:0] = removed
+                raise
+
+    def _commit(
+        self,
+        vector_db: VectorStore | None,
+        pending: list[CheckpointRecord],
+        removed: list[Path],
+    ):
+        if not pending and not removed:
+            return
+        start = time.monotonic()
+        snapshot = None
+        if is_faiss(vector_db):
+            from quivr_core.vectorstore import save_paged_faiss
+
+            snapshot = f"vector_store_{uuid4().hex}"
+            save_paged_faiss(vector_db, self.checkpoint_dir / snapshot)  # type: ignore
+
+        entry = {
+            "snapshot": snapshot,
+            "removed": [str(p) for p in removed],
+            "files": [_record_to_json(r) for r in pending],
+        }
+        # The journal line is the commit point of the snapshot
+        with open(self._journal_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        for record in pending:
+            self.records[record.path] = record
+        logger.debug(f"checkpointed {len(pending)} files ({len(self.records)} total)")
+        self._last_flush = time.monotonic()
+        self._flush_seconds = self._last_flush - start
+
+        if snapshot is not None:
+            previous, self._snapshot = self._snapshot, snapshot
+            if previous is not None:
+                shutil.rmtree(self.checkpoint_dir / previous, ignore_errors=True)
+
+    def clear(self):
+        """Delete the checkpoint, once the brain is saved."""
+        with self._lock:
+            shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+            self.records.clear()
+            self._pending.clear()
+            self._removed.clear()
+            self._snapshot = None
+            self.brain_id = None
+
+
+def _record_to_json(record: CheckpointRecord) -> dict[str, Any]:
+    return {
+        "path": str(record.path),
+        "file": record.file.serialize().model_dump(mode="json"),
+        "chunk_ids": record.chunk_ids,
+    }
+
+
+def _record_from_json(data: dict[str, Any]) -> CheckpointRecord:
+    return CheckpointRecord(
+        path=Path(data["path"]),
+        file=QuivrFile.deserialize(QuivrFileSerialized.model_validate(data["file"])),
+        chunk_ids=data["chunk_ids"],
+    )
@@ -0,0 +1,174 @@
+import bisect
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+# Upper bounds, in seconds, of the latency histogram buckets. The last bucket is unbounded.
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class LatencyHistogram:
+    """Latencies counted in the fixed `LATENCY_BUCKETS` buckets."""
+
+    counts: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile, `max` for the last bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max,
+            "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "inf"], self.counts)),
+        }
+
+
+@dataclass
+class StageMetrics:
+    """Work done by the workers of a pipeline stage."""
+
+    n_items: int = 0
+    n_errors: int = 0
+    busy_seconds: float = 0.0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def observe_queue(self, depth: int):
+        self.queue_depth = depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def observe(self, seconds: float, error: bool = False):
+        self.n_items += 1
+        self.n_errors += error
+        self.busy_seconds += seconds
+        self.latency.observe(seconds)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "n_items": self.n_items,
+            "n_errors": self.n_errors,
+            "busy_seconds": self.busy_seconds,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "latency": self.latency.to_dict(),
+        }
+
+
+@dataclass
+class IngestionMetrics:
+    """
+    Live progress and throughput of an ingestion.
+
+    Stage metrics show where the time goes: a stage with a full input queue
+    (`max_queue_depth` close to the queue size) and busy workers is the bottleneck.
+    Parse latencies are kept per processor class, failures per file extension.
+    """
+
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    bytes_done: int = 0
+    chunks_done: int = 0
+    embedding_tokens: int = 0
+    stages: dict[str, StageMetrics] = field(default_factory=dict)
+    parse_latency: dict[str, LatencyHistogram] = field(default_factory=dict)
+    failures_by_extension: Counter[str] = field(default_factory=Counter)
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+    def stage(self, name: str) -> StageMetrics:
+        if name not in self.stages:
+            self.stages[name] = StageMetrics()
+        return self.stages[name]
+
+    def observe_parse(self, processor_name: str, seconds: float):
+        if processor_name not in self.parse_latency:
+            self.parse_latency[processor_name] = LatencyHistogram()
+        self.parse_latency[processor_name].observe(seconds)
+
+    def observe_failure(self, extension: str):
+        self.files_failed += 1
+        self.failures_by_extension[extension or "<none>"] += 1
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def _rate(self, value: int) -> float:
+        elapsed = self.elapsed
+        return value / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self._rate(self.files_done)
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self._rate(self.bytes_done)
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self._rate(self.chunks_done)
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self._rate(self.embedding_tokens)
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the files processed, successfully or not."""
+        if not self.files_total:
+            return 1.0
+        return (self.files_done + self.files_failed) / self.files_total
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "files_failed": self.files_failed,
+            "bytes_done": self.bytes_done,
+            "chunks_done": self.chunks_done,
+            "embedding_tokens": self.embedding_tokens,
+            "elapsed": self.elapsed,
+            "files_per_second": self.files_per_second,
+            "bytes_per_second": self.bytes_per_second,
+            "chunks_per_second": self.chunks_per_second,
+            "tokens_per_second": self.tokens_per_second,
+            "stages": {name: s.to_dict() for name, s in self.stages.items()},
+            "parse_latency": {
+                name: h.to_dict() for name, h in self.parse_latency.items()
+            },
+            "failures_by_extension": dict(self.failures_by_extension),
+        }
+
+
+ProgressCallback = Callable[[IngestionMetrics], Awaitable[None] | None]
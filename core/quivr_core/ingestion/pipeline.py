@@ -0,0 +1,639 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable
+from uuid import UUID
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from pydantic import BaseModel, Field, field_validator
+
+from quivr_core.embeddings.scheduler import (
+    EmbeddingScheduler,
+    EmbeddingSchedulerConfig,
+)
+from quivr_core.files.file import QuivrFile, load_qfile
+from quivr_core.ingestion.checkpoint import IngestionCheckpoint
+from quivr_core.ingestion.metrics import IngestionMetrics, ProgressCallback
+from quivr_core.processor.isolation import IsolatedProcessPool
+from quivr_core.processor.parse_cache import ParseCache
+from quivr_core.processor.pool import ProcessorPool
+from quivr_core.processor.processor_base import default_process_pool
+from quivr_core.processor.registry import get_processor_class
+from quivr_core.storage.storage_base import StorageBase
+from quivr_core.vectorstore.bm25 import BM25Index
+from quivr_core.vectorstore.index import (
+    VectorIndexConfig,
+    adelete_chunks,
+    is_faiss,
+    train_index,
+)
+
+logger = logging.getLogger("quivr_core")
+
+
+class PipelineConfig(BaseModel):
+    """
+    Concurrency settings of the ingestion pipeline.
+
+    Each stage runs `*_concurrency` workers. Stages are connected by bounded
+    queues of `queue_size` items: a slow stage blocks the upstream stages
+    instead of buffering the whole corpus in memory.
+
+    With `use_process_pool`, CPU bound processors parse files in a pool of
+    `parse_workers` processes (defaults to the number of cores) and the parse
+    stage runs at least one worker per process.
+
+    With `streaming`, processors supporting it yield chunks in batches of
+    `stream_batch_size` while the file is read: chunks are embedded before the
+    file is fully parsed and memory doesn't grow with the file size.
+
+    With `parse_timeout` or `parse_max_rss_mb`, CPU bound processors parse each
+    file in an isolated worker process (`IsolatedProcessPool`), killed if the
+    parse exceeds the limits. Other processors run in the event loop: they are
+    cancelled after `parse_timeout` of parsing, not counting the time streamed
+    chunks wait for the embed stage, and `parse_max_rss_mb` doesn't apply to them.
+    A file hitting a limit fails, and is skipped with `skip_file_error`. Streaming
+    is disabled for isolated processors.
+
+    `embedding_config` sets how chunks are batched and dispatched to the embedder.
+
+    `extra_hashes` are digests computed along SHA-1 when files are loaded, in the
+    same pass over the file, and stored as `file_<algorithm>` in their metadata.
+    """
+
+    load_concurrency: int = Field(default=16, ge=1)
+    upload_concurrency: int = Field(default=8, ge=1)
+    parse_concurrency: int = Field(default=4, ge=1)
+    embed_concurrency: int = Field(default=2, ge=1)
+    queue_size: int = Field(default=32, ge=1)
+    use_process_pool: bool = False
+    parse_workers: int | None = Field(default=None, ge=1)
+    streaming: bool = False
+    stream_batch_size: int = Field(default=64, ge=1)
+    parse_timeout: float | None = Field(default=None, gt=0)
+    parse_max_rss_mb: int | None = Field(default=None, ge=1)
+    embedding_config: EmbeddingSchedulerConfig = EmbeddingSchedulerConfig()
+    extra_hashes: tuple[str, ...] = ()
+
+    @field_validator("extra_hashes")
+    @classmethod
+    def _check_hashes(cls, extra_hashes: tuple[str, ...]) -> tuple[str, ...]:
+        for name in extra_hashes:
+            if name not in hashlib.algorithms_available:
+                raise ValueError(f"unknown hash algorithm: {name}")
+        return extra_hashes
+
+
+@dataclass
+class FileIngestionResult:
+    """Outcome of the ingestion of a single file."""
+
+    path: Path
+    file: QuivrFile | None = None
+    n_chunks: int = 0
+    chunk_ids: list[str] = field(default_factory=list)
+    error: BaseException | None = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+# Marks the end of a stage input. One is sent per downstream worker.
+_DONE = object()
+
+
+@dataclass
+class _FileState:
+    """Chunk batches of a file still to embed."""
+
+    pending: int = 0
+    parsed: bool = False
+
+
+class IngestionPipeline:
+    """
+    Staged, bounded-parallel ingestion of files into a brain.
+
+    Files flow through four stages, each with its own pool of workers:
+    * load: stat and hash the file (`load_qfile`).
+    * upload: store the file in the brain's storage.
+    * parse: find the file processor, parse and split the file into chunks.
+    * embed: embed the chunks and add them to the vector store.
+
+    Parsing of one file overlaps with the embedding of another. If no vector store
+    is provided, a default FAISS store is created from the first embedded chunks.
+    A file that fails, or that is not completed when the run fails, is removed from
+    the storage with its chunks.
+
+    Args:
+        brain_id (UUID): The brain the files are ingested in.
+        storage (StorageBase): The storage where the files are uploaded.
+        embedder (Embeddings): The embeddings used to index the chunks.
+        vector_db (VectorStore | None): The vector store receiving the chunks.
+        skip_file_error (bool): Whether to skip files that cannot be processed.
+        processor_kwargs (dict[str, Any] | None): Additional arguments for the processors.
+        config (PipelineConfig | None): Concurrency settings of the pipeline.
+        parse_cache (ParseCache | None): Cache of parsed chunks, files found in the
+            cache are not parsed again.
+        checkpoint (IngestionCheckpoint | None): Journal of the ingestion. Files completed
+            by a previous run with the same checkpoint are not ingested again.
+        progress_callback (ProgressCallback | None): Called with the live `metrics` of
+            the ingestion each time a file is ingested or fails. May be a coroutine.
+        processor_pool (ProcessorPool | None): Processors shared with other pipelines.
+            By default, each run builds its processors once and closes them at the end.
+        vector_index_config (VectorIndexConfig | None): Index type of the default FAISS
+            store. Its flat index is trained into the configured type once it holds
+            enough vectors.
+        sparse_index (BM25Index | None): BM25 index kept in sync with the chunks of
+            the vector store.
+        upload_exists_ok (bool): Whether files whose content is already in the
+            storage are uploaded anyway, instead of failing.
+    """
+
+    def __init__(
+        self,
+        *,
+        brain_id: UUID,
+        storage: StorageBase,
+        embedder: Embeddings,
+        vector_db: VectorStore | None = None,
+        skip_file_error: bool = False,
+        processor_kwargs: dict[str, Any] | None = None,
+        config: PipelineConfig | None = None,
+        parse_cache: ParseCache | None = None,
+        checkpoint: IngestionCheckpoint | None = None,
+        progress_callback: ProgressCallback | None = None,
+        processor_pool: ProcessorPool | None = None,
+        vector_index_config: VectorIndexConfig | None = None,
+        sparse_index: BM25Index | None = None,
+        upload_exists_ok: bool = False,
+    ):
+        self.brain_id = brain_id
+        self.storage = storage
+        self.embedder = embedder
+        self.vector_db = vector_db
+        self.skip_file_error = skip_file_error
+        self.processor_kwargs = processor_kwargs or {}
+        self.config = config or PipelineConfig()
+        self.parse_cache = parse_cache
+        self.checkpoint = checkpoint
+        self.progress_callback = progress_callback
+        self.vector_index_config = vector_index_config or VectorIndexConfig()
+        self.sparse_index = sparse_index
+        self.upload_exists_ok = upload_exists_ok
+        self._shared_pool = processor_pool
+        self._pool = processor_pool or ProcessorPool()
+        self.metrics = IngestionMetrics()
+        self.scheduler = EmbeddingScheduler(embedder, self.config.embedding_config)
+        self._executor: Executor | None = None
+        # Serializes the writes to the vector store with its checkpoint snapshots
+        self._vector_lock = asyncio.Lock()
+        self._files: dict[int, _FileState] = {}
+        # Files uploaded and not completed yet
+        self._uploaded: dict[int, FileIngestionResult] = {}
+
+    @property
+    def _isolated(self) -> bool:
+        """Whether CPU bound processors run in isolated, limited processes."""
+        cfg = self.config
+        return cfg.parse_timeout is not None or cfg.parse_max_rss_mb is not None
+
+    async def run(self, file_paths: list[str | Path]) -> list[FileIngestionResult]:
+        """
+        Ingest the files and return one result per file path, in input order.
+
+        Raises:
+            ValueError: If a file cannot be processed and skip_file_error is False.
+            Exception: If no processor is found for a file and skip_file_error is False.
+        """
+        results = [FileIngestionResult(path=Path(p)) for p in file_paths]
+        todo = results
+        if self.checkpoint is not None:
+            todo = await self._resume(results)
+        self.metrics = IngestionMetrics(files_total=len(todo))
+        if not todo:
+            return results
+
+        cfg = self.config
+        parse_concurrency = cfg.parse_concurrency
+        if cfg.use_process_pool or self._isolated:
+            n_workers = cfg.parse_workers or os.cpu_count() or 1
+            if self._isolated:
+                self._executor = IsolatedProcessPool(
+                    n_workers,
+                    timeout=cfg.parse_timeout,
+                    max_rss_bytes=cfg.parse_max_rss_mb * 2**20
+                    if cfg.parse_max_rss_mb is not None
+                    else None,
+                )
+            else:
+                self._executor = default_process_pool(n_workers)
+            parse_concurrency = max(parse_concurrency, n_workers)
+
+        load_q: asyncio.Queue = asyncio.Queue(maxsize=cfg.queue_size)
+        upload_q: asyncio.Queue = asyncio.Queue(maxsize=cfg.queue_size)
+        parse_q: asyncio.Queue = asyncio.Queue(maxsize=cfg.queue_size)
+        embed_q: asyncio.Queue = asyncio.Queue(maxsize=cfg.queue_size)
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._feed(todo, load_q, cfg.load_concurrency))
+                tg.create_task(
+                    self._stage(
+                        "load",
+                        self._load,
+                        cfg.load_concurrency,
+                        load_q,
+                        upload_q,
+                        cfg.upload_concurrency,
+                    )
+                )
+                tg.create_task(
+                    self._stage(
+                        "upload",
+                        self._upload,
+                        cfg.upload_concurrency,
+                        upload_q,
+                        parse_q,
+                        parse_concurrency,
+                    )
+                )
+                tg.create_task(
+                    self._stage(
+                        "parse",
+                        self._parse,
+                        parse_concurrency,
+                        parse_q,
+                        embed_q,
+                        cfg.embed_concurrency,
+                    )
+                )
+                tg.create_task(
+                    self._stage(
+                        "embed", self._embed, cfg.embed_concurrency, embed_q, None, 0
+                    )
+                )
+        except BaseExceptionGroup as eg:
+            await self._rollback()
+            # Surface the original error instead of the task group wrapper
+            raise _first_exception(eg) from None
+        finally:
+            if self._executor is not None:
+                # Workers are not waited for: a killed or hung parse can't block the loop
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._shared_pool is None:
+                await self._pool.aclose()
+            if self.checkpoint is not None:
+                # Keep the work done so far, even if the run failed
+                await asyncio.to_thread(self.checkpoint.flush, self.vector_db)
+
+        metrics = self.metrics
+        metrics.finished_at = time.monotonic()
+        logger.debug(
+            f"ingested {metrics.files_done} files ({metrics.files_failed} skipped) in brain {self.brain_id}: "
+            f"{metrics.files_per_second:.1f} files/s, {metrics.chunks_per_second:.1f} chunks/s, "
+            f"{metrics.tokens_per_second:.1f} tokens/s"
+        )
+        return results
+
+    async def _resume(
+        self, results: list[FileIngestionResult]
+    ) -> list[FileIngestionResult]:
+        """Restore the files completed by a previous run, return the files left to ingest."""
+        checkpoint = self.checkpoint
+        assert checkpoint is not None
+        checkpoint.start(self.brain_id)
+        if self.vector_db is None or is_faiss(self.vector_db):
+            vector_db = await asyncio.to_thread(
+                checkpoint.load_vector_db, self.embedder
+            )
+            if vector_db is not None:
+                self.vector_db = vector_db
+                if self.sparse_index is not None:
+                    # Chunks ingested by the previous run
+                    await asyncio.to_thread(
+                        self.sparse_index.update_from_faiss, vector_db
+                    )
+
+        # Chunks of files changed or no longer requested since they were checkpointed
+        wanted = {r.path.absolute() for r in results}
+        stale = [
+            record
+            for path, record in checkpoint.records.items()
+            if path not in wanted or not record.is_current()
+        ]
+        stale_ids = [i for record in stale for i in record.chunk_ids]
+        if stale_ids and self.vector_db is not None:
+            await self._delete_chunks(stale_ids)
+        checkpoint.forget([record.path for record in stale])
+
+        todo = []
+        for result in results:
+            record = checkpoint.records.get(result.path.absolute())
+            if record is None:
+                todo.append(result)
+                continue
+            record.file.path = record.path
+            await self.storage.upload_file(record.file, exists_ok=True)
+            result.file = record.file
+            result.chunk_ids = record.chunk_ids
+            result.n_chunks = len(record.chunk_ids)
+
+        logger.debug(
+            f"resuming ingestion of brain {self.brain_id}: {len(results) - len(todo)} files done, {len(todo)} left"
+        )
+        return todo
+
+    async def _feed(
+        self, results: list[FileIngestionResult], out_q: asyncio.Queue, n_workers: int
+    ):
+        for result in results:
+            await out_q.put(result)
+        for _ in range(n_workers):
+            await out_q.put(_DONE)
+
+    async def _stage(
+        self,
+        name: str,
+        fn: Callable[[Any], Awaitable[Any] | AsyncIterator[Any]],
+        n_workers: int,
+        in_q: asyncio.Queue,
+        out_q: asyncio.Queue | None,
+        n_downstream: int,
+    ):
+        stage_metrics = self.metrics.stage(name)
+        is_generator = inspect.isasyncgenfunction(fn)
+
+        async def worker():
+            while True:
+                item = await in_q.get()
+                if item is _DONE:
+                    return
+                stage_metrics.observe_queue(in_q.qsize())
+                if is_generator:
+                    await run_generator(item)
+                    continue
+                start = time.perf_counter()
+                try:
+                    out = await fn(item)  # type: ignore
+                except Exception:
+                    stage_metrics.observe(time.perf_counter() - start, error=True)
+                    raise
+                stage_metrics.observe(time.perf_counter() - start)
+                if out is not None and out_q is not None:
+                    await out_q.put(out)
+
+        async def run_generator(item):
+            # Time spent blocked on the downstream queue isn't counted as busy time
+            busy = 0.0
+            outputs = fn(item)
+            while True:
+                start = time.perf_counter()
+                try:
+                    out = await anext(outputs)  # type: ignore
+                except StopAsyncIteration:
+                    busy += time.perf_counter() - start
+                    break
+                except Exception:
+                    stage_metrics.observe(
+                        busy + time.perf_counter() - start, error=True
+                    )
+                    raise
+                busy += time.perf_counter() - start
+                if out_q is not None:
+                    await out_q.put(out)
+            stage_metrics.observe(busy)
+
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(n_workers):
+                tg.create_task(worker())
+
+        if out_q is not None:
+            for _ in range(n_downstream):
+                await out_q.put(_DONE)
+
+    async def _load(self, result: FileIngestionResult) -> FileIngestionResult:
+        result.file = await load_qfile(
+            self.brain_id, result.path, extra_hashes=self.config.extra_hashes
+        )
+        return result
+
+    async def _upload(self, result: FileIngestionResult) -> FileIngestionResult:
+        assert result.file is not None
+        await self.storage.upload_file(result.file, exists_ok=self.upload_exists_ok)
+        self._uploaded[id(result)] = result
+        return result
+
+    async def _parse(
+        self, result: FileIngestionResult
+    ) -> AsyncIterator[tuple[FileIngestionResult, list[Document]]]:
+        file = result.file
+        assert file is not None
+        state = self._files[id(result)] = _FileState()
+        try:
+            async for docs in self._process_file(file):
+                result.n_chunks += len(docs)
+                state.pending += 1
+                yield result, docs
+        except Exception as e:
+            if not self.skip_file_error:
+                raise
+            logger.error(f"skipping {file}: {e}")
+            result.error = e
+        state.parsed = True
+        if state.pending == 0:
+            await self._complete(result)
+
+    async def _process_file(self, file: QuivrFile) -> AsyncIterator[list[Document]]:
+        if not file.file_extension:
+            logger.error(f"can't find processor for {file}")
+            raise ValueError(f"can't parse {file}. can't find file extension")
+        try:
+            processor_cls = get_processor_class(file.file_extension)
+        except KeyError as e:
+            raise Exception(f"Can't parse {file}. No available processor") from e
+        logger.debug(f"processing {file} using class {processor_cls.__name__}")
+        processor = self._pool.get(processor_cls, **self.processor_kwargs)
+        start = time.perf_counter()
+        try:
+            if self.config.streaming and not (self._isolated and processor.cpu_bound):
+                stream = processor.stream_file(
+                    file,
+                    batch_size=self.config.stream_batch_size,
+                    executor=self._executor,
+                    cache=self.parse_cache,
+                )
+                async for docs in _timed_stream(stream, self.config.parse_timeout):
+                    yield docs
+            elif processor.cpu_bound or self.config.parse_timeout is None:
+                yield await processor.process_file(
+                    file, executor=self._executor, cache=self.parse_cache
+                )
+            else:
+                yield await asyncio.wait_for(
+                    processor.process_file(file, cache=self.parse_cache),
+                    self.config.parse_timeout,
+                )
+        finally:
+            self.metrics.observe_parse(
+                processor_cls.__name__, time.perf_counter() - start
+            )
+
+    async def _embed(self, item: tuple[FileIngestionResult, list[Document]]) -> None:
+        result, docs = item
+        await self._add_chunks(result, docs)
+        self.metrics.chunks_done += len(docs)
+        self.metrics.embedding_tokens += sum(self.scheduler.n_tokens(d) for d in docs)
+
+        state = self._files[id(result)]
+        state.pending -= 1
+        if state.parsed and state.pending == 0:
+            await self._complete(result)
+
+    async def _complete(self, result: FileIngestionResult):
+        """Account for a file once all its chunks are embedded, or it failed."""
+        del self._files[id(result)]
+        file = result.file
+        assert file is not None
+        metrics = self.metrics
+        if result.error is not None:
+            await self._discard(result)
+            metrics.observe_failure(str(file.file_extension))
+        else:
+            self._uploaded.pop(id(result), None)
+            metrics.files_done += 1
+            metrics.bytes_done += file.file_size or 0
+            if self.checkpoint is not None and result.chunk_ids:
+                await self._checkpoint(result)
+        await self._report()
+
+    async def _discard(self, result: FileIngestionResult):
+        """Remove a failed file from the storage, with the chunks it already added."""
+        if result.chunk_ids and self.vector_db is not None:
+            # Chunks of a file that failed while streaming
+            async with self._vector_lock:
+                await self._delete_chunks(result.chunk_ids)
+        result.chunk_ids = []
+        if self._uploaded.pop(id(result), None) is not None:
+            assert result.file is not None
+            try:
+                await self.storage.remove_file(result.file.id)
+            except FileNotFoundError:
+                pass
+
+    async def _rollback(self):
+        """Discard the files left incomplete by a failed run."""
+        for result in list(self._uploaded.values()):
+            try:
+                await self._discard(result)
+            except Exception as e:
+                logger.error(f"can't discard {result.file} of the failed run: {e}")
+
+    async def _checkpoint(self, result: FileIngestionResult):
+        checkpoint = self.checkpoint
+        assert checkpoint is not None and result.file is not None
+        checkpoint.add(result.path.absolute(), result.file, result.chunk_ids)
+        if not is_faiss(self.vector_db):
+            # The vector store persists its own state: commit right away
+            await asyncio.to_thread(checkpoint.flush, self.vector_db)
+        elif checkpoint.flush_due():
+            async with self._vector_lock:
+                await asyncio.to_thread(checkpoint.flush, self.vector_db)
+
+    async def _delete_chunks(self, ids: list[str]):
+        assert self.vector_db is not None
+        await adelete_chunks(self.vector_db, ids)
+        if self.sparse_index is not None:
+            self.sparse_index.delete(ids)
+
+    async def _add_chunks(self, result: FileIngestionResult, docs: list[Document]):
+        if not docs:
+            return
+        if self.vector_db is not None and not is_faiss(self.vector_db):
+            ids = await self.vector_db.aadd_documents(docs)
+            result.chunk_ids.extend(ids)
+            self._index_sparse(ids, docs)
+            return
+
+        vectors = await self.scheduler.aembed_documents(docs)
+        async with self._vector_lock:
+            if self.vector_db is None:
+                from quivr_core.brain.brain_defaults import (
+                    build_default_vectordb_from_embeddings,
+                )
+
+                self.vector_db = build_default_vectordb_from_embeddings(
+                    docs, vectors, self.embedder, self.vector_index_config
+                )
+                ids = list(self.vector_db.index_to_docstore_id.values())  # type: ignore
+                result.chunk_ids.extend(ids)
+                self._index_sparse(ids, docs)
+            else:
+                ids = self.vector_db.add_embeddings(  # type: ignore
+                    text_embeddings=zip([d.page_content for d in docs], vectors),
+                    metadatas=[d.metadata for d in docs],
+                )
+                result.chunk_ids.extend(ids)
+                self._index_sparse(ids, docs)
+                if self.vector_index_config.needs_training:
+                    await asyncio.to_thread(
+                        train_index,
+                        self.vector_db,  # type: ignore
+                        self.vector_index_config,
+                    )
+
+    def _index_sparse(self, ids: list[str], docs: list[Document]):
+        if self.sparse_index is not None:
+            self.sparse_index.add(ids, [d.page_content for d in docs])
+
+    async def _report(self):
+        if self.progress_callback is None:
+            return
+        ret = self.progress_callback(self.metrics)
+        if inspect.isawaitable(ret):
+            await ret
+
+
+def _first_exception(eg: BaseExceptionGroup) -> BaseException:
+    exc: BaseException = eg
+    while isinstance(exc, BaseExceptionGroup):
+        exc = exc.exceptions[0]
+    return exc
+
+
+async def _timed_stream(
+    stream: AsyncIterator[list[Document]], timeout: float | None
+) -> AsyncIterator[list[Document]]:
+    """
+    Yield the batches of `stream`, raising `TimeoutError` once waiting on it took
+    more than `timeout` seconds in total. Time spent by the consumer between
+    batches is not counted.
+    """
+    if timeout is None:
+        async for docs in stream:
+            yield docs
+        return
+    remaining = timeout
+    it = aiter(stream)
+    try:
+        while True:
+            start = time.monotonic()
+            async with asyncio.timeout(remaining):
+                try:
+                    docs = await anext(it)
+                except StopAsyncIteration:
+                    return
+            remaining -= time.monotonic() - start
+            yield docs
+    finally:
+        await it.aclose()  # type: ignore[attr-defined]
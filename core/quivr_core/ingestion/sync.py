@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from quivr_core.files.file import (
+    SOURCE_MTIME_KEY,
+    SOURCE_PATH_KEY,
+    QuivrFile,
+    hash_file,
+)
+from quivr_core.ingestion.pipeline import FileIngestionResult
+
+logger = logging.getLogger("quivr_core")
+
+
+@dataclass
+class DirectoryDiff:
+    """
+    Changes between a directory and the files of a brain loaded from it.
+
+    Attributes:
+        added (list[Path]): Files of the directory unknown to the brain.
+        modified (list[tuple[QuivrFile, Path]]): Brain files whose content changed, with
+            the path of their new version.
+        removed (list[QuivrFile]): Brain files no longer in the directory.
+        n_unchanged (int): Number of files left untouched.
+    """
+
+    added: list[Path] = field(default_factory=list)
+    modified: list[tuple[QuivrFile, Path]] = field(default_factory=list)
+    removed: list[QuivrFile] = field(default_factory=list)
+    n_unchanged: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+
+@dataclass
+class DirectorySyncResult:
+    """Outcome of the synchronization of a brain with a directory."""
+
+    added: list[FileIngestionResult] = field(default_factory=list)
+    updated: list[FileIngestionResult] = field(default_factory=list)
+    removed: list[QuivrFile] = field(default_factory=list)
+    n_unchanged: int = 0
+
+
+def scan_directory(
+    directory: Path, recursive: bool = True
+) -> dict[str, os.stat_result]:
+    """
+    List the regular files of a directory with their stat, skipping hidden entries.
+
+    Returns:
+        dict[str, os.stat_result]: The stat of each file, by absolute path.
+    """
+    files: dict[str, os.stat_result] = {}
+    stack = [Path(directory).absolute()]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(Path(entry.path))
+                elif entry.is_file():
+                    files[entry.path] = entry.stat()
+    return files
+
+
+async def diff_directory(
+    directory: str | Path,
+    files: list[QuivrFile],
+    recursive: bool = True,
+    hash_concurrency: int = 8,
+) -> DirectoryDiff:
+    """
+    Diff a directory against the brain files previously loaded from it.
+
+    Brain files are matched to the directory by their `source_path` metadata. A file
+    whose size and modification time did not change is unchanged. Otherwise, its
+    SHA-1 is computed to confirm the change: files only touched get their
+    modification time updated and are not re-indexed.
+
+    Args:
+        directory (str | Path): The directory to diff.
+        files (list[QuivrFile]): The files of the brain.
+        recursive (bool): Whether to scan sub directories.
+        hash_concurrency (int): Maximum number of files hashed at the same time.
+    Returns:
+        DirectoryDiff: The files to add, re-index and remove.
+    """
+    directory = Path(directory).absolute()
+    on_disk = await asyncio.to_thread(scan_directory, directory, recursive)
+
+    prefix = os.path.join(directory, "")
+    known: dict[str, QuivrFile] = {}
+    for file in files:
+        source_path = file.additional_metadata.get(SOURCE_PATH_KEY)
+        if source_path is None or not source_path.startswith(prefix):
+            continue
+        if not recursive and os.path.dirname(source_path) != str(directory):
+            continue
+        known[source_path] = file
+
+    diff = DirectoryDiff()
+    candidates: list[tuple[QuivrFile, str, os.stat_result]] = []
+    for path, stat in sorted(on_disk.items()):
+        known_file: QuivrFile | None = known.pop(path, None)
+        if known_file is None:
+            diff.added.append(Path(path))
+        elif (
+            stat.st_size == known_file.file_size
+            and stat.st_mtime_ns == known_file.additional_metadata.get(SOURCE_MTIME_KEY)
+        ):
+            diff.n_unchanged += 1
+        else:
+            candidates.append((known_file, path, stat))
+    diff.removed = list(known.values())
+
+    semaphore = asyncio.Semaphore(hash_concurrency)
+
+    async def confirm(
+        file: QuivrFile, path: str, stat: os.stat_result
+    ) -> tuple[QuivrFile, Path] | None:
+        if stat.st_size == file.file_size:
+            async with semaphore:
+                sha1 = (await asyncio.to_thread(hash_file, Path(path)))["sha1"]
+            if sha1 == file.file_sha1:
+                file.additional_metadata[SOURCE_MTIME_KEY] = stat.st_mtime_ns
+                return None
+        return file, Path(path)
+
+    confirmed = await asyncio.gather(*(confirm(*c) for c in candidates))
+    diff.modified = [m for m in confirmed if m is not None]
+    diff.n_unchanged += len(confirmed) - len(diff.modified)
+
+    logger.debug(
+        f"{directory}: {len(diff.added)} added, {len(diff.modified)} modified, "
+        f"{len(diff.removed)} removed, {diff.n_unchanged} unchanged"
+    )
+    return diff
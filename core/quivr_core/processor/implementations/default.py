@@ -1,7 +1,6 @@
 import logging
-from typing import Any, List, Type, TypeVar
+from typing import Any, AsyncIterator, List, Type, TypeVar
 
-import tiktoken
 from langchain_community.document_loaders import (
     BibtexLoader,
     CSVLoader,
@@ -19,11 +18,11 @@ from langchain_community.document_loaders import (
 from langchain_community.document_loaders.base import BaseLoader
 from langchain_community.document_loaders.text import TextLoader
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
+from langchain_text_splitters import TextSplitter
 
 from quivr_core.files.file import FileExtension, QuivrFile
 from quivr_core.processor.processor_base import ProcessorBase
-from quivr_core.processor.splitter import SplitterConfig
+from quivr_core.processor.splitter import SplitterConfig, default_text_splitter
 
 logger = logging.getLogger("quivr_core")
 
@@ -39,12 +38,16 @@ class ProcessorInit(ProcessorBase):
 # dynamically creates Processor classes. Maybe redo this for finer control over instanciation
 # processor classes are opaque as we don't know what params they would have -> not easy to have lsp completion
 def _build_processor(
-    cls_name: str, load_cls: Type[P], cls_extensions: List[FileExtension | str]
+    cls_name: str,
+    load_cls: Type[P],
+    cls_extensions: List[FileExtension | str],
+    lazy_loader: bool = False,
 ) -> Type[ProcessorInit]:
-    enc = tiktoken.get_encoding("cl100k_base")
-
     class _Processor(ProcessorBase):
         supported_extensions = cls_extensions
+        cpu_bound = True
+        # Only loaders yielding their documents one at a time gain from streaming
+        supports_streaming = lazy_loader
 
         def __init__(
             self,
@@ -60,11 +63,8 @@ def _build_processor(
             if splitter:
                 self.text_splitter = splitter
             else:
-                self.text_splitter = (
-                    RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-                        chunk_size=splitter_config.chunk_size,
-                        chunk_overlap=splitter_config.chunk_overlap,
-                    )
+                self.text_splitter = default_text_splitter(
+                    splitter_config.chunk_size, splitter_config.chunk_overlap
                 )
 
         @property
@@ -74,27 +74,42 @@ def _build_processor(
                 "splitter": self.splitter_config.model_dump(),
             }
 
-        async def process_file_inner(self, file: QuivrFile) -> list[Document]:
+        def _loader(self, file: QuivrFile) -> BaseLoader:
             if hasattr(self.loader_cls, "__init__"):
                 # NOTE: mypy can't correctly type this as BaseLoader doesn't have a constructor method
-                loader = self.loader_cls(file_path=str(file.path), **self.loader_kwargs)  # type: ignore
-            else:
-                loader = self.loader_cls()
+                return self.loader_cls(file_path=str(file.path), **self.loader_kwargs)  # type: ignore
+            return self.loader_cls()
 
-            documents = await loader.aload()
+        async def process_file_inner(self, file: QuivrFile) -> list[Document]:
+            documents = await self._loader(file).aload()
             docs = self.text_splitter.split_documents(documents)
 
+            # Loader metadata is dropped, `chunk_size` is set on the final content
             for doc in docs:
-                doc.metadata = {"chunk_size": len(enc.encode(doc.page_content))}
+                doc.metadata = {}
 
             return docs
 
-    return type(cls_name, (ProcessorInit,), dict(_Processor.__dict__))
+        async def stream_file_inner(self, file: QuivrFile) -> AsyncIterator[Document]:
+            # Documents are split one at a time as the loader yields them, e.g. CSV rows
+            async for document in self._loader(file).alazy_load():
+                for doc in self.text_splitter.split_documents([document]):
+                    doc.metadata = {}
+                    yield doc
+
+    # NOTE: qualname is set for the class to be picklable from its module
+    return type(
+        cls_name,
+        (ProcessorInit,),
+        {**_Processor.__dict__, "__qualname__": cls_name},
+    )
 
 
-CSVProcessor = _build_processor("CSVProcessor", CSVLoader, [FileExtension.csv])
+CSVProcessor = _build_processor(
+    "CSVProcessor", CSVLoader, [FileExtension.csv], lazy_loader=True
+)
 TikTokenTxtProcessor = _build_processor(
-    "TikTokenTxtProcessor", TextLoader, [FileExtension.txt]
+    "TikTokenTxtProcessor", TextLoader, [FileExtension.txt], lazy_loader=True
 )
 DOCXProcessor = _build_processor(
     "DOCXProcessor", Docx2txtLoader, [FileExtension.docx, FileExtension.doc]
@@ -1,8 +1,11 @@
+import asyncio
+import itertools
 import logging
+from collections import OrderedDict
+from typing import Callable
 
-import tiktoken
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
+from langchain_text_splitters import TextSplitter
 from megaparse_sdk.client import MegaParseNATSClient
 from megaparse_sdk.config import ClientNATSConfig
 
@@ -10,7 +13,7 @@ from quivr_core.config import MegaparseConfig
 from quivr_core.files.file import QuivrFile
 from quivr_core.processor.processor_base import ProcessorBase
 from quivr_core.processor.registry import FileExtension
-from quivr_core.processor.splitter import SplitterConfig
+from quivr_core.processor.splitter import SplitterConfig, default_text_splitter
 
 logger = logging.getLogger("quivr_core")
 
@@ -28,6 +31,20 @@ class MegaparseProcessor(ProcessorBase):
     pip install megaparse
     ```
 
+    The processor keeps `n_clients` connections to the MegaParse service open until
+    `aclose`, and sends at most `max_concurrent` files at the same time. Results
+    are cached by file SHA-1: a file already parsed, or being parsed, is never
+    sent again.
+
+    Args:
+        splitter (TextSplitter | None): Splitter of the parsed text.
+        splitter_config (SplitterConfig): Configuration of the default splitter.
+        megaparse_config (MegaparseConfig): Configuration of the parsing.
+        n_clients (int): Number of connections to the service.
+        max_concurrent (int): Maximum number of files being parsed.
+        result_cache_size (int): Number of parsed texts kept in memory.
+        client_factory (Callable[[], MegaParseNATSClient] | None): Builds the
+            clients, `MegaParseNATSClient(ClientNATSConfig())` by default.
     """
 
     supported_extensions = [
@@ -54,17 +71,32 @@ class MegaparseProcessor(ProcessorBase):
         splitter: TextSplitter | None = None,
         splitter_config: SplitterConfig = SplitterConfig(),
         megaparse_config: MegaparseConfig = MegaparseConfig(),
+        n_clients: int = 1,
+        max_concurrent: int = 8,
+        result_cache_size: int = 256,
+        client_factory: Callable[[], MegaParseNATSClient] | None = None,
     ) -> None:
-        self.enc = tiktoken.get_encoding("cl100k_base")
         self.splitter_config = splitter_config
         self.megaparse_config = megaparse_config
+        self.n_clients = n_clients
+        self.result_cache_size = result_cache_size
+        self._client_factory = client_factory or (
+            lambda: MegaParseNATSClient(ClientNATSConfig())
+        )
+
+        self._clients: list[MegaParseNATSClient] = []
+        self._next_client: itertools.cycle | None = None
+        self._connect_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # Parsed texts and parses in progress, by file SHA-1
+        self._results: OrderedDict[str, str] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future[str]] = {}
 
         if splitter:
             self.text_splitter = splitter
         else:
-            self.text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-                chunk_size=splitter_config.chunk_size,
-                chunk_overlap=splitter_config.chunk_overlap,
+            self.text_splitter = default_text_splitter(
+                splitter_config.chunk_size, splitter_config.chunk_overlap
             )
 
     @property
@@ -73,17 +105,66 @@ class MegaparseProcessor(ProcessorBase):
             "chunk_overlap": self.splitter_config.chunk_overlap,
         }
 
-    async def process_file_inner(self, file: QuivrFile) -> list[Document]:
-        logger.info(f"Uploading file {file.path} to MegaParse")
-        async with MegaParseNATSClient(ClientNATSConfig()) as client:
-            response = await client.parse_file(file=file.path)
+    async def _get_client(self) -> MegaParseNATSClient:
+        if self._next_client is None:
+            async with self._connect_lock:
+                if self._next_client is None:
+                    for _ in range(self.n_clients):
+                        client = self._client_factory()
+                        await client.__aenter__()
+                        self._clients.append(client)
+                    self._next_client = itertools.cycle(self._clients)
+        return next(self._next_client)
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, []
+        self._next_client = None
+        for client in clients:
+            await client.__aexit__()
+
+    async def _send(self, file: QuivrFile) -> str:
+        async with self._semaphore:
+            client = await self._get_client()
+            logger.info(f"Uploading file {file.path} to MegaParse")
+            return await client.parse_file(file=file.path)
+
+    async def parse(self, file: QuivrFile) -> str:
+        """Text of a file, parsed by the MegaParse service at most once per SHA-1."""
+        sha1 = file.file_sha1
+        if sha1 in self._results:
+            self._results.move_to_end(sha1)
+            logger.debug(f"megaparse result cache hit for {file}")
+            return self._results[sha1]
+        if sha1 in self._in_flight:
+            return await asyncio.shield(self._in_flight[sha1])
+
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._in_flight[sha1] = future
+        try:
+            text = await self._send(file)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Marks the exception retrieved when no other file waits for it
+            future.exception()
+            raise
+        else:
+            future.set_result(text)
+            self._results[sha1] = text
+            if len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+            return text
+        finally:
+            del self._in_flight[sha1]
 
+    async def process_file_inner(self, file: QuivrFile) -> list[Document]:
+        response = await self.parse(file)
         logger.info(f"File :  {response}")
         document = Document(
             page_content=response,
         )
 
         docs = self.text_splitter.split_documents([document])
-        for doc in docs:
-            doc.metadata = {"chunk_size": len(self.enc.encode(doc.page_content))}
         return docs
@@ -0,0 +1,141 @@
+import asyncio
+import bisect
+import logging
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+from pypdf import PdfReader
+
+from quivr_core.files.file import FileExtension, QuivrFile
+from quivr_core.processor.processor_base import ProcessorBase
+from quivr_core.processor.splitter import (
+    SplitterConfig,
+    count_tokens,
+    default_text_splitter,
+)
+
+logger = logging.getLogger("quivr_core")
+
+
+def count_pdf_pages(path: Path) -> int:
+    return len(PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: Path, start: int, end: int) -> list[str]:
+    """Text of the pages `start` (included) to `end` (excluded) of a PDF."""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() for i in range(start, end)]
+
+
+class PagedPDFProcessor(ProcessorBase):
+    """
+    PDF processor parsing page ranges in parallel.
+
+    With a process pool (`use_process_pool` in the ingestion pipeline), the PDF is
+    split in ranges of `pages_per_range` pages parsed by different workers, so
+    the parse time of a large PDF scales with the number of cores. The text of the
+    pages is then stitched back and split, each chunk gets the number of its
+    first page (`page`) and last page (`page_end`), starting at 1.
+
+    ## Installation
+    ```bash
+    pip install quivr-core[pdf]
+    ```
+
+    It is not the default PDF processor, register it to use it:
+    ```python
+    register_processor(FileExtension.pdf, PagedPDFProcessor, override=True)
+    ```
+    """
+
+    supported_extensions = [FileExtension.pdf]
+    cpu_bound = True
+
+    def __init__(
+        self,
+        splitter: TextSplitter | None = None,
+        splitter_config: SplitterConfig = SplitterConfig(),
+        pages_per_range: int = 16,
+    ) -> None:
+        assert pages_per_range > 0, "pages_per_range should be positive"
+        self.splitter_config = splitter_config
+        self.pages_per_range = pages_per_range
+
+        if splitter:
+            self.text_splitter = splitter
+        else:
+            self.text_splitter = default_text_splitter(
+                splitter_config.chunk_size, splitter_config.chunk_overlap
+            )
+
+    @property
+    def processor_metadata(self) -> dict[str, Any]:
+        return {
+            "processor_cls": "PagedPDFProcessor",
+            "splitter": self.splitter_config.model_dump(),
+        }
+
+    def page_ranges(self, n_pages: int) -> list[tuple[int, int]]:
+        return [
+            (start, min(start + self.pages_per_range, n_pages))
+            for start in range(0, n_pages, self.pages_per_range)
+        ]
+
+    def split_pages(self, pages: list[str]) -> list[Document]:
+        """Stitch the text of the pages and split it, tagging chunks with their pages."""
+        page_starts = []
+        offset = 0
+        for page in pages:
+            page_starts.append(offset)
+            offset += len(page) + 1
+        text = "\n".join(pages)
+
+        docs = []
+        search_from = 0
+        for chunk in self.text_splitter.split_text(text):
+            # Chunks are taken in order from the text, overlapping the previous one
+            index = text.find(chunk, search_from)
+            if index == -1:
+                index = search_from
+            search_from = index + 1
+            docs.append(
+                Document(
+                    page_content=chunk,
+                    metadata={
+                        "page": bisect.bisect_right(page_starts, index),
+                        "page_end": bisect.bisect_right(
+                            page_starts, index + max(len(chunk) - 1, 0)
+                        ),
+                    },
+                )
+            )
+        return docs
+
+    async def process_file_inner(self, file: QuivrFile) -> list[Document]:
+        n_pages = count_pdf_pages(file.path)
+        return self.split_pages(extract_pdf_pages(file.path, 0, n_pages))
+
+    async def _process_file_inner(
+        self, file: QuivrFile, executor: Executor | None
+    ) -> tuple[list[Document], list[int] | None]:
+        if executor is None:
+            return await self.process_file_inner(file), None
+
+        loop = asyncio.get_running_loop()
+        n_pages = await loop.run_in_executor(executor, count_pdf_pages, file.path)
+        ranges = self.page_ranges(n_pages)
+        logger.debug(f"parsing {file} in {len(ranges)} ranges of pages")
+        parts = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, extract_pdf_pages, file.path, start, end)
+                for start, end in ranges
+            )
+        )
+        docs = self.split_pages([page for part in parts for page in part])
+        token_counts = await loop.run_in_executor(
+            executor, count_tokens, [doc.page_content for doc in docs]
+        )
+        return docs, token_counts
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, AsyncIterator, Iterator
 
 import aiofiles
 from langchain_core.documents import Document
@@ -9,21 +9,34 @@ from quivr_core.processor.registry import FileExtension
 from quivr_core.processor.splitter import SplitterConfig
 
 
-def recursive_character_splitter(
-    doc: Document, chunk_size: int, chunk_overlap: int
-) -> list[Document]:
+def iter_character_chunks(
+    text: str, chunk_size: int, chunk_overlap: int
+) -> Iterator[str]:
+    """
+    Yield chunks of `chunk_size` characters, each starting `chunk_size - chunk_overlap`
+    characters after the previous one. The last chunk holds the remaining text.
+
+    Chunks are sliced by offset from the original text: linear time, and only one
+    chunk is materialized at a time.
+    """
     assert chunk_overlap < chunk_size, "chunk_overlap is greater than chunk_size"
 
-    if len(doc.page_content) <= chunk_size:
-        return [doc]
+    step = chunk_size - chunk_overlap
+    start = 0
+    while len(text) - start > chunk_size:
+        yield text[start : start + chunk_size]
+        start += step
+    yield text[start:]
 
-    chunk = Document(page_content=doc.page_content[:chunk_size], metadata=doc.metadata)
-    remaining = Document(
-        page_content=doc.page_content[chunk_size - chunk_overlap :],
-        metadata=doc.metadata,
-    )
 
-    return [chunk] + recursive_character_splitter(remaining, chunk_size, chunk_overlap)
+def recursive_character_splitter(
+    doc: Document, chunk_size: int, chunk_overlap: int
+) -> list[Document]:
+    # NOTE: kept under its historical name, the split is iterative
+    return [
+        Document(page_content=chunk, metadata=doc.metadata)
+        for chunk in iter_character_chunks(doc.page_content, chunk_size, chunk_overlap)
+    ]
 
 
 class SimpleTxtProcessor(ProcessorBase):
@@ -33,6 +46,10 @@ class SimpleTxtProcessor(ProcessorBase):
     """
 
     supported_extensions = [FileExtension.txt]
+    cpu_bound = True
+    supports_streaming = True
+    # Number of characters read at once when streaming
+    stream_block_size = 64 * 1024
 
     def __init__(
         self, splitter_config: SplitterConfig = SplitterConfig(), **kwargs
@@ -58,3 +75,28 @@ class SimpleTxtProcessor(ProcessorBase):
         )
 
         return docs
+
+    async def stream_file_inner(self, file: QuivrFile) -> AsyncIterator[Document]:
+        chunk_size = self.splitter_config.chunk_size
+        chunk_overlap = self.splitter_config.chunk_overlap
+        assert chunk_overlap < chunk_size, "chunk_overlap is greater than chunk_size"
+        step = chunk_size - chunk_overlap
+
+        # Same boundaries as `iter_character_chunks` on the whole text: a chunk is
+        # only cut once more than `chunk_size` characters remain or the file is read.
+        buffer = ""
+        start = 0
+        eof = False
+        async with aiofiles.open(file.path, mode="r") as f:
+            while True:
+                if len(buffer) - start > chunk_size:
+                    yield Document(page_content=buffer[start : start + chunk_size])
+                    start += step
+                elif not eof:
+                    block = await f.read(self.stream_block_size)
+                    eof = not block
+                    buffer = buffer[start:] + block
+                    start = 0
+                else:
+                    yield Document(page_content=buffer[start:])
+                    return
@@ -1,19 +1,190 @@
-import tiktoken
+import asyncio
 import logging
 import os
-from typing import AsyncIterable
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
 
 import httpx
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
+from langchain_text_splitters import TextSplitter
 
 from quivr_core.files.file import QuivrFile
 from quivr_core.processor.processor_base import ProcessorBase
 from quivr_core.processor.registry import FileExtension
-from quivr_core.processor.splitter import SplitterConfig
+from quivr_core.processor.splitter import SplitterConfig, default_text_splitter
 
 logger = logging.getLogger("quivr_core")
 
+# Errors of a request that won't succeed if retried
+_NON_RETRYABLE_ERRORS = (httpx.UnsupportedProtocol, httpx.InvalidURL)
+
+
+@dataclass
+class TikaRequestMetrics:
+    """Requests sent to a Tika server and their latency, retries included."""
+
+    n_requests: int = 0
+    n_retries: int = 0
+    n_failures: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.n_requests if self.n_requests else 0.0
+
+    def observe(self, seconds: float):
+        self.total_latency += seconds
+        self.max_latency = max(self.max_latency, seconds)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "n_requests": self.n_requests,
+            "n_retries": self.n_retries,
+            "n_failures": self.n_failures,
+            "mean_latency": self.mean_latency,
+            "max_latency": self.max_latency,
+        }
+
+
+class TikaClient:
+    """
+    Pooled HTTP client of a Tika server, to be shared by the processors sending files
+    to the same server.
+
+    At most `max_in_flight` files are parsed at the same time, over keep-alive
+    connections. Files are streamed to the server. Failed requests (connection
+    errors, 429 and 5xx responses) are retried with an exponential backoff with
+    full jitter.
+
+    Args:
+        tika_url (str): URL of the `/tika` endpoint.
+        max_in_flight (int): Maximum number of concurrent requests.
+        timeout (float): Timeout in seconds of a request for an empty file.
+        timeout_per_mb (float): Seconds added to the read and write timeouts per MB
+            of the file.
+        max_retries (int): Maximum number of attempts of a request.
+        backoff_base (float): Maximum delay in seconds before the first retry,
+            doubled on each retry.
+        backoff_max (float): Maximum delay in seconds between two attempts.
+        block_size (int): Size in bytes of the blocks of the streamed files.
+        transport (httpx.AsyncBaseTransport | None): Transport of the HTTP client.
+        on_request (Callable[[float], None] | None): Called with the latency in
+            seconds of each request, e.g. `LatencyHistogram.observe` to record
+            them in the ingestion metrics.
+    """
+
+    def __init__(
+        self,
+        tika_url: str = os.getenv("TIKA_SERVER_URL", "http://localhost:9998/tika"),
+        max_in_flight: int = 4,
+        timeout: float = 5.0,
+        timeout_per_mb: float = 2.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        block_size: int = 64 * 1024,
+        transport: httpx.AsyncBaseTransport | None = None,
+        on_request: Callable[[float], None] | None = None,
+    ):
+        self.tika_url = tika_url
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.timeout_per_mb = timeout_per_mb
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.block_size = block_size
+        self.metrics = TikaRequestMetrics()
+        self.on_request = on_request
+
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=max_in_flight,
+            ),
+            transport=transport,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"TikaClient(tika_url={self.tika_url}, max_in_flight={self.max_in_flight})"
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def request_timeout(self, file_size: int | None) -> httpx.Timeout:
+        """Timeouts of a request, the transfer and parse timeouts grow with the file size."""
+        transfer = self.timeout + self.timeout_per_mb * (file_size or 0) / 2**20
+        return httpx.Timeout(self.timeout, read=transfer, write=transfer)
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before the given retry, with full jitter."""
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        )
+
+    async def _stream(self, file: QuivrFile) -> AsyncIterator[bytes]:
+        async with file.open() as f:
+            while block := await f.read(self.block_size):  # type: ignore
+                yield block
+
+    async def parse(self, file: QuivrFile) -> str:
+        """
+        Send a file to the Tika server and return its text.
+
+        Raises:
+            RuntimeError: The request failed after `max_retries` attempts, or with
+                an error that can't be retried.
+        """
+        headers = {"Accept": "text/plain"}
+        timeout = self.request_timeout(file.file_size)
+        error: Exception | None = None
+        for attempt in range(self.max_retries):
+            if attempt:
+                self.metrics.n_retries += 1
+                delay = self.backoff(attempt)
+                logger.debug(
+                    f"tika error: {error}. retrying {file} in {delay:.2f}s ({attempt}/{self.max_retries - 1})"
+                )
+                await asyncio.sleep(delay)
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    self.metrics.n_requests += 1
+                    resp = await self._client.put(
+                        self.tika_url,
+                        headers=headers,
+                        content=self._stream(file),
+                        timeout=timeout,
+                    )
+                    resp.raise_for_status()
+                    return resp.content.decode("utf-8")
+                except _NON_RETRYABLE_ERRORS as e:
+                    error = e
+                    break
+                except httpx.HTTPStatusError as e:
+                    error = e
+                    status = e.response.status_code
+                    if status < 500 and status != 429:
+                        break
+                except httpx.TransportError as e:
+                    error = e
+                finally:
+                    latency = time.perf_counter() - start
+                    self.metrics.observe(latency)
+                    if self.on_request is not None:
+                        self.on_request(latency)
+
+        self.metrics.n_failures += 1
+        raise RuntimeError(
+            f"can't send parse request to tika server: {error}"
+        ) from error
+
 
 class TikaProcessor(ProcessorBase):
     """
@@ -24,6 +195,9 @@ class TikaProcessor(ProcessorBase):
     ```bash
     docker run -d -p 9998:9998 apache/tika
     ```
+
+    Processors can share a `TikaClient`, to bound the load on one Tika server.
+    Without a client, the processor creates its own and closes it in `aclose`.
     """
 
     supported_extensions = [FileExtension.pdf]
@@ -35,34 +209,37 @@ class TikaProcessor(ProcessorBase):
         splitter_config: SplitterConfig = SplitterConfig(),
         timeout: float = 5.0,
         max_retries: int = 3,
+        max_in_flight: int = 4,
+        client: TikaClient | None = None,
     ) -> None:
-        self.tika_url = tika_url
-        self.max_retries = max_retries
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self._owns_client = client is None
+        if client is None:
+            client = TikaClient(
+                tika_url,
+                max_in_flight=max_in_flight,
+                timeout=timeout,
+                max_retries=max_retries,
+            )
+        self.client = client
+        self.tika_url = client.tika_url
+        self.max_retries = client.max_retries
 
-        self.enc = tiktoken.get_encoding("cl100k_base")
         self.splitter_config = splitter_config
 
         if splitter:
             self.text_splitter = splitter
         else:
-            self.text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-                chunk_size=splitter_config.chunk_size,
-                chunk_overlap=splitter_config.chunk_overlap,
+            self.text_splitter = default_text_splitter(
+                splitter_config.chunk_size, splitter_config.chunk_overlap
             )
 
-    async def _send_parse_tika(self, f: AsyncIterable[bytes]) -> str:
-        retry = 0
-        headers = {"Accept": "text/plain"}
-        while retry < self.max_retries:
-            try:
-                resp = await self._client.put(self.tika_url, headers=headers, content=f)
-                resp.raise_for_status()
-                return resp.content.decode("utf-8")
-            except Exception as e:
-                retry += 1
-                logger.debug(f"tika url error :{e}. retrying for the {retry} time...")
-        raise RuntimeError("can't send parse request to tika server")
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+
+    @property
+    def request_metrics(self) -> TikaRequestMetrics:
+        return self.client.metrics
 
     @property
     def processor_metadata(self):
@@ -71,11 +248,8 @@ class TikaProcessor(ProcessorBase):
         }
 
     async def process_file_inner(self, file: QuivrFile) -> list[Document]:
-        async with file.open() as f:
-            txt = await self._send_parse_tika(f)
+        txt = await self.client.parse(file)
         document = Document(page_content=txt)
         docs = self.text_splitter.split_documents([document])
-        for doc in docs:
-            doc.metadata = {"chunk_size": len(self.enc.encode(doc.page_content))}
 
         return docs
@@ -0,0 +1,237 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from multiprocessing.connection import Connection
+from multiprocessing.context import BaseContext
+from typing import Any, Callable
+
+logger = logging.getLogger("quivr_core")
+
+
+class IsolatedTaskError(RuntimeError):
+    """A task was killed with its worker process, or the worker died running it."""
+
+
+class TaskTimeoutError(IsolatedTaskError):
+    pass
+
+
+class TaskMemoryError(IsolatedTaskError):
+    pass
+
+
+def _rss_bytes(pid: int) -> int | None:
+    """Resident memory of a process, None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _worker_main(conn: Connection):
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        except Exception as e:
+            # Task that can't be unpickled in the worker
+            conn.send(("started", None))
+            conn.send(("error", e))
+            continue
+        if task is None:
+            return
+        fn, args, kwargs = task
+        # Limits apply from here, not to the start of the worker and the imports
+        conn.send(("started", None))
+        try:
+            result = ("ok", fn(*args, **kwargs))
+        except BaseException as e:
+            result = ("error", e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # Result or exception that can't be pickled
+            conn.send(("error", RuntimeError(f"can't send task result: {e}")))
+
+
+class _Worker:
+    def __init__(self, mp_context: BaseContext):
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(  # type: ignore
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class IsolatedProcessPool(Executor):
+    """
+    Process pool running each task under a wall-clock timeout and a memory cap.
+
+    Each worker process runs one task at a time and is watched by a thread of the
+    parent. A task running longer than `timeout` seconds, or whose worker exceeds
+    `max_rss_bytes` of resident memory, gets its worker killed: its future fails
+    with `TaskTimeoutError` or `TaskMemoryError`, and a fresh worker takes the
+    next task. A worker dying on its own (e.g. segfault, OOM killer) fails its
+    task with `IsolatedTaskError`. Other tasks are not affected.
+
+    Memory is sampled every `poll_interval` seconds from /proc: it is not enforced
+    on platforms without /proc, and a spike shorter than the interval may go
+    unnoticed.
+
+    Args:
+        max_workers (int | None): Number of worker processes, defaults to the
+            number of cores.
+        timeout (float | None): Maximum duration of a task, in seconds.
+        max_rss_bytes (int | None): Maximum resident memory of a worker.
+        poll_interval (float): Seconds between two checks of a running task.
+        mp_context (BaseContext | None): Multiprocessing context, `spawn` by default.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        timeout: float | None = None,
+        max_rss_bytes: int | None = None,
+        poll_interval: float = 0.05,
+        mp_context: BaseContext | None = None,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_rss_bytes = max_rss_bytes
+        self.poll_interval = poll_interval
+        self._mp_context = mp_context or multiprocessing.get_context("spawn")
+        self._tasks: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+        if max_rss_bytes is not None and _rss_bytes(os.getpid()) is None:
+            logger.warning("memory of worker processes can't be read, no RSS cap")
+
+    def __repr__(self) -> str:
+        return f"IsolatedProcessPool(max_workers={self.max_workers}, timeout={self.timeout}, max_rss_bytes={self.max_rss_bytes})"
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if not self._threads:
+                for i in range(self.max_workers):
+                    thread = threading.Thread(
+                        target=self._run_worker,
+                        name=f"isolated-worker-{i}",
+                        daemon=True,
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+            future: Future = Future()
+            self._tasks.put((future, fn, args, kwargs))
+            return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        task = self._tasks.get_nowait()
+                    except queue.Empty:
+                        break
+                    if task is not None:
+                        task[0].cancel()
+            for _ in self._threads:
+                self._tasks.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _run_worker(self):
+        worker: _Worker | None = None
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    return
+                future, fn, args, kwargs = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if worker is None:
+                    worker = _Worker(self._mp_context)
+                try:
+                    worker = self._send(worker, (fn, args, kwargs))
+                    result = self._run_task(worker)
+                except IsolatedTaskError as e:
+                    logger.warning(f"killed worker process {worker.process.pid}: {e}")
+                    worker.kill()
+                    worker = None
+                    future.set_exception(e)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            if worker is not None:
+                worker.stop()
+
+    def _send(self, worker: _Worker, task: tuple) -> _Worker:
+        """Send a task to a worker, or to a fresh one if the worker is gone."""
+        try:
+            worker.conn.send(task)
+        except OSError as e:
+            # The worker died between two tasks, the task never reached it
+            logger.warning(
+                f"worker process {worker.process.pid} is gone ({e}), replacing it"
+            )
+            worker.kill()
+            worker = _Worker(self._mp_context)
+            worker.conn.send(task)
+        return worker
+
+    def _run_task(self, worker: _Worker) -> Any:
+        self._receive(worker)
+        start = time.monotonic()
+        while not worker.conn.poll(self.poll_interval):
+            if not worker.process.is_alive():
+                break
+            if self.timeout is not None and time.monotonic() - start > self.timeout:
+                raise TaskTimeoutError(f"task took more than {self.timeout}s")
+            if self.max_rss_bytes is not None:
+                rss = _rss_bytes(worker.process.pid)  # type: ignore
+                if rss is not None and rss > self.max_rss_bytes:
+                    raise TaskMemoryError(
+                        f"worker memory {rss} bytes exceeds the {self.max_rss_bytes} bytes cap"
+                    )
+        status, value = self._receive(worker)
+        if status == "error":
+            raise value
+        return value
+
+    def _receive(self, worker: _Worker) -> tuple[str, Any]:
+        try:
+            return worker.conn.recv()
+        except EOFError:
+            worker.process.join()
+            raise IsolatedTaskError(
+                f"worker process died with exit code {worker.process.exitcode}"
+            ) from None
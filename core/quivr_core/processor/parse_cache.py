@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pickle
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from uuid import uuid4
+
+from langchain_core.documents import Document
+
+from quivr_core.files.file import QuivrFile
+from quivr_core.processor.processor_base import quivr_core_version
+
+if TYPE_CHECKING:
+    from quivr_core.processor.processor_base import ProcessorBase
+
+logger = logging.getLogger("quivr_core")
+
+
+@dataclass
+class ParseCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ParseCache:
+    """
+    Content addressed on-disk cache of the chunks produced by processors.
+
+    Entries are keyed by the file SHA-1, the processor class, its configuration
+    (`processor_metadata` and splitter config) and the quivr-core version, so a file
+    is only parsed again when its content or the way it is parsed changes.
+    The raw output of `process_file_inner` is cached: file level metadata are
+    applied on each hit, so the same content can be shared by different files and brains.
+
+    Each entry is a zlib compressed pickle of `(page_content, metadata)` tuples,
+    stored under `<cache_dir>/<key[:2]>/<key>.bin`.
+
+    Args:
+        cache_dir (Path | None): Directory of the cache. Defaults to the environment
+            variable `QUIVR_PARSE_CACHE` or `~/.cache/quivr/parse`.
+    """
+
+    def __init__(self, cache_dir: Path | None = None):
+        if cache_dir is None:
+            cache_dir = Path(os.getenv("QUIVR_PARSE_CACHE", "~/.cache/quivr/parse"))
+        self.cache_dir = Path(cache_dir).expanduser()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.stats = ParseCacheStats()
+
+        self._version = quivr_core_version()
+
+    def __repr__(self) -> str:
+        return f"ParseCache(cache_dir={self.cache_dir}, hits={self.stats.hits}, misses={self.stats.misses})"
+
+    def key(self, file: QuivrFile, processor: "ProcessorBase") -> str:
+        processor_cls = type(processor)
+        splitter_config = getattr(processor, "splitter_config", None)
+        payload = {
+            "file_sha1": file.file_sha1,
+            "processor_cls": f"{processor_cls.__module__}.{processor_cls.__qualname__}",
+            "processor_metadata": processor.processor_metadata,
+            "splitter_config": splitter_config.model_dump()
+            if splitter_config is not None
+            else None,
+            "quivr_core_version": self._version,
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.bin"
+
+    async def get(self, key: str) -> list[Document] | None:
+        chunks = await asyncio.to_thread(self._read, key)
+        if chunks is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return [Document(page_content=c, metadata=m) for c, m in chunks]
+
+    async def put(self, key: str, docs: list[Document]):
+        chunks = [(doc.page_content, doc.metadata) for doc in docs]
+        await asyncio.to_thread(self._write, key, chunks)
+
+    def _read(self, key: str) -> list[tuple[str, dict[str, Any]]] | None:
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"ignoring corrupted parse cache entry {key}: {e}")
+            return None
+
+    def _write(self, key: str, chunks: list[tuple[str, dict[str, Any]]]):
+        path = self._path(key)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(f".{uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(pickle.dumps(chunks, protocol=5)))
+        # Atomic: concurrent readers never see a partial entry
+        os.replace(tmp_path, path)
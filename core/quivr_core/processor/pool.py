@@ -0,0 +1,69 @@
+import logging
+import pickle
+from typing import Any, Hashable
+
+from quivr_core.processor.processor_base import ProcessorBase
+
+logger = logging.getLogger("quivr_core")
+
+
+def processor_key(cls: type[ProcessorBase], kwargs: dict[str, Any]) -> Hashable:
+    """
+    Key of a processor configuration. Arguments are compared by value when they
+    can be pickled, by identity otherwise (e.g. a custom splitter instance).
+    """
+    try:
+        return (cls, pickle.dumps(sorted(kwargs.items())))
+    except Exception:
+        return (cls, tuple(sorted((k, id(v)) for k, v in kwargs.items())))
+
+
+class ProcessorPool:
+    """
+    Processors shared across files, one instance per (class, arguments).
+
+    Building a processor loads splitters, tokenizers or HTTP clients. The pool builds
+    each configuration once and closes the processors with `aclose`.
+
+    Example:
+    ```python
+    async with ProcessorPool() as pool:
+        for file in files:
+            processor = pool.get(get_processor_class(file.file_extension))
+            docs = await processor.process_file(file)
+    ```
+    """
+
+    def __init__(self):
+        self._processors: dict[Hashable, ProcessorBase] = {}
+        # Arguments compared by identity are kept alive with their processor
+        self._kwargs: dict[Hashable, dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._processors)
+
+    def get(self, cls: type[ProcessorBase], **kwargs: Any) -> ProcessorBase:
+        key = processor_key(cls, kwargs)
+        processor = self._processors.get(key)
+        if processor is None:
+            logger.debug(f"building processor {cls.__name__}")
+            processor = cls(**kwargs)
+            self._processors[key] = processor
+            self._kwargs[key] = kwargs
+        return processor
+
+    async def aclose(self):
+        processors = list(self._processors.values())
+        self._processors.clear()
+        self._kwargs.clear()
+        for processor in processors:
+            try:
+                await processor.aclose()
+            except Exception as e:
+                logger.warning(f"error closing processor {processor}: {e}")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
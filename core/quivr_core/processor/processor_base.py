@@ -1,20 +1,62 @@
+import asyncio
 import logging
+import multiprocessing
+import os
+import pickle
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
 from importlib.metadata import PackageNotFoundError, version
-from typing import Any
+from typing import TYPE_CHECKING, Any, AsyncIterator, Self
 
 from langchain_core.documents import Document
 
 from quivr_core.files.file import FileExtension, QuivrFile
+from quivr_core.processor.splitter import count_tokens
+
+if TYPE_CHECKING:
+    from quivr_core.processor.parse_cache import ParseCache
 
 logger = logging.getLogger("quivr_core")
 
 
-# TODO: processors should be cached somewhere ?
-# The processor should be cached by processor type
-# The cache should use a single
+@lru_cache(maxsize=None)
+def quivr_core_version() -> str:
+    """Installed version of quivr-core, `dev` when running from sources."""
+    try:
+        return version("quivr-core")
+    except PackageNotFoundError:
+        return "dev"
+
+
+def _sanitize(text: str) -> str:
+    """Remove NUL characters and replace lone surrogates, which can't be stored."""
+    if "\u0000" in text:
+        text = text.replace("\u0000", "")
+    # ASCII text has no surrogates, skip the encode/decode round trip
+    if not text.isascii():
+        text = text.encode("utf-8", "replace").decode("utf-8")
+    return text
+
+
 class ProcessorBase(ABC):
     supported_extensions: list[FileExtension | str]
+    # CPU bound processors can run `process_file_inner` in a process pool
+    cpu_bound: bool = False
+    # Streaming processors implement `stream_file_inner`
+    supports_streaming: bool = False
+    # Constructor arguments, set by `__new__`
+    _init_args: tuple[tuple, dict]
+
+    def __new__(cls, *args, **kwargs) -> Self:
+        # Keep the constructor arguments to rebuild the processor in worker processes
+        instance = super().__new__(cls)
+        instance._init_args = (args, kwargs)
+        return instance
+
+    def __reduce__(self):
+        args, kwargs = self._init_args
+        return (_build_worker_processor, (type(self), args, kwargs))
 
     def check_supported(self, file: QuivrFile):
         if file.file_extension not in self.supported_extensions:
@@ -25,31 +67,208 @@ class ProcessorBase(ABC):
     def processor_metadata(self) -> dict[str, Any]:
         raise NotImplementedError
 
-    async def process_file(self, file: QuivrFile) -> list[Document]:
+    async def process_file(
+        self,
+        file: QuivrFile,
+        executor: Executor | None = None,
+        cache: "ParseCache | None" = None,
+    ) -> list[Document]:
+        """
+        Parse and split a file into chunks.
+
+        Args:
+            file (QuivrFile): The file to process.
+            executor (Executor | None): Process pool used to run `process_file_inner`
+                of CPU bound processors. Other processors run in the event loop.
+            cache (ParseCache | None): Cache of parsed chunks. On a hit the file
+                isn't parsed again.
+        Returns:
+            list[Document]: The chunks of the file.
+        """
         logger.debug(f"Processing file {file}")
         self.check_supported(file)
-        docs = await self.process_file_inner(file)
-        try:
-            qvr_version = version("quivr-core")
-        except PackageNotFoundError:
-            qvr_version = "dev"
+        token_counts = None
+        if cache is None:
+            docs, token_counts = await self._process_file_inner(file, executor)
+        else:
+            key = cache.key(file, self)
+            cached_docs = await cache.get(key)
+            if cached_docs is None:
+                docs, token_counts = await self._process_file_inner(file, executor)
+                await cache.put(key, docs)
+            else:
+                logger.debug(f"parse cache hit for {file}")
+                docs = cached_docs
+        await self._apostprocess(file, docs, token_counts=token_counts)
+        return docs
+
+    async def stream_file(
+        self,
+        file: QuivrFile,
+        batch_size: int = 64,
+        executor: Executor | None = None,
+        cache: "ParseCache | None" = None,
+    ) -> AsyncIterator[list[Document]]:
+        """
+        Parse and split a file, yielding its chunks in batches of `batch_size` as
+        they are produced. Streaming processors never hold the whole file in
+        memory and bypass the parse cache. Other processors yield all the chunks
+        of the file in one batch, as returned by `process_file`.
+
+        Args:
+            file (QuivrFile): The file to process.
+            batch_size (int): Number of chunks per batch.
+            executor (Executor | None): Process pool of non streaming CPU bound processors.
+            cache (ParseCache | None): Cache of parsed chunks of non streaming processors.
+        Yields:
+            list[Document]: The next chunks of the file.
+        """
+        if not self.supports_streaming:
+            yield await self.process_file(file, executor=executor, cache=cache)
+            return
+
+        logger.debug(f"Streaming file {file}")
+        self.check_supported(file)
+        batch: list[Document] = []
+        start = 1
+        async for doc in self.stream_file_inner(file):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                await self._apostprocess(file, batch, start)
+                yield batch
+                start += len(batch)
+                batch = []
+        if batch:
+            await self._apostprocess(file, batch, start)
+            yield batch
+
+    async def _apostprocess(
+        self,
+        file: QuivrFile,
+        docs: list[Document],
+        start: int = 1,
+        token_counts: list[int] | None = None,
+    ):
+        if token_counts is None:
+            # Chunks are counted once, on their final content. tiktoken releases
+            # the GIL: counted in a thread, off the event loop
+            await asyncio.to_thread(self._postprocess, file, docs, start)
+        else:
+            self._postprocess(file, docs, start, token_counts)
+
+    def _postprocess(
+        self,
+        file: QuivrFile,
+        docs: list[Document],
+        start: int = 1,
+        token_counts: list[int] | None = None,
+    ):
+        """
+        Finalize the content and metadata of chunks. `chunk_size` is the token count
+        of the final content: `token_counts` of the content as produced by the
+        processor are reused, only chunks whose content changes here are counted.
+        """
+        # Resolved once per batch, merged into each chunk's metadata
+        base_metadata = {"quivr_core_version": quivr_core_version(), **file.metadata}
+        processor_metadata = self.processor_metadata
+        shared_metadata = {**base_metadata, **processor_metadata}
 
-        for idx, doc in enumerate(docs, start=1):
+        counts = token_counts or [-1] * len(docs)
+        changed = []
+        for i, doc in enumerate(docs):
+            content = doc.page_content
             if "original_file_name" in doc.metadata:
-                doc.page_content = f"Filename: {doc.metadata['original_file_name']} Content: {doc.page_content}"
-            doc.page_content = doc.page_content.replace("\u0000", "")
-            doc.page_content = doc.page_content.encode("utf-8", "replace").decode(
-                "utf-8"
+                content = (
+                    f"Filename: {doc.metadata['original_file_name']} Content: {content}"
+                )
+            content = _sanitize(content)
+            if token_counts is None or content != doc.page_content:
+                changed.append(i)
+            doc.page_content = content
+        if changed:
+            # Batched pass over the chunks whose content changed
+            for i, n in zip(
+                changed, count_tokens([docs[i].page_content for i in changed])
+            ):
+                counts[i] = n
+
+        for idx, (doc, n_tokens) in enumerate(zip(docs, counts, strict=True), start):
+            if doc.metadata:
+                doc.metadata = {
+                    "chunk_index": idx,
+                    **base_metadata,
+                    **doc.metadata,
+                    **processor_metadata,
+                    "chunk_size": n_tokens,
+                }
+            else:
+                doc.metadata = {
+                    "chunk_index": idx,
+                    **shared_metadata,
+                    "chunk_size": n_tokens,
+                }
+
+    async def _process_file_inner(
+        self, file: QuivrFile, executor: Executor | None
+    ) -> tuple[list[Document], list[int] | None]:
+        """
+        Run `process_file_inner`, in the process pool for CPU bound processors.
+        Returns the chunks with their token counts when they were counted by the
+        worker, None otherwise.
+        """
+        if executor is not None and self.cpu_bound:
+            loop = asyncio.get_running_loop()
+            chunks = await loop.run_in_executor(
+                executor, _process_file_inner_sync, self, file
             )
-            doc.metadata = {
-                "chunk_index": idx,
-                "quivr_core_version": qvr_version,
-                **file.metadata,
-                **doc.metadata,
-                **self.processor_metadata,
-            }
-        return docs
+            docs = [Document(page_content=c, metadata=m) for c, m, _ in chunks]
+            return docs, [n for _, _, n in chunks]
+        return await self.process_file_inner(file), None
 
     @abstractmethod
     async def process_file_inner(self, file: QuivrFile) -> list[Document]:
         raise NotImplementedError
+
+    async def stream_file_inner(self, file: QuivrFile) -> AsyncIterator[Document]:
+        """Yield the chunks of a file one by one, without post-processing."""
+        raise NotImplementedError
+        yield
+
+    async def aclose(self) -> None:
+        """Release the resources held by the processor, e.g. HTTP clients."""
+        pass
+
+
+def default_process_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """Process pool sized to the machine, for CPU bound processors."""
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+# Processors built in the current worker process, keyed by class and arguments
+_worker_processors: dict[tuple[type, bytes], ProcessorBase] = {}
+
+
+def _build_worker_processor(
+    cls: type[ProcessorBase], args: tuple, kwargs: dict[str, Any]
+) -> ProcessorBase:
+    # Processors are shipped with picklable arguments, compared by value
+    key = (cls, pickle.dumps((args, kwargs)))
+    if key not in _worker_processors:
+        _worker_processors[key] = cls(*args, **kwargs)
+    return _worker_processors[key]
+
+
+def _process_file_inner_sync(
+    processor: ProcessorBase, file: QuivrFile
+) -> list[tuple[str, dict[str, Any], int]]:
+    docs = asyncio.run(processor.process_file_inner(file))
+    # Chunks are tokenized in the worker, not in the parent's event loop
+    token_counts = count_tokens([doc.page_content for doc in docs])
+    # Documents are shipped back to the parent as plain tuples
+    return [
+        (doc.page_content, doc.metadata, n)
+        for doc, n in zip(docs, token_counts, strict=True)
+    ]
@@ -1,9 +1,11 @@
 import importlib
 import logging
+import threading
+import time
 import types
 from dataclasses import dataclass, field
 from heapq import heappop, heappush
-from typing import List, Type, TypeAlias
+from typing import Iterable, List, Type, TypeAlias
 
 from quivr_core.files.file import FileExtension
 
@@ -18,6 +20,12 @@ _registry: dict[str, Type[ProcessorBase]] = {}
 # external, read only. Contains the actual processors that we are imported and ready to use
 registry = types.MappingProxyType(_registry)
 
+# Extensions whose processor was resolved from `known_processors`, not registered
+_resolved: set[FileExtension | str] = set()
+# Processors whose import failed, by class path
+_import_errors: dict[str, ImportError] = {}
+_resolve_lock = threading.RLock()
+
 
 @dataclass(order=True)
 class ProcEntry:
@@ -148,33 +156,88 @@ def get_processor_class(file_extension: FileExtension | str) -> Type[ProcessorBa
     The dict ``known_processors`` maps file extensions to the locations
     of processors that could process them.
     Loading of these classes is *Lazy*. Appropriate import will happen
-    the first time we try to process some file type.
+    the first time we try to process some file type, or in `warmup`.
 
     Some processors need additional dependencies. If the import fails
     we return the "err" field of the ProcEntry in  ``known_processors``.
+
+    Resolution doesn't consume ``known_processors``: the resolved class is
+    cached in the registry, failed imports are not attempted again.
     """
 
     if file_extension not in registry:
         # Either you registered it from module or it's in the known processors
         if file_extension not in known_processors:
             raise ValueError(f"Extension not known: {file_extension}")
-        entries = known_processors[file_extension]
-        while entries:
-            proc_entry = heappop(entries)
-            try:
-                register_processor(file_extension, _import_class(proc_entry.cls_mod))
-                break
-            except ImportError:
-                logger.warn(
-                    f"{proc_entry.err}. Falling to the next available processor for {file_extension}"
-                )
-        if len(entries) == 0 and file_extension not in registry:
-            raise ImportError(f"can't find any processor for {file_extension}")
+        with _resolve_lock:
+            if file_extension not in registry:
+                _register_resolved(file_extension, _resolve(file_extension))
 
     cls = registry[file_extension]
     return cls
 
 
+def _resolve(file_extension: FileExtension | str) -> Type[ProcessorBase]:
+    # Entries by priority, as they would be popped from the heap
+    for proc_entry in sorted(known_processors[file_extension]):
+        if proc_entry.cls_mod in _import_errors:
+            continue
+        try:
+            return _import_class(proc_entry.cls_mod)
+        except ImportError as e:
+            _import_errors[proc_entry.cls_mod] = e
+            logger.warning(
+                f"{proc_entry.err}. Falling to the next available processor for {file_extension}"
+            )
+    raise ImportError(f"can't find any processor for {file_extension}")
+
+
+def _register_resolved(file_extension: FileExtension | str, cls: Type[ProcessorBase]):
+    _registry[file_extension] = cls
+    _resolved.add(file_extension)
+
+
+def warmup(
+    extensions: Iterable[FileExtension | str] | None = None,
+) -> dict[FileExtension | str, Type[ProcessorBase] | None]:
+    """
+    Resolve and import the processors of the extensions ahead of their first file,
+    along with the shared tokenizer.
+
+    Args:
+        extensions (Iterable[FileExtension | str] | None): Extensions to resolve,
+            all the known extensions by default.
+    Returns:
+        dict[FileExtension | str, Type[ProcessorBase] | None]: The processor of each
+            extension, None if no processor could be imported.
+    """
+    from quivr_core.processor.splitter import get_tiktoken_encoding
+
+    start = time.perf_counter()
+    get_tiktoken_encoding()
+    processors: dict[FileExtension | str, Type[ProcessorBase] | None] = {}
+    for ext in list(known_processors) if extensions is None else extensions:
+        try:
+            processors[ext] = get_processor_class(ext)
+        except ImportError:
+            processors[ext] = None
+    logger.debug(
+        f"warmed up {len(processors)} processors in {time.perf_counter() - start:.2f}s"
+    )
+    return processors
+
+
+def warmup_in_background(
+    extensions: Iterable[FileExtension | str] | None = None,
+) -> threading.Thread:
+    """Run `warmup` in a daemon thread, e.g. at the start of a server."""
+    thread = threading.Thread(
+        target=warmup, args=(extensions,), name="quivr-processor-warmup", daemon=True
+    )
+    thread.start()
+    return thread
+
+
 def register_processor(
     file_ext: FileExtension | str,
     proc_cls: str | Type[ProcessorBase],
@@ -190,15 +253,22 @@ def register_processor(
                     f"Processor for ({file_ext}) already in the registry and append is False"
                 )
         else:
-            if all(proc_cls != proc.cls_mod for proc in known_processors[file_ext]):
-                _append_proc_mapping(
-                    known_processors,
-                    file_exts=[file_ext],
-                    cls_mod=proc_cls,
-                    errtxt=errtxt
-                    or f"{proc_cls} import failed for processor of {file_ext}",
-                    priority=priority,
-                )
+            if all(
+                proc_cls != proc.cls_mod for proc in known_processors.get(file_ext, [])
+            ):
+                with _resolve_lock:
+                    _append_proc_mapping(
+                        known_processors,
+                        file_exts=[file_ext],
+                        cls_mod=proc_cls,
+                        errtxt=errtxt
+                        or f"{proc_cls} import failed for processor of {file_ext}",
+                        priority=priority,
+                    )
+                    # Resolve again with the new entry
+                    if file_ext in _resolved:
+                        _resolved.discard(file_ext)
+                        _registry.pop(file_ext, None)
             else:
                 logger.info(f"{proc_cls} already in registry...")
 
@@ -213,6 +283,7 @@ def register_processor(
                 )
         else:
             _registry[file_ext] = proc_cls
+            _resolved.discard(file_ext)
 
 
 def _import_class(full_mod_path: str):
@@ -1,3 +1,7 @@
+from functools import lru_cache
+
+import tiktoken
+from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
 from pydantic import BaseModel
 
 
@@ -11,3 +15,29 @@ class SplitterConfig(BaseModel):
 
     chunk_size: int = 400
     chunk_overlap: int = 100
+
+
+@lru_cache(maxsize=None)
+def get_tiktoken_encoding(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
+    """Shared tiktoken encoding, loaded once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(texts: list[str]) -> list[int]:
+    """
+    Token counts of texts, in one batched pass. Special tokens appearing in the
+    texts are counted as plain text.
+    """
+    return [len(ids) for ids in get_tiktoken_encoding().encode_ordinary_batch(texts)]
+
+
+@lru_cache(maxsize=32)
+def default_text_splitter(chunk_size: int, chunk_overlap: int) -> TextSplitter:
+    """
+    Shared token based splitter of the processors. Splitters are stateless, one
+    instance per configuration is reused by all the processors and files.
+    """
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
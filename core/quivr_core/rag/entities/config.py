@@ -14,6 +14,7 @@ from rapidfuzz import process, fuzz
 from quivr_core.base_config import QuivrBaseConfig
 from quivr_core.processor.splitter import SplitterConfig
 from quivr_core.rag.prompts import CustomPromptsModel
+from quivr_core.vectorstore.index import VectorIndexConfig
 from quivr_core.llm_tools.llm_tools import LLMToolFactory, TOOLS_CATEGORIES, TOOLS_LISTS
 
 logger = logging.getLogger("quivr_core")
@@ -230,7 +231,9 @@ class LLMEndpointConfig(QuivrBaseConfig):
 
         if not self.llm_api_key:
             logger.warning(f"The API key for supplier '{self.supplier}' is not set. ")
-            logger.warning(f"Please set the environment variable: '{self.env_variable_name}'. ")
+            logger.warning(
+                f"Please set the environment variable: '{self.env_variable_name}'. "
+            )
 
     def set_llm_model_config(self):
         # Automatically set context_length and tokenizer_hub based on the supplier and model
@@ -425,6 +428,18 @@ class WorkflowConfig(QuivrBaseConfig):
                         )
 
 
+class HybridSearchConfig(QuivrBaseConfig):
+    """
+    Hybrid retrieval: the dense ranking of the vector store and the BM25 ranking
+    of the chunks are fused with Reciprocal Rank Fusion, then cut to `k`. Exact
+    terms (identifiers, part numbers, code symbols) are found without raising `k`.
+    """
+
+    dense_k: int | None = None  # Depth of the dense ranking, at least `k`
+    sparse_k: int | None = None  # Depth of the BM25 ranking, at least `k`
+    rrf_k: int = 60  # Smoothing constant of the fusion
+
+
 class RetrievalConfig(QuivrBaseConfig):
     reranker_config: RerankerConfig = RerankerConfig()
     llm_config: LLMEndpointConfig = LLMEndpointConfig()
@@ -433,6 +448,10 @@ class RetrievalConfig(QuivrBaseConfig):
     k: int = 40  # Number of chunks returned by the retriever
     prompt: str | None = None
     workflow_config: WorkflowConfig = WorkflowConfig(nodes=DefaultWorkflow.RAG.nodes)
+    # Search knobs (nprobe, ef_search) of the FAISS index, for this question only
+    vector_index_config: VectorIndexConfig | None = None
+    # Fuse BM25 and dense rankings, for the default FAISS store
+    hybrid_search: HybridSearchConfig | None = None
 
     def __init__(self, **data):
         super().__init__(**data)
@@ -38,6 +38,8 @@ from quivr_core.rag.entities.models import (
     QuivrKnowledge,
 )
 from quivr_core.rag.prompts import custom_prompts
+from quivr_core.vectorstore.bm25 import BM25Index
+from quivr_core.vectorstore.hybrid import HybridRetriever
 from quivr_core.rag.utils import (
     collect_tools,
     combine_documents,
@@ -165,6 +167,7 @@ class QuivrQARAGLangGraph:
         retrieval_config: RetrievalConfig,
         llm: LLMEndpoint,
         vector_store: VectorStore | None = None,
+        sparse_index: BM25Index | None = None,
     ):
         """
         Construct a QuivrQARAGLangGraph object.
@@ -173,10 +176,13 @@ class QuivrQARAGLangGraph:
             retrieval_config (RetrievalConfig): The configuration for the RAG model.
             llm (LLMEndpoint): The LLM to use for generating text.
             vector_store (VectorStore): The vector store to use for storing and retrieving documents.
+            sparse_index (BM25Index | None): BM25 index of the chunks of the FAISS vector
+                store, required by `retrieval_config.hybrid_search`.
             reranker (BaseDocumentCompressor | None): The document compressor to use for re-ranking documents. Defaults to IdempotentCompressor if not provided.
         """
         self.retrieval_config = retrieval_config
         self.vector_store = vector_store
+        self.sparse_index = sparse_index
         self.llm_endpoint = llm
 
         self.graph = None
@@ -207,15 +213,29 @@ class QuivrQARAGLangGraph:
     def get_retriever(self, **kwargs):
         """
         Returns a retriever that can retrieve documents from the vector store.
+        With `retrieval_config.hybrid_search`, the dense and BM25 rankings are fused.
 
         Returns:
-            VectorStoreRetriever: The retriever.
+            VectorStoreRetriever | HybridRetriever: The retriever.
         """
-        if self.vector_store:
-            retriever = self.vector_store.as_retriever(**kwargs)
-        else:
+        if not self.vector_store:
             raise ValueError("No vector store provided")
 
+        hybrid_search = self.retrieval_config.hybrid_search
+        if hybrid_search is not None:
+            if self.sparse_index is None:
+                raise ValueError("Hybrid search requires a sparse index")
+            retriever = HybridRetriever(
+                vector_store=self.vector_store,  # type: ignore
+                sparse_index=self.sparse_index,
+                k=kwargs.get("search_kwargs", {}).get("k", self.retrieval_config.k),
+                dense_k=hybrid_search.dense_k,
+                sparse_k=hybrid_search.sparse_k,
+                rrf_k=hybrid_search.rrf_k,
+            )
+        else:
+            retriever = self.vector_store.as_retriever(**kwargs)
+
         return retriever
 
     def routing(self, state: AgentState) -> List[Send]:
@@ -1,4 +1,4 @@
-import hashlib
+import asyncio
 import mimetypes
 import os
 import warnings
@@ -10,6 +10,8 @@ from uuid import UUID, uuid4
 
 import aiofiles
 
+from quivr_core.files.file import hash_file
+
 
 class FileExtension(str, Enum):
     txt = ".txt"
@@ -42,8 +44,7 @@ async def load_qfile(brain_id: UUID, path: str | Path):
 
     file_size = os.stat(path).st_size
 
-    async with aiofiles.open(path, mode="rb") as f:
-        file_sha1 = hashlib.sha1(await f.read()).hexdigest()
+    file_sha1 = (await asyncio.to_thread(hash_file, path))["sha1"]
 
     try:
         # NOTE: when loading from existing storage, file name will be uuid
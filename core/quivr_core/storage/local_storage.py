@@ -78,6 +78,7 @@ class LocalStorage(StorageBase):
         if file.file_sha1 in self.hashes and not exists_ok:
             raise FileExistsError(f"file {file.original_filename} already uploaded")
 
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
         if self.copy_flag:
             shutil.copy2(file.path, dst_path)
         else:
@@ -98,16 +99,27 @@ class LocalStorage(StorageBase):
 
     async def remove_file(self, file_id: UUID) -> None:
         """
-        Removes a file from the local storage. This method is currently not
-        implemented.
+        Removes a file from the local storage. Deletes the stored copy, or the
+        symlink, and forgets the file's SHA-1 hash.
 
         Args:
             file_id (UUID): The unique identifier of the file to remove.
 
         Raises:
-            NotImplementedError: Always raises this error as the method is not yet implemented.
+            FileNotFoundError: If no file with this id is in the storage.
         """
-        raise NotImplementedError
+        for idx, file in enumerate(self.files):
+            if file.id == file_id:
+                break
+        else:
+            raise FileNotFoundError(f"file {file_id} not found in storage")
+
+        del self.files[idx]
+        # Files uploaded with `exists_ok` can share their hash
+        if all(f.file_sha1 != file.file_sha1 for f in self.files):
+            self.hashes.discard(file.file_sha1)
+        if os.path.lexists(file.path):
+            os.remove(file.path)
 
     @classmethod
     def load(cls, config: LocalStorageConfig) -> Self:
@@ -126,6 +138,7 @@ class LocalStorage(StorageBase):
         """
         tstorage = cls(dir_path=config.storage_path)
         tstorage.files = [QuivrFile.deserialize(f) for f in config.files.values()]
+        tstorage.hashes = {f.file_sha1 for f in tstorage.files}
         return tstorage
 
 
@@ -144,7 +157,10 @@ class TransparentStorage(StorageBase):
         return len(self.id_files)
 
     async def remove_file(self, file_id: UUID) -> None:
-        raise NotImplementedError
+        try:
+            del self.id_files[file_id]
+        except KeyError:
+            raise FileNotFoundError(f"file {file_id} not found in storage") from None
 
     async def get_files(self) -> list[QuivrFile]:
         return list(self.id_files.values())
@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from uuid import UUID
 
 from quivr_core.brain.info import StorageInfo
-from quivr_core.storage.local_storage import QuivrFile
+from quivr_core.files.file import QuivrFile
 
 
 class StorageBase(ABC):
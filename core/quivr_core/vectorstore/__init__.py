@@ -0,0 +1,37 @@
+from .bm25 import BM25Index
+from .docstore import PagedDocstore
+from .faiss_store import is_paged_faiss, load_paged_faiss, save_paged_faiss
+from .index import (
+    VectorIndexConfig,
+    VectorIndexType,
+    adelete_chunks,
+    build_faiss_store,
+    delete_chunks,
+    is_faiss,
+    set_search_params,
+    train_index,
+    with_search_params,
+)
+from .hybrid import HybridRetriever, reciprocal_rank_fusion
+from .metadata_index import MetadataIndex, filtered_similarity_search
+
+__all__ = [
+    "BM25Index",
+    "HybridRetriever",
+    "MetadataIndex",
+    "PagedDocstore",
+    "VectorIndexConfig",
+    "VectorIndexType",
+    "adelete_chunks",
+    "build_faiss_store",
+    "delete_chunks",
+    "filtered_similarity_search",
+    "is_faiss",
+    "is_paged_faiss",
+    "load_paged_faiss",
+    "reciprocal_rank_fusion",
+    "save_paged_faiss",
+    "set_search_params",
+    "train_index",
+    "with_search_params",
+]
@@ -0,0 +1,260 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from quivr_core.vectorstore.docstore import PagedDocstore
+
+logger = logging.getLogger("quivr_core")
+
+META_FILE = "bm25.json"
+POSTINGS_FILE = "bm25_postings.npz"
+
+# Words, with identifiers, part numbers and code symbols kept whole: `XJ-200`,
+# `foo_bar`, `os.path.join`, `v1.2`
+_TOKEN_RE = re.compile(r"\w+(?:[.\-/:#]\w+)*")
+_PART_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased tokens of a text. Compound tokens are also split in their parts:
+    `XJ-200` gives `xj-200`, `xj` and `200`.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            parts = _PART_RE.findall(token)
+            if len(parts) > 1:
+                tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Local sparse inverted index of chunks, ranked with Okapi BM25.
+
+    Complements dense retrieval on exact terms that embeddings miss: identifiers,
+    part numbers, code symbols. Chunks are referenced by their id in the vector
+    store, texts are not kept. Deleted chunks are skipped at query time and
+    dropped when the index is saved. Updates and searches are serialized by a
+    lock: the index can be searched from worker threads while chunks are added.
+
+    Args:
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: list[str] = []
+        self._numbers: dict[str, int] = {}
+        self._lengths = array("i")
+        self._alive = array("b")
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._n_alive = 0
+        self._total_length = 0
+        # Numpy copies of the lengths and liveness, reset on updates
+        self._arrays: tuple[np.ndarray, np.ndarray] | None = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"BM25Index(chunks={len(self)}, terms={len(self._postings)})"
+
+    def __len__(self) -> int:
+        return self._n_alive
+
+    def __contains__(self, doc_id: str) -> bool:
+        number = self._numbers.get(doc_id)
+        return number is not None and bool(self._alive[number])
+
+    def add(self, ids: list[str], texts: list[str]):
+        """
+        Index chunks.
+
+        Args:
+            ids (list[str]): Ids of the chunks in the vector store.
+            texts (list[str]): Texts of the chunks.
+        """
+        with self._lock:
+            self._add(ids, texts)
+
+    def _add(self, ids: list[str], texts: list[str]):
+        for doc_id, text in zip(ids, texts, strict=True):
+            if doc_id in self:
+                raise ValueError(f"chunk {doc_id} is already indexed")
+            number = len(self.ids)
+            self.ids.append(doc_id)
+            self._numbers[doc_id] = number
+            tokens = tokenize(text)
+            for term, tf in Counter(tokens).items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = (array("i"), array("i"))
+                posting[0].append(number)
+                posting[1].append(tf)
+            self._lengths.append(len(tokens))
+            self._alive.append(1)
+            self._n_alive += 1
+            self._total_length += len(tokens)
+        self._arrays = None
+
+    def delete(self, ids: list[str]):
+        """Remove chunks from the index, unknown ids are ignored."""
+        with self._lock:
+            for doc_id in ids:
+                number = self._numbers.pop(doc_id, None)
+                if number is not None and self._alive[number]:
+                    self._alive[number] = 0
+                    self._n_alive -= 1
+                    self._total_length -= self._lengths[number]
+            self._arrays = None
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        """
+        The k chunks with the highest BM25 score for a query.
+
+        Args:
+            query (str): The query.
+            k (int): Maximum number of chunks returned.
+        Returns:
+            list[tuple[str, float]]: Ids of the chunks with their score, best first.
+            Chunks without any term of the query are not returned.
+        """
+        with self._lock:
+            return self._search(query, k)
+
+    def _search(self, query: str, k: int) -> list[tuple[str, float]]:
+        if not self._n_alive or k <= 0:
+            return []
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self._lengths, dtype=np.float32),
+                np.array(self._alive, dtype=bool),
+            )
+        lengths, alive = self._arrays
+        avg_length = self._total_length / self._n_alive or 1.0
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            docs = np.array(posting[0], dtype=np.int64)
+            tfs = np.array(posting[1], dtype=np.float32)
+            live = alive[docs]
+            docs, tfs = docs[live], tfs[live]
+            if not len(docs):
+                continue
+            idf = math.log(1 + (self._n_alive - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        matching = np.flatnonzero(scores)
+        if len(matching) > k:
+            matching = matching[np.argpartition(-scores[matching], k - 1)[:k]]
+        matching = matching[np.argsort(-scores[matching], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in matching]
+
+    @classmethod
+    def from_faiss(cls, vector_db: FAISS, **kwargs) -> "BM25Index":
+        """Index the chunks of a FAISS vector store."""
+        index = cls(**kwargs)
+        index.update_from_faiss(vector_db)
+        logger.debug(f"built a BM25 index of {len(index)} chunks")
+        return index
+
+    def update_from_faiss(self, vector_db: FAISS):
+        """Index the chunks of a FAISS vector store that are not indexed yet."""
+        with self._lock:
+            self._update_from_faiss(vector_db)
+
+    def _update_from_faiss(self, vector_db: FAISS):
+        docstore = vector_db.docstore
+        if isinstance(docstore, PagedDocstore):
+            chunks = (
+                (doc_id, doc) for doc_id, doc in docstore.items() if doc_id not in self
+            )
+        else:
+            chunks = (
+                (doc_id, docstore.search(doc_id))
+                for doc_id in vector_db.index_to_docstore_id.values()
+                if doc_id not in self
+            )
+        ids, texts = [], []
+        for doc_id, doc in chunks:
+            if isinstance(doc, Document):
+                ids.append(doc_id)
+                texts.append(doc.page_content)
+        self._add(ids, texts)
+
+    def save(self, folder_path: str | Path):
+        """Save the index, without its deleted chunks."""
+        with self._lock:
+            self._save(Path(folder_path))
+
+    def _save(self, folder_path: Path):
+        os.makedirs(folder_path, exist_ok=True)
+        alive = np.array(self._alive, dtype=bool)
+        # Renumber the remaining chunks
+        numbers = np.cumsum(alive, dtype=np.int64) - 1
+        terms, indptr, docs, tfs = [], [0], [], []
+        for term, (term_docs, term_tfs) in self._postings.items():
+            term_docs_np = np.array(term_docs, dtype=np.int64)
+            live = alive[term_docs_np]
+            if not live.any():
+                continue
+            terms.append(term)
+            docs.append(numbers[term_docs_np[live]].astype(np.int32))
+            tfs.append(np.array(term_tfs, dtype=np.int32)[live])
+            indptr.append(indptr[-1] + int(live.sum()))
+        np.savez(
+            folder_path / POSTINGS_FILE,
+            indptr=np.asarray(indptr, dtype=np.int64),
+            docs=np.concatenate(docs) if docs else np.empty(0, dtype=np.int32),
+            tfs=np.concatenate(tfs) if tfs else np.empty(0, dtype=np.int32),
+            lengths=np.array(self._lengths, dtype=np.int32)[alive],
+        )
+        with open(folder_path / META_FILE, "w") as f:
+            json.dump(
+                {
+                    "k1": self.k1,
+                    "b": self.b,
+                    "ids": [i for i, a in zip(self.ids, alive) if a],
+                    "terms": terms,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, folder_path: str | Path) -> "BM25Index":
+        folder_path = Path(folder_path)
+        with open(folder_path / META_FILE) as f:
+            meta = json.load(f)
+        postings = np.load(folder_path / POSTINGS_FILE)
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index.ids = meta["ids"]
+        index._numbers = {doc_id: i for i, doc_id in enumerate(index.ids)}
+        lengths = postings["lengths"]
+        index._lengths = array("i", lengths.tobytes())
+        index._alive = array("b", bytes([1]) * len(index.ids))
+        index._n_alive = len(index.ids)
+        index._total_length = int(lengths.sum())
+        indptr, docs, tfs = postings["indptr"], postings["docs"], postings["tfs"]
+        for i, term in enumerate(meta["terms"]):
+            start, end = indptr[i], indptr[i + 1]
+            index._postings[term] = (
+                array("i", docs[start:end].tobytes()),
+                array("i", tfs[start:end].tobytes()),
+            )
+        return index
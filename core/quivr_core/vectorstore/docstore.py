@@ -0,0 +1,302 @@
+import json
+import mmap
+import os
+import pickle
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+from uuid import UUID
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+CHUNKS_FILE = "chunks.bin"
+OFFSETS_FILE = "chunks_offsets.npy"
+IDS_FILE = "chunks_ids.json"
+METADATA_FILE = "chunks_metadata.pkl"
+
+# Version of the chunk files written by `write_paged_docstore`
+DOCSTORE_VERSION = 2
+
+
+class _ColumnBuilder:
+    """Values of one metadata key for the chunks that differ from their file."""
+
+    def __init__(self):
+        self.positions = array("q")
+        self.values: list[Any] = []
+
+    def build(
+        self, key: str, file_metadatas: list[dict[str, Any]], chunk_files: array
+    ) -> tuple[np.ndarray | None, np.ndarray | list]:
+        positions: np.ndarray | None = np.frombuffer(self.positions, dtype=np.int64)
+        values: np.ndarray | list = self.values
+        n_chunks = len(chunk_files)
+        if 2 * len(self.positions) >= n_chunks:
+            # Mostly dense columns, e.g. chunk_index, are indexed by position
+            # directly: the other chunks take the value of their file.
+            dense = []
+            covered = iter(zip(self.positions, self.values))
+            next_position, next_value = next(covered, (n_chunks, None))
+            for position in range(n_chunks):
+                if position == next_position:
+                    dense.append(next_value)
+                    next_position, next_value = next(covered, (n_chunks, None))
+                    continue
+                file_metadata = file_metadatas[chunk_files[position]]
+                if key not in file_metadata:
+                    break
+                dense.append(file_metadata[key])
+            else:
+                positions, values = None, dense
+        if all(type(v) is int for v in values):
+            values = np.asarray(values, dtype=np.int64)
+        return positions, values
+
+
+def write_paged_docstore(folder_path: Path, docs: Iterable[tuple[str, Document]]):
+    """
+    Write chunks in the paged columnar format.
+
+    * Texts are appended to one utf-8 blob, indexed by an offsets array.
+    * The metadata of the first chunk of each file is stored once as the file
+      metadata. Other chunks of the file only store the keys whose values
+      differ from it (chunk_index, chunk_size, page...), one column per key.
+
+    Args:
+        folder_path (Path): Destination folder.
+        docs (Iterable[tuple[str, Document]]): The chunks with their ids, in index order.
+    """
+    offsets = array("q", [0])
+    ids: list[str] = []
+    files: list[bytes] = []
+    file_positions: dict[str | None, int] = {}
+    file_metadatas: list[dict[str, Any]] = []
+    chunk_files = array("i")
+    columns: dict[str, _ColumnBuilder] = {}
+    dropped: dict[str, array] = {}
+
+    with open(folder_path / CHUNKS_FILE, "wb") as f:
+        for position, (doc_id, doc) in enumerate(docs):
+            text = doc.page_content.encode("utf-8", "surrogatepass")
+            f.write(text)
+            offsets.append(offsets[-1] + len(text))
+            ids.append(doc_id)
+
+            metadata = doc.metadata
+            qfile_id = metadata.get("qfile_id")
+            file_key = None if qfile_id is None else str(qfile_id)
+            file_position = file_positions.get(file_key)
+            if file_position is None:
+                file_position = file_positions[file_key] = len(files)
+                files.append(pickle.dumps(metadata))
+                file_metadatas.append(metadata)
+            chunk_files.append(file_position)
+
+            file_metadata = file_metadatas[file_position]
+            if metadata is file_metadata:
+                continue
+            for key, value in metadata.items():
+                if key not in file_metadata or file_metadata[key] != value:
+                    column = columns.get(key)
+                    if column is None:
+                        column = columns[key] = _ColumnBuilder()
+                    column.positions.append(position)
+                    column.values.append(value)
+            for key in file_metadata:
+                if key not in metadata:
+                    dropped.setdefault(key, array("q")).append(position)
+
+    np.save(folder_path / OFFSETS_FILE, np.frombuffer(offsets, dtype=np.int64))
+    with open(folder_path / IDS_FILE, "w") as f:
+        json.dump({"version": DOCSTORE_VERSION, "ids": ids}, f)
+    with open(folder_path / METADATA_FILE, "wb") as f:
+        pickle.dump(
+            {
+                "files": files,
+                "chunk_files": np.frombuffer(chunk_files, dtype=np.int32),
+                "columns": {
+                    k: c.build(k, file_metadatas, chunk_files)
+                    for k, c in columns.items()
+                },
+                "dropped": {
+                    k: np.frombuffer(p, dtype=np.int64) for k, p in dropped.items()
+                },
+            },
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+
+def _contains(positions: np.ndarray, position: int) -> int | None:
+    i = int(np.searchsorted(positions, position))
+    if i < len(positions) and positions[i] == position:
+        return i
+    return None
+
+
+class PagedDocstore(Docstore, AddableMixin):
+    """
+    Read-mostly docstore over chunks written by `write_paged_docstore`.
+
+    Texts are memory-mapped and `Document`s are only materialized on access, e.g.
+    for the top-k hits of a search; the `cache_size` most recently used are kept.
+    Processes opening the same folder share the page cache instead of each
+    holding a copy of the chunks. Added and deleted chunks are kept in memory on
+    top of the files.
+
+    Args:
+        folder_path (Path): Folder of the chunk files.
+        cache_size (int): Number of materialized chunks kept in memory.
+    """
+
+    def __init__(self, folder_path: str | Path, cache_size: int = 1024):
+        self.folder_path = Path(folder_path)
+        self.cache_size = cache_size
+        with open(self.folder_path / IDS_FILE) as f:
+            ids_file = json.load(f)
+        self.version: int = ids_file.get("version", 1)
+        self.ids: list[str] = ids_file["ids"]
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._offsets = np.load(self.folder_path / OFFSETS_FILE, mmap_mode="r")
+
+        self._data: mmap.mmap | bytes = b""
+        if os.path.getsize(self.folder_path / CHUNKS_FILE):
+            with open(self.folder_path / CHUNKS_FILE, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.version == 1:
+            # Pickled (text, metadata) records
+            self._qfile_ids: list[str | None] = ids_file["qfile_ids"]
+        else:
+            with open(self.folder_path / METADATA_FILE, "rb") as f:
+                metadata = pickle.load(f)
+            self._files: list[bytes] = metadata["files"]
+            self._chunk_files: np.ndarray = metadata["chunk_files"]
+            self._columns: dict[str, tuple[np.ndarray | None, Any]] = metadata[
+                "columns"
+            ]
+            self._dropped: dict[str, np.ndarray] = metadata["dropped"]
+            # Read-only copies of the file metadata, for `get_field`
+            self._file_metadatas: dict[int, dict[str, Any]] = {}
+            file_qfile_ids = [
+                None if (q := pickle.loads(m).get("qfile_id")) is None else str(q)
+                for m in self._files
+            ]
+            self._qfile_ids = [file_qfile_ids[i] for i in self._chunk_files]
+
+        self._added: dict[str, Document] = {}
+        self._deleted: set[str] = set()
+        self._cache: OrderedDict[str, Document] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"PagedDocstore(folder_path={self.folder_path}, chunks={len(self)})"
+
+    def __len__(self) -> int:
+        return len(self._positions) - len(self._deleted) + len(self._added)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._added or (
+            doc_id in self._positions and doc_id not in self._deleted
+        )
+
+    def __reduce__(self):
+        # Pickled, e.g. by FAISS.save_local, as a regular in-memory docstore
+        return (InMemoryDocstore, (dict(self.items()),))
+
+    def _read(self, position: int) -> Document:
+        start, end = self._offsets[position], self._offsets[position + 1]
+        if self.version == 1:
+            page_content, metadata = pickle.loads(self._data[start:end])
+            return Document(page_content=page_content, metadata=metadata)
+
+        page_content = self._data[start:end].decode("utf-8", "surrogatepass")
+        # Unpickled for each chunk: chunks don't share mutable metadata values
+        metadata = pickle.loads(self._files[self._chunk_files[position]])
+        for key, (positions, values) in self._columns.items():
+            i = position if positions is None else _contains(positions, position)
+            if i is not None:
+                value = values[i]
+                metadata[key] = value.item() if isinstance(value, np.generic) else value
+        for key, positions in self._dropped.items():
+            if _contains(positions, position) is not None:
+                metadata.pop(key, None)
+        return Document(page_content=page_content, metadata=metadata)
+
+    def get_field(self, doc_id: str, key: str, default: Any = None) -> Any:
+        """Metadata value of a chunk, without materializing the chunk."""
+        if doc_id in self._added:
+            return self._added[doc_id].metadata.get(key, default)
+        position = self._positions[doc_id]
+        if self.version == 1:
+            return self._read(position).metadata.get(key, default)
+        column = self._columns.get(key)
+        if column is not None:
+            positions, values = column
+            i = position if positions is None else _contains(positions, position)
+            if i is not None:
+                value = values[i]
+                return value.item() if isinstance(value, np.generic) else value
+        dropped = self._dropped.get(key)
+        if dropped is not None and _contains(dropped, position) is not None:
+            return default
+        file_position = int(self._chunk_files[position])
+        file_metadata = self._file_metadatas.get(file_position)
+        if file_metadata is None:
+            file_metadata = self._file_metadatas[file_position] = pickle.loads(
+                self._files[file_position]
+            )
+        return file_metadata.get(key, default)
+
+    def search(self, search: str) -> str | Document:
+        if search in self._added:
+            return self._added[search]
+        if search not in self:
+            return f"ID {search} not found."
+        doc = self._cache.get(search)
+        if doc is None:
+            doc = self._read(self._positions[search])
+            self._cache[search] = doc
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(search)
+        return doc
+
+    def add(self, texts: dict[str, Document]) -> None:
+        overlapping = [doc_id for doc_id in texts if doc_id in self]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._added.update(texts)
+
+    def delete(self, ids: list) -> None:
+        missing = [doc_id for doc_id in ids if doc_id not in self]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not  exist: {missing}")
+        for doc_id in ids:
+            if self._added.pop(doc_id, None) is None:
+                self._deleted.add(doc_id)
+                self._cache.pop(doc_id, None)
+
+    def items(self) -> Iterator[tuple[str, Document]]:
+        """All the chunks, materialized one at a time."""
+        for position, doc_id in enumerate(self.ids):
+            if doc_id not in self._deleted:
+                yield doc_id, self._read(position)
+        yield from self._added.items()
+
+    def file_chunk_ids(self) -> dict[UUID, list[str]]:
+        """Ids of the chunks of each file, without materializing the chunks."""
+        file_chunk_ids: dict[UUID, list[str]] = {}
+        for doc_id, qfile_id in zip(self.ids, self._qfile_ids):
+            if qfile_id is not None and doc_id not in self._deleted:
+                file_chunk_ids.setdefault(UUID(qfile_id), []).append(doc_id)
+        for doc_id, doc in self._added.items():
+            if "qfile_id" in doc.metadata:
+                file_chunk_ids.setdefault(
+                    UUID(str(doc.metadata["qfile_id"])), []
+                ).append(doc_id)
+        return file_chunk_ids
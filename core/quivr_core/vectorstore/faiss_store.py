@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from uuid import uuid4
+
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from quivr_core.vectorstore.docstore import (
+    CHUNKS_FILE,
+    IDS_FILE,
+    METADATA_FILE,
+    OFFSETS_FILE,
+    PagedDocstore,
+    write_paged_docstore,
+)
+
+logger = logging.getLogger("quivr_core")
+
+INDEX_FILE = "index.faiss"
+META_FILE = "paged_faiss.json"
+# 2: columnar chunk files, see `write_paged_docstore`
+# 3: index and chunk files in the data folder named in the metadata file
+FORMAT_VERSION = 3
+DATA_PREFIX = "data_"
+# Files of the stores saved in the format 2, directly in the folder
+_LEGACY_FILES = (INDEX_FILE, CHUNKS_FILE, OFFSETS_FILE, IDS_FILE, METADATA_FILE)
+
+
+def is_paged_faiss(folder_path: str | Path) -> bool:
+    return (Path(folder_path) / META_FILE).exists()
+
+
+def save_paged_faiss(vector_db: FAISS, folder_path: str | Path):
+    """
+    Save a FAISS vector store in the paged format: the FAISS index and its chunks in
+    files that `load_paged_faiss` opens without reading them in memory.
+
+    The save is atomic: the files are written in a new data folder, committed by
+    replacing the metadata file that names it. A crash leaves the previous save
+    in place, and the store may be the one loaded from this folder.
+
+    Args:
+        vector_db (FAISS): The vector store to save.
+        folder_path (str | Path): Destination folder.
+    """
+    folder_path = Path(folder_path)
+    os.makedirs(folder_path, exist_ok=True)
+    data_path = folder_path / f"{DATA_PREFIX}{uuid4().hex}"
+    os.mkdir(data_path)
+    try:
+        _write(vector_db, data_path)
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "data_dir": data_path.name,
+            "normalize_L2": vector_db._normalize_L2,
+            "distance_strategy": vector_db.distance_strategy.value,
+        }
+        tmp_meta_path = folder_path / f".{META_FILE}.{uuid4().hex}"
+        with open(tmp_meta_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_meta_path, folder_path / META_FILE)
+    except BaseException:
+        shutil.rmtree(data_path, ignore_errors=True)
+        raise
+
+    # Files of the previous saves. Processes that opened them keep their mapping.
+    for path in folder_path.iterdir():
+        if path.name.startswith(DATA_PREFIX) and path != data_path:
+            shutil.rmtree(path, ignore_errors=True)
+        elif path.name in _LEGACY_FILES:
+            path.unlink(missing_ok=True)
+
+
+def _write(vector_db: FAISS, folder_path: Path):
+    import faiss
+
+    faiss.write_index(vector_db.index, str(folder_path / INDEX_FILE))
+
+    def docs():
+        for position in range(vector_db.index.ntotal):
+            doc_id = vector_db.index_to_docstore_id[position]
+            doc = vector_db.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"chunk {doc_id} of the index is not in the docstore")
+            yield doc_id, doc
+
+    write_paged_docstore(folder_path, docs())
+    # Durable before the metadata file commits them
+    for path in folder_path.iterdir():
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+
+def load_paged_faiss(
+    folder_path: str | Path,
+    embedder: Embeddings,
+    mmap: bool = True,
+    cache_size: int = 1024,
+) -> FAISS:
+    """
+    Open a FAISS vector store saved by `save_paged_faiss`.
+
+    Chunks are always read lazily. With `mmap`, the index is opened with memory-mapped
+    IO: processes serving the same brain share the page cache. Memory mapping
+    applies to inverted lists of IVF indexes and, from faiss 1.10, to the
+    vectors of flat indexes; older versions read flat indexes in memory. A memory
+    mapped index is meant for serving: depending on its type, vectors may not be
+    added to it.
+
+    Args:
+        folder_path (str | Path): Folder of the vector store.
+        embedder (Embeddings): Embeddings of the queries.
+        mmap (bool): Whether to memory-map the index.
+        cache_size (int): Number of decoded chunks kept in memory.
+    """
+    import faiss
+
+    folder_path = Path(folder_path)
+    with open(folder_path / META_FILE) as f:
+        meta = json.load(f)
+    if meta["format_version"] > FORMAT_VERSION:
+        raise ValueError(
+            f"{folder_path} was saved by a newer version of quivr-core (format {meta['format_version']})"
+        )
+    # Saves of the format 2 have their files in the folder itself
+    data_path = folder_path / meta.get("data_dir", "")
+    if not (data_path / INDEX_FILE).exists():
+        raise ValueError(f"{folder_path} is incomplete: {data_path} has no index")
+
+    io_flags = 0
+    if mmap:
+        io_flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    index = faiss.read_index(str(data_path / INDEX_FILE), io_flags)
+    docstore = PagedDocstore(data_path, cache_size=cache_size)
+    logger.debug(f"opened {folder_path} with {index.ntotal} vectors, mmap={mmap}")
+    return FAISS(
+        embedding_function=embedder,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(docstore.ids)),
+        normalize_L2=meta["normalize_L2"],
+        distance_strategy=DistanceStrategy(meta["distance_strategy"]),
+    )
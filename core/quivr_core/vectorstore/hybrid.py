@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from quivr_core.vectorstore.bm25 import BM25Index
+
+logger = logging.getLogger("quivr_core")
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[str]:
+    """
+    Fuse rankings of ids with Reciprocal Rank Fusion: each id scores
+    `sum(1 / (k + rank))` over the rankings it appears in, ranks starting at 1.
+
+    Args:
+        rankings (list[list[str]]): Ids ranked best first, one list per retriever.
+        k (int): Smoothing constant, higher values flatten the top ranks.
+    Returns:
+        list[str]: All the ids, by decreasing fused score. Ties keep the order in
+        which ids first appear.
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing the dense ranking of a FAISS vector store with the BM25
+    ranking of its chunks, with Reciprocal Rank Fusion.
+
+    Only ids are ranked: the `k` fused chunks are the only ones read from the
+    docstore.
+
+    Args:
+        vector_store (FAISS): The vector store.
+        sparse_index (BM25Index): BM25 index of the chunks of the vector store.
+        k (int): Number of chunks returned.
+        dense_k (int | None): Depth of the dense ranking, at least `k`.
+        sparse_k (int | None): Depth of the BM25 ranking, at least `k`.
+        rrf_k (int): Smoothing constant of the fusion.
+    """
+
+    vector_store: FAISS
+    sparse_index: BM25Index
+    k: int = 40
+    dense_k: int | None = None
+    sparse_k: int | None = None
+    rrf_k: int = 60
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _dense_ranking(self, embedding: list[float]) -> list[str]:
+        import faiss
+
+        vector_store = self.vector_store
+        if not vector_store.index.ntotal:
+            return []
+        query = np.asarray([embedding], dtype=np.float32)
+        if vector_store._normalize_L2:
+            faiss.normalize_L2(query)
+        _, labels = vector_store.index.search(query, max(self.dense_k or 0, self.k))
+        return [vector_store.index_to_docstore_id[i] for i in labels[0] if i != -1]
+
+    def _fuse(self, query: str, embedding: list[float]) -> list[Document]:
+        dense = self._dense_ranking(embedding)
+        sparse = [
+            doc_id
+            for doc_id, _ in self.sparse_index.search(
+                query, max(self.sparse_k or 0, self.k)
+            )
+        ]
+        docs = []
+        for doc_id in reciprocal_rank_fusion([dense, sparse], self.rrf_k)[: self.k]:
+            doc = self.vector_store.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                # Chunks deleted from the store but not from the sparse index
+                logger.warning(
+                    f"chunk {doc_id} of the BM25 index is not in the docstore"
+                )
+                continue
+            docs.append(doc)
+        return docs
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        embedding = self.vector_store.embeddings.embed_query(query)  # type: ignore
+        return self._fuse(query, embedding)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        embedding = await self.vector_store.embeddings.aembed_query(query)  # type: ignore
+        return await asyncio.to_thread(self._fuse, query, embedding)
@@ -0,0 +1,315 @@
+import asyncio
+import copy
+import logging
+import math
+from enum import Enum
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from quivr_core.base_config import QuivrBaseConfig
+
+logger = logging.getLogger("quivr_core")
+
+
+class VectorIndexType(str, Enum):
+    FLAT = "flat"
+    HNSW = "hnsw"
+    IVF_FLAT = "ivf_flat"
+    IVF_PQ = "ivf_pq"
+    SQ8 = "sq8"
+
+
+class VectorIndexConfig(QuivrBaseConfig):
+    """
+    Type of the FAISS index of the default vector store, and its search knobs.
+
+    * `flat`: exact search, full float32 vectors.
+    * `hnsw`: graph index, `hnsw_m` neighbors per node. Searches visit
+      `ef_search` candidates: higher is slower and more accurate.
+    * `ivf_flat`: vectors partitioned in `nlist` lists, searches scan `nprobe` lists.
+    * `ivf_pq`: IVF with vectors compressed by product quantization in `pq_m`
+      codes of `pq_nbits` bits.
+    * `sq8`: exact scan over vectors quantized to 8 bits per dimension.
+
+    Types needing training (`ivf_flat`, `ivf_pq`, `sq8`) keep vectors in a flat
+    index until `train_size` vectors are ingested, then train on them and switch
+    to the configured index: smaller brains stay exact. `nlist` and `pq_m`
+    default to values derived from the training set and the dimension.
+
+    With `sparse_index`, a BM25 index of the chunks is also built during the
+    ingestion, for the hybrid retrieval of `RetrievalConfig.hybrid_search`.
+    """
+
+    index_type: VectorIndexType = VectorIndexType.FLAT
+    train_size: int = 4096
+    hnsw_m: int = 32
+    ef_construction: int = 40
+    ef_search: int = 64
+    nlist: int | None = None
+    nprobe: int = 16
+    pq_m: int | None = None
+    pq_nbits: int = 8
+    sparse_index: bool = False
+
+    @property
+    def needs_training(self) -> bool:
+        return self.index_type in (
+            VectorIndexType.IVF_FLAT,
+            VectorIndexType.IVF_PQ,
+            VectorIndexType.SQ8,
+        )
+
+
+def _default_pq_m(dim: int) -> int:
+    return max(m for m in range(1, min(64, dim) + 1) if dim % m == 0)
+
+
+def create_index(
+    dim: int,
+    config: VectorIndexConfig,
+    metric: int | None = None,
+    n_train: int | None = None,
+):
+    """
+    Create an empty FAISS index of the configured type, untrained.
+
+    Args:
+        dim (int): Dimension of the vectors.
+        config (VectorIndexConfig): Type and parameters of the index.
+        metric (int | None): FAISS metric, L2 by default.
+        n_train (int | None): Size of the training set, sets the default `nlist`.
+    """
+    import faiss
+
+    if metric is None:
+        metric = faiss.METRIC_L2
+    index_type = config.index_type
+    if index_type == VectorIndexType.FLAT:
+        return faiss.IndexFlat(dim, metric)
+    if index_type == VectorIndexType.HNSW:
+        index = faiss.IndexHNSWFlat(dim, config.hnsw_m, metric)
+        index.hnsw.efConstruction = config.ef_construction
+    elif index_type == VectorIndexType.SQ8:
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, metric)
+    else:
+        nlist = config.nlist
+        if nlist is None:
+            n = n_train or config.train_size
+            # ~39 training points per centroid
+            nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlat(dim, metric)
+        if index_type == VectorIndexType.IVF_FLAT:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            pq_m = config.pq_m or _default_pq_m(dim)
+            if dim % pq_m:
+                raise ValueError(f"pq_m={pq_m} doesn't divide the dimension {dim}")
+            index = faiss.IndexIVFPQ(
+                quantizer, dim, nlist, pq_m, config.pq_nbits, metric
+            )
+    set_search_params(index, config)
+    return index
+
+
+def set_search_params(index, config: VectorIndexConfig):
+    """Apply `nprobe` to IVF indexes and `ef_search` to HNSW indexes, in place."""
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(config.nprobe, ivf.nlist)
+    hnsw = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efSearch = config.ef_search
+
+
+def search_parameters(index, config: VectorIndexConfig):
+    """
+    `nprobe` or `ef_search` of the config as per-search parameters of an IVF or
+    HNSW index, None for other index types.
+    """
+    import faiss
+
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=min(config.nprobe, index.nlist))
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=config.ef_search)
+    return None
+
+
+class _ParameterizedIndex:
+    """FAISS index searched with fixed per-search parameters."""
+
+    def __init__(self, index, params):
+        self._index = index
+        self._params = params
+
+    def search(self, x, k, **kwargs):
+        return self._index.search(x, k, params=self._params, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._index, name)
+
+
+def with_search_params(vector_db: FAISS, config: VectorIndexConfig) -> FAISS:
+    """
+    View of a vector store whose searches use the `nprobe` and `ef_search` of the
+    config. The index of the store is not modified: concurrent searches keep their
+    own parameters.
+    """
+    params = search_parameters(vector_db.index, config)
+    if params is None:
+        return vector_db
+    view = copy.copy(vector_db)
+    view.index = _ParameterizedIndex(vector_db.index, params)
+    return view
+
+
+def train_index(vector_db: FAISS, config: VectorIndexConfig) -> bool:
+    """
+    Switch the flat index of a vector store to the configured index type once it
+    holds `train_size` vectors. The new index is trained on and filled with the
+    vectors of the flat index, in the same order.
+
+    Args:
+        vector_db (FAISS): The vector store.
+        config (VectorIndexConfig): Type and parameters of the index.
+    Returns:
+        bool: Whether the index was replaced.
+    """
+    import faiss
+
+    index = faiss.downcast_index(vector_db.index)
+    if (
+        not config.needs_training
+        or not isinstance(index, faiss.IndexFlat)
+        or index.ntotal < config.train_size
+    ):
+        return False
+    vectors = index.reconstruct_n(0, index.ntotal)
+    trained = create_index(index.d, config, index.metric_type, n_train=len(vectors))
+    trained.train(vectors)
+    trained.add(vectors)
+    vector_db.index = trained
+    logger.info(f"trained a {config.index_type.value} index on {len(vectors)} vectors")
+    return True
+
+
+def build_faiss_store(
+    texts: list[str],
+    embeddings: list[list[float]],
+    metadatas: list[dict],
+    embedder: Embeddings,
+    config: VectorIndexConfig,
+) -> FAISS:
+    """Create a FAISS vector store with the configured index type from embedded chunks."""
+    if config.needs_training:
+        index = create_index(len(embeddings[0]), VectorIndexConfig())
+    else:
+        index = create_index(len(embeddings[0]), config)
+    vector_db = FAISS(
+        embedding_function=embedder,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    vector_db.add_embeddings(zip(texts, embeddings), metadatas=metadatas)
+    train_index(vector_db, config)
+    return vector_db
+
+
+def _remove_positions(index, positions: np.ndarray):
+    """
+    Remove vectors from an index, positions of the remaining vectors are compacted
+    as in a flat index. Returns the index, a new one for HNSW indexes.
+    """
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # Direct maps of filtered searches don't support removal: rebuilt after
+        direct_map = ivf.direct_map.type != faiss.DirectMap.NoMap
+        if direct_map:
+            ivf.make_direct_map(False)
+        # IVF indexes keep the ids of the remaining vectors: renumber them in place
+        index.remove_ids(positions)
+        invlists = ivf.invlists
+        for list_no in range(invlists.nlist):
+            size = invlists.list_size(list_no)
+            if size:
+                ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+                ids -= np.searchsorted(positions, ids)
+        if direct_map:
+            ivf.make_direct_map()
+        return index
+
+    hnsw = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSWFlat):
+        # HNSW graphs don't support removal: rebuilt from the remaining vectors
+        keep = np.setdiff1d(np.arange(hnsw.ntotal), positions)
+        vectors = hnsw.reconstruct_n(0, hnsw.ntotal)[keep]
+        rebuilt = faiss.IndexHNSWFlat(
+            hnsw.d, hnsw.hnsw.nb_neighbors(1), hnsw.metric_type
+        )
+        rebuilt.hnsw.efConstruction = hnsw.hnsw.efConstruction
+        rebuilt.hnsw.efSearch = hnsw.hnsw.efSearch
+        rebuilt.add(vectors)
+        return rebuilt
+
+    index.remove_ids(positions)
+    return index
+
+
+def delete_chunks(vector_db: FAISS, ids: list[str]):
+    """
+    `FAISS.delete` supporting the IVF and HNSW indexes of `VectorIndexConfig`.
+
+    Positions of the vectors following the first removed one are renumbered and
+    HNSW graphs are rebuilt: remove the chunks of several files in a single call.
+    """
+    if not ids:
+        return
+    targets = set(ids)
+    index_to_docstore_id = vector_db.index_to_docstore_id
+    positions = np.fromiter(
+        (i for i, id_ in index_to_docstore_id.items() if id_ in targets),
+        dtype=np.int64,
+    )
+    if len(positions) < len(targets):
+        missing_ids = targets.difference(
+            index_to_docstore_id[i] for i in positions.tolist()
+        )
+        raise ValueError(
+            f"Some specified ids do not exist in the current store. Ids not found: {missing_ids}"
+        )
+    positions.sort()
+    vector_db.index = _remove_positions(vector_db.index, positions)
+    vector_db.docstore.delete(list(targets))
+
+    # Positions are contiguous: the ones before the first removed vector don't move.
+    # The mapping is replaced, not mutated, for the views of `with_search_params`
+    first, n = int(positions[0]), len(index_to_docstore_id)
+    removed = set(positions.tolist())
+    moved = [index_to_docstore_id[i] for i in range(first, n) if i not in removed]
+    remaining = dict(index_to_docstore_id)
+    for i in range(first + len(moved), n):
+        del remaining[i]
+    remaining.update(enumerate(moved, first))
+    vector_db.index_to_docstore_id = remaining
+
+
+def is_faiss(vector_db: VectorStore | None) -> bool:
+    """Whether `vector_db` is a FAISS store, whose index quivr manages itself."""
+    return isinstance(vector_db, FAISS)
+
+
+async def adelete_chunks(vector_db: VectorStore, ids: list[str]):
+    if isinstance(vector_db, FAISS):
+        await asyncio.to_thread(delete_chunks, vector_db, ids)
+    else:
+        await vector_db.adelete(ids)
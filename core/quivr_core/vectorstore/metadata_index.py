@@ -0,0 +1,220 @@
+import logging
+import threading
+from array import array
+from typing import Any, Hashable
+from uuid import UUID
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from quivr_core.vectorstore.docstore import PagedDocstore
+
+logger = logging.getLogger("quivr_core")
+
+# Candidate vectors reconstructed at once by exact filtered searches
+_SCAN_BATCH = 65536
+
+# Serializes the direct map builds of IVF indexes searched from worker threads
+_direct_map_lock = threading.Lock()
+
+
+def _normalize(value: Any) -> Hashable:
+    # Ids are filtered on either as UUID or as str
+    if isinstance(value, UUID):
+        return str(value)
+    hash(value)
+    return value
+
+
+class MetadataIndex:
+    """
+    Inverted index over the chunk metadata of a FAISS vector store, mapping
+    `field -> value -> positions` of the chunks in the FAISS index.
+
+    Fields are indexed on first use, e.g. `qfile_id`, `file_sha1`, `file_extension`
+    or any key of the files' `additional_metadata`. Chunks added to the store
+    are indexed incrementally, deletions rebuild the index on the next use.
+    Fields with unhashable values (lists, dicts) can't be indexed. Selections
+    are thread safe: the lazy indexing runs under a lock.
+
+    Args:
+        vector_db (FAISS): The vector store.
+    """
+
+    def __init__(self, vector_db: FAISS):
+        self.vector_db = vector_db
+        self._postings: dict[str, dict[Hashable, array]] = {}
+        self._unindexable: set[str] = set()
+        self._mapping: dict[int, str] | None = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"MetadataIndex(fields={sorted(self._postings)}, chunks={self._size})"
+
+    def _sync(self):
+        mapping = self.vector_db.index_to_docstore_id
+        if mapping is not self._mapping or len(mapping) < self._size:
+            # Deletions rebind the position -> id map of the store
+            self._postings.clear()
+            self._unindexable.clear()
+            self._mapping = mapping
+            self._size = 0
+        if len(mapping) > self._size:
+            for field in list(self._postings):
+                self._index_field(field, self._size, len(mapping))
+            self._size = len(mapping)
+
+    def _value(self, doc_id: str, field: str) -> Any:
+        docstore = self.vector_db.docstore
+        if isinstance(docstore, PagedDocstore):
+            return docstore.get_field(doc_id, field)
+        doc = docstore.search(doc_id)
+        if not isinstance(doc, Document):
+            raise ValueError(f"chunk {doc_id} of the index is not in the docstore")
+        return doc.metadata.get(field)
+
+    def _index_field(self, field: str, start: int, stop: int):
+        postings = self._postings.setdefault(field, {})
+        mapping = self.vector_db.index_to_docstore_id
+        try:
+            for position in range(start, stop):
+                value = _normalize(self._value(mapping[position], field))
+                positions = postings.get(value)
+                if positions is None:
+                    positions = postings[value] = array("q")
+                positions.append(position)
+        except TypeError:
+            logger.debug(f"metadata field {field} has unhashable values, not indexed")
+            del self._postings[field]
+            self._unindexable.add(field)
+
+    def select(self, filter: dict[str, Any]) -> np.ndarray | None:
+        """
+        Positions of the chunks matching a filter, with the semantics of the FAISS
+        dict filters: each key must match, a list value matches any of its items.
+
+        Args:
+            filter (dict[str, Any]): The metadata filter.
+        Returns:
+            np.ndarray | None: Sorted positions of the matching chunks, None if a
+            field of the filter can't be indexed.
+        """
+        with self._lock:
+            return self._select(filter)
+
+    def _select(self, filter: dict[str, Any]) -> np.ndarray | None:
+        self._sync()
+        selected: np.ndarray | None = None
+        for field, value in filter.items():
+            if field in self._unindexable:
+                return None
+            if field not in self._postings:
+                self._index_field(field, 0, self._size)
+                if field in self._unindexable:
+                    return None
+            postings = self._postings[field]
+            matches = []
+            for v in value if isinstance(value, list) else [value]:
+                try:
+                    positions = postings.get(_normalize(v))
+                except TypeError:
+                    positions = None
+                if positions is not None:
+                    matches.append(np.array(positions, dtype=np.int64))
+            if not matches:
+                return np.empty(0, dtype=np.int64)
+            field_selected = (
+                matches[0] if len(matches) == 1 else np.unique(np.concatenate(matches))
+            )
+            selected = (
+                field_selected
+                if selected is None
+                else np.intersect1d(selected, field_selected, assume_unique=True)
+            )
+        if selected is None:
+            return np.arange(self._size, dtype=np.int64)
+        return selected
+
+
+def _search_candidates(
+    index, query: np.ndarray, positions: np.ndarray, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Exact scores of the query against the vectors of the candidates, top k."""
+    import faiss
+
+    inner_product = index.metric_type == faiss.METRIC_INNER_PRODUCT
+    scores, labels = [], []
+    for start in range(0, len(positions), _SCAN_BATCH):
+        batch = positions[start : start + _SCAN_BATCH]
+        vectors = index.reconstruct_batch(batch)
+        if inner_product:
+            batch_scores = vectors @ query
+        else:
+            batch_scores = ((vectors - query) ** 2).sum(axis=1)
+        top = (-batch_scores if inner_product else batch_scores).argsort(kind="stable")[
+            :k
+        ]
+        scores.append(batch_scores[top])
+        labels.append(batch[top])
+    all_scores, all_labels = np.concatenate(scores), np.concatenate(labels)
+    order = (-all_scores if inner_product else all_scores).argsort(kind="stable")[:k]
+    return all_scores[order], all_labels[order]
+
+
+def filtered_similarity_search(
+    vector_db: FAISS,
+    embedding: list[float],
+    k: int,
+    filter: dict[str, Any],
+    metadata_index: MetadataIndex,
+) -> list[tuple[Document, float]]:
+    """
+    Search the k chunks closest to an embedding among the chunks matching a filter.
+
+    The filter is resolved with the metadata index before searching, so the k
+    results are found however selective the filter is. The vectors of the
+    candidates are scanned exactly: the cost scales with the number of matching
+    chunks. IVF indexes get a direct map (8 bytes per vector) on their first
+    filtered search, to reconstruct their vectors. Falls back to
+    `FAISS.similarity_search_with_score_by_vector` when a filter field can't be
+    indexed.
+
+    Args:
+        vector_db (FAISS): The vector store.
+        embedding (list[float]): The query embedding.
+        k (int): Number of chunks returned.
+        filter (dict[str, Any]): The metadata filter.
+        metadata_index (MetadataIndex): Inverted index of the vector store metadata.
+    Returns:
+        list[tuple[Document, float]]: The chunks with their scores, best first.
+    """
+    import faiss
+
+    positions = metadata_index.select(filter)
+    if positions is None:
+        return vector_db.similarity_search_with_score_by_vector(
+            embedding, k=k, filter=filter, fetch_k=max(k, vector_db.index.ntotal)
+        )
+    if len(positions) == 0:
+        return []
+
+    query = np.asarray([embedding], dtype=np.float32)
+    if vector_db._normalize_L2:
+        faiss.normalize_L2(query)
+    index = vector_db.index
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        with _direct_map_lock:
+            if ivf.direct_map.type == faiss.DirectMap.NoMap:
+                ivf.make_direct_map()
+    scores, labels = _search_candidates(index, query[0], positions, k)
+
+    results = []
+    for position, score in zip(labels.tolist(), scores.tolist()):
+        doc = vector_db.docstore.search(vector_db.index_to_docstore_id[position])
+        if not isinstance(doc, Document):
+            raise ValueError(f"chunk at position {position} is not in the docstore")
+        results.append((doc, score))
+    return results
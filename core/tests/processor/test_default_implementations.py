@@ -14,7 +14,40 @@ def test___build_processor():
     assert issubclass(cls, ProcessorBase)
     assert "__init__" in cls.__dict__
     assert cls.supported_extensions == [FileExtension.txt]
+    assert not cls.supports_streaming
+    assert _build_processor(
+        "TestCLS", BaseLoader, [FileExtension.txt], lazy_loader=True
+    ).supports_streaming
     proc = cls()
     assert hasattr(proc, "loader_cls")
     # FIXME: proper mypy typing
     assert proc.loader_cls == BaseLoader  # type: ignore
+
+
+@pytest.mark.base
+@pytest.mark.asyncio
+async def test_default_processor_stream_csv(tmp_path):
+    from uuid import uuid4
+
+    from quivr_core.files.file import QuivrFile
+    from quivr_core.processor.implementations.default import CSVProcessor
+
+    path = tmp_path / "data.csv"
+    path.write_text("id,text\n" + "".join(f"{i},row {i}\n" for i in range(200)))
+    qfile = QuivrFile(
+        id=uuid4(),
+        brain_id=uuid4(),
+        original_filename=path.name,
+        path=path,
+        file_extension=FileExtension.csv,
+        file_sha1="123",
+    )
+    proc = CSVProcessor()
+
+    batches = [batch async for batch in proc.stream_file(qfile, batch_size=16)]
+    docs = await proc.process_file(qfile)
+
+    assert len(batches) > 1
+    streamed = [doc for batch in batches for doc in batch]
+    assert [d.page_content for d in streamed] == [d.page_content for d in docs]
+    assert [d.metadata for d in streamed] == [d.metadata for d in docs]
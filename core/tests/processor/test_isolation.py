@@ -0,0 +1,93 @@
+import os
+import signal
+import time
+
+import pytest
+from quivr_core.processor.isolation import (
+    IsolatedProcessPool,
+    IsolatedTaskError,
+    TaskMemoryError,
+    TaskTimeoutError,
+)
+
+
+def _sleep(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _allocate(n_bytes: int) -> int:
+    data = bytearray(n_bytes)
+    time.sleep(10)
+    return len(data)
+
+
+def _crash():
+    os._exit(3)
+
+
+def _raise():
+    raise ValueError("bad file")
+
+
+@pytest.fixture(scope="module")
+def pool():
+    executor = IsolatedProcessPool(
+        max_workers=1, timeout=2.0, max_rss_bytes=512 * 2**20
+    )
+    yield executor
+    executor.shutdown()
+
+
+def test_isolated_pool_runs_tasks(pool):
+    pid = pool.submit(_sleep, 0).result()
+
+    assert pid != os.getpid()
+    # The worker process is reused across tasks
+    assert pool.submit(_sleep, 0).result() == pid
+    with pytest.raises(ValueError, match="bad file"):
+        pool.submit(_raise).result()
+    assert pool.submit(_sleep, 0).result() == pid
+
+
+def test_isolated_pool_timeout(pool):
+    pid = pool.submit(_sleep, 0).result()
+
+    with pytest.raises(TaskTimeoutError):
+        pool.submit(_sleep, 30).result()
+
+    # The killed worker is replaced
+    assert pool.submit(_sleep, 0).result() != pid
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+def test_isolated_pool_memory_cap(pool):
+    with pytest.raises(TaskMemoryError):
+        pool.submit(_allocate, 1024 * 2**20).result()
+
+    assert pool.submit(_sleep, 0).result()
+
+
+def test_isolated_pool_worker_crash(pool):
+    with pytest.raises(IsolatedTaskError, match="exit code 3"):
+        pool.submit(_crash).result()
+
+    assert pool.submit(_sleep, 0).result()
+
+
+def test_isolated_pool_idle_worker_died(pool):
+    pid = pool.submit(_sleep, 0).result()
+    os.kill(pid, signal.SIGKILL)
+    time.sleep(0.2)
+
+    # The task is sent to a fresh worker
+    assert pool.submit(_sleep, 0).result() != pid
+
+
+def test_isolated_pool_shutdown():
+    executor = IsolatedProcessPool(max_workers=1)
+    assert executor.submit(_sleep, 0).result()
+    executor.shutdown()
+
+    with pytest.raises(RuntimeError):
+        executor.submit(_sleep, 0)
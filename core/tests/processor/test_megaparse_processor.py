@@ -0,0 +1,87 @@
+import asyncio
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from quivr_core.files.file import FileExtension, QuivrFile
+
+pytest.importorskip("megaparse_sdk.client")
+
+from quivr_core.processor.implementations.megaparse_processor import (  # noqa: E402
+    MegaparseProcessor,
+)
+
+
+class StubNATSClient:
+    # Stands in for MegaParseNATSClient, parse requests answer with the file name
+    opened = 0
+    requests: list[Path] = []
+    in_flight = 0
+    max_in_flight = 0
+
+    async def __aenter__(self):
+        StubNATSClient.opened += 1
+        return self
+
+    async def __aexit__(self, *args):
+        StubNATSClient.opened -= 1
+
+    async def parse_file(self, file: Path) -> str:
+        StubNATSClient.requests.append(file)
+        StubNATSClient.in_flight += 1
+        StubNATSClient.max_in_flight = max(
+            StubNATSClient.max_in_flight, StubNATSClient.in_flight
+        )
+        await asyncio.sleep(0.01)
+        StubNATSClient.in_flight -= 1
+        return f"content of {file.name}"
+
+
+@pytest.fixture
+def stub_client():
+    StubNATSClient.opened = 0
+    StubNATSClient.requests = []
+    StubNATSClient.in_flight = StubNATSClient.max_in_flight = 0
+    return StubNATSClient
+
+
+def _qfile(name: str, sha1: str) -> QuivrFile:
+    return QuivrFile(
+        id=uuid4(),
+        brain_id=uuid4(),
+        original_filename=name,
+        path=Path(name),
+        file_extension=FileExtension.pdf,
+        file_sha1=sha1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_megaparse_reuses_clients(stub_client):
+    processor = MegaparseProcessor(
+        n_clients=2, max_concurrent=3, client_factory=stub_client
+    )
+    files = [_qfile(f"{i}.pdf", f"sha1-{i}") for i in range(10)]
+
+    results = await asyncio.gather(*(processor.process_file(f) for f in files))
+
+    assert [docs[0].page_content for docs in results] == [
+        f"content of {i}.pdf" for i in range(10)
+    ]
+    assert stub_client.opened == 2
+    assert stub_client.max_in_flight == 3
+    await processor.aclose()
+    assert stub_client.opened == 0
+
+
+@pytest.mark.asyncio
+async def test_megaparse_parses_content_once(stub_client):
+    processor = MegaparseProcessor(client_factory=stub_client)
+    first, copy = _qfile("a.pdf", "same"), _qfile("b.pdf", "same")
+
+    # Concurrent and later parses of the same content share the first request
+    await asyncio.gather(processor.parse(first), processor.parse(copy))
+    assert await processor.parse(copy) == "content of a.pdf"
+
+    assert stub_client.requests == [first.path]
+    await processor.aclose()
@@ -0,0 +1,111 @@
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from quivr_core.files.file import FileExtension, QuivrFile
+from quivr_core.processor.processor_base import default_process_pool
+from quivr_core.processor.splitter import SplitterConfig
+
+pypdf = pytest.importorskip("pypdf")
+
+from pypdf.generic import (  # noqa: E402
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+)
+from quivr_core.processor.implementations.paged_pdf_processor import (  # noqa: E402
+    PagedPDFProcessor,
+)
+
+
+def _write_pdf(path: Path, pages: list[str]):
+    writer = pypdf.PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for text in pages:
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+    writer.write(path)
+
+
+@pytest.fixture
+def paged_pdf(tmp_path):
+    path = tmp_path / "report.pdf"
+    _write_pdf(path, [f"page {i} " + "lorem ipsum " * 10 for i in range(1, 12)])
+    return QuivrFile(
+        id=uuid4(),
+        brain_id=uuid4(),
+        original_filename=path.name,
+        path=path,
+        file_extension=FileExtension.pdf,
+        file_sha1="123",
+    )
+
+
+def test_page_ranges():
+    proc = PagedPDFProcessor(pages_per_range=4)
+
+    assert proc.page_ranges(10) == [(0, 4), (4, 8), (8, 10)]
+    assert proc.page_ranges(0) == []
+
+
+def test_split_pages_metadata():
+    proc = PagedPDFProcessor(
+        splitter=RecursiveCharacterTextSplitter(chunk_size=12, chunk_overlap=0)
+    )
+    pages = ["alpha beta gamma", "", "delta epsilon"]
+
+    docs = proc.split_pages(pages)
+
+    assert [(d.page_content, d.metadata) for d in docs] == [
+        ("alpha beta", {"page": 1, "page_end": 1}),
+        ("gamma", {"page": 1, "page_end": 1}),
+        ("delta", {"page": 3, "page_end": 3}),
+        ("epsilon", {"page": 3, "page_end": 3}),
+    ]
+
+
+def test_split_pages_chunk_across_pages():
+    proc = PagedPDFProcessor(
+        splitter=RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0)
+    )
+
+    docs = proc.split_pages(["end of page one", "start of page two"])
+
+    assert len(docs) == 1
+    assert docs[0].metadata == {"page": 1, "page_end": 2}
+
+
+@pytest.mark.asyncio
+async def test_paged_pdf_process_pool(paged_pdf):
+    proc = PagedPDFProcessor(
+        splitter_config=SplitterConfig(chunk_size=40, chunk_overlap=10),
+        pages_per_range=3,
+    )
+    executor = default_process_pool(max_workers=2)
+    try:
+        docs = await proc.process_file(paged_pdf, executor=executor)
+    finally:
+        executor.shutdown()
+    sequential = await proc.process_file(paged_pdf)
+
+    assert [d.page_content for d in docs] == [d.page_content for d in sequential]
+    assert [d.metadata for d in docs] == [d.metadata for d in sequential]
+    assert any(d.page_content.startswith("page ") for d in docs)
+    for doc in docs:
+        if doc.page_content.startswith("page "):
+            assert doc.metadata["page"] == int(doc.page_content.split()[1])
+    assert {d.metadata["page"] for d in docs} == set(range(1, 12))
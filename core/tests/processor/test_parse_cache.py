@@ -0,0 +1,70 @@
+from uuid import uuid4
+
+import pytest
+from quivr_core.files.file import QuivrFile
+from quivr_core.processor.implementations.simple_txt_processor import SimpleTxtProcessor
+from quivr_core.processor.parse_cache import ParseCache
+from quivr_core.processor.splitter import SplitterConfig
+
+
+class CountingTxtProcessor(SimpleTxtProcessor):
+    n_calls = 0
+
+    async def process_file_inner(self, file):
+        type(self).n_calls += 1
+        return await super().process_file_inner(file)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    CountingTxtProcessor.n_calls = 0
+    return ParseCache(cache_dir=tmp_path / "parse_cache")
+
+
+@pytest.mark.asyncio
+async def test_parse_cache_hit(cache, quivr_txt):
+    proc = CountingTxtProcessor(SplitterConfig(chunk_size=10, chunk_overlap=2))
+
+    docs = await proc.process_file(quivr_txt, cache=cache)
+    # Same content, different file
+    other_file = QuivrFile(
+        id=uuid4(),
+        brain_id=uuid4(),
+        original_filename="other.txt",
+        path=quivr_txt.path,
+        file_extension=quivr_txt.file_extension,
+        file_sha1=quivr_txt.file_sha1,
+    )
+    cached_docs = await proc.process_file(other_file, cache=cache)
+
+    assert CountingTxtProcessor.n_calls == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert [d.page_content for d in cached_docs] == [d.page_content for d in docs]
+    assert all(d.metadata["qfile_id"] == other_file.id for d in cached_docs)
+    assert all(d.metadata["original_file_name"] == "other.txt" for d in cached_docs)
+
+
+@pytest.mark.asyncio
+async def test_parse_cache_persistent(cache, quivr_txt):
+    proc = CountingTxtProcessor(SplitterConfig(chunk_size=10, chunk_overlap=2))
+    await proc.process_file(quivr_txt, cache=cache)
+
+    new_cache = ParseCache(cache_dir=cache.cache_dir)
+    await proc.process_file(quivr_txt, cache=new_cache)
+
+    assert CountingTxtProcessor.n_calls == 1
+    assert new_cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_parse_cache_key_processor_config(cache, quivr_txt):
+    proc = CountingTxtProcessor(SplitterConfig(chunk_size=10, chunk_overlap=2))
+    other_proc = CountingTxtProcessor(SplitterConfig(chunk_size=12, chunk_overlap=2))
+
+    assert cache.key(quivr_txt, proc) != cache.key(quivr_txt, other_proc)
+
+    await proc.process_file(quivr_txt, cache=cache)
+    await other_proc.process_file(quivr_txt, cache=cache)
+
+    assert CountingTxtProcessor.n_calls == 2
+    assert cache.stats.misses == 2
@@ -0,0 +1,45 @@
+import pickle
+
+import pytest
+from quivr_core.processor.implementations.simple_txt_processor import SimpleTxtProcessor
+from quivr_core.processor.processor_base import default_process_pool
+from quivr_core.processor.splitter import SplitterConfig
+
+
+@pytest.fixture(scope="module")
+def process_pool():
+    executor = default_process_pool(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_processor_pickle():
+    proc = SimpleTxtProcessor(
+        splitter_config=SplitterConfig(chunk_size=10, chunk_overlap=2)
+    )
+    proc_copy = pickle.loads(pickle.dumps(proc))
+
+    assert type(proc_copy) is SimpleTxtProcessor
+    assert proc_copy.splitter_config == proc.splitter_config
+
+
+@pytest.mark.base
+def test_build_processor_pickle():
+    from quivr_core.processor.implementations.default import CSVProcessor
+
+    assert pickle.loads(pickle.dumps(CSVProcessor)) is CSVProcessor
+    assert CSVProcessor.cpu_bound
+
+
+@pytest.mark.asyncio
+async def test_process_file_process_pool(quivr_txt, process_pool):
+    proc = SimpleTxtProcessor(
+        splitter_config=SplitterConfig(chunk_size=10, chunk_overlap=2)
+    )
+
+    docs = await proc.process_file(quivr_txt)
+    pool_docs = await proc.process_file(quivr_txt, executor=process_pool)
+
+    assert len(docs) > 1
+    assert [d.page_content for d in pool_docs] == [d.page_content for d in docs]
+    assert [d.metadata for d in pool_docs] == [d.metadata for d in docs]
@@ -0,0 +1,59 @@
+import pytest
+from langchain_text_splitters import CharacterTextSplitter
+from quivr_core.processor.implementations.default import (
+    DOCXProcessor,
+    TikTokenTxtProcessor,
+)
+from quivr_core.processor.implementations.simple_txt_processor import SimpleTxtProcessor
+from quivr_core.processor.implementations.tika_processor import TikaProcessor
+from quivr_core.processor.pool import ProcessorPool
+from quivr_core.processor.splitter import SplitterConfig
+
+
+def test_pool_reuses_processors():
+    pool = ProcessorPool()
+    processor = pool.get(SimpleTxtProcessor)
+
+    assert pool.get(SimpleTxtProcessor) is processor
+    assert (
+        pool.get(SimpleTxtProcessor, splitter_config=SplitterConfig()) is not processor
+    )
+    assert pool.get(SimpleTxtProcessor, splitter_config=SplitterConfig()) is pool.get(
+        SimpleTxtProcessor, splitter_config=SplitterConfig()
+    )
+    assert (
+        pool.get(SimpleTxtProcessor, splitter_config=SplitterConfig(chunk_size=100))
+        is not processor
+    )
+    assert len(pool) == 3
+
+
+def test_pool_unpicklable_kwargs():
+    pool = ProcessorPool()
+    # Lambdas can't be pickled: the splitter is compared by identity
+    splitter = CharacterTextSplitter(length_function=lambda s: len(s))
+    processor = pool.get(TikTokenTxtProcessor, splitter=splitter)
+
+    assert pool.get(TikTokenTxtProcessor, splitter=splitter) is processor
+    other_splitter = CharacterTextSplitter(length_function=lambda s: len(s))
+    assert pool.get(TikTokenTxtProcessor, splitter=other_splitter) is not processor
+
+
+def test_processors_share_splitter():
+    assert TikTokenTxtProcessor().text_splitter is DOCXProcessor().text_splitter
+    assert (
+        TikTokenTxtProcessor().text_splitter
+        is not TikTokenTxtProcessor(
+            splitter_config=SplitterConfig(chunk_size=100)
+        ).text_splitter
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_closes_processors():
+    async with ProcessorPool() as pool:
+        tika = pool.get(TikaProcessor, tika_url="http://localhost:9998/tika")
+        assert not tika.client._client.is_closed
+
+    assert tika.client._client.is_closed
+    assert len(pool) == 0
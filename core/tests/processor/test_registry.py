@@ -14,10 +14,14 @@ from quivr_core.processor.registry import (
     ProcMapping,
     _append_proc_mapping,
     _import_class,
+    _import_errors,
+    _registry,
     available_processors,
     get_processor_class,
     known_processors,
     register_processor,
+    warmup,
+    warmup_in_background,
 )
 
 
@@ -232,3 +236,66 @@ def test_register_override_error():
 
 def test_available_processors():
     assert 17 == len(available_processors())
+
+
+@pytest.fixture
+def restore_registry():
+    known, registered = dict(known_processors), dict(registry)
+    yield
+    for ext in set(known_processors) - set(known):
+        del known_processors[ext]
+    _registry.clear()
+    _registry.update(registered)
+
+
+@pytest.mark.usefixtures("restore_registry")
+def test_get_processor_class_keeps_known_processors():
+    ext = ".warm"
+    register_processor(ext, "quivr_core.nonexistent.Processor", errtxt="error")
+    register_processor(
+        ext,
+        "quivr_core.processor.implementations.simple_txt_processor.SimpleTxtProcessor",
+        priority=200,
+    )
+    entries = list(known_processors[ext])
+
+    assert get_processor_class(ext) is SimpleTxtProcessor
+    assert known_processors[ext] == entries
+    # The failed import is not attempted again
+    assert "quivr_core.nonexistent.Processor" in _import_errors
+
+    # A new entry takes over the resolved processor
+    register_processor(
+        ext,
+        "quivr_core.processor.implementations.tika_processor.TikaProcessor",
+        priority=0,
+    )
+    assert get_processor_class(ext) is TikaProcessor
+
+
+@pytest.mark.usefixtures("restore_registry")
+def test_warmup():
+    ext = ".warmup"
+    register_processor(
+        ext,
+        "quivr_core.processor.implementations.simple_txt_processor.SimpleTxtProcessor",
+    )
+    register_processor(".warmup_missing", "quivr_core.nonexistent.Other")
+
+    processors = warmup([ext, ".warmup_missing"])
+
+    assert processors == {ext: SimpleTxtProcessor, ".warmup_missing": None}
+    assert registry[ext] is SimpleTxtProcessor
+
+
+@pytest.mark.usefixtures("restore_registry")
+def test_warmup_in_background():
+    ext = ".warmup_bg"
+    register_processor(
+        ext,
+        "quivr_core.processor.implementations.simple_txt_processor.SimpleTxtProcessor",
+    )
+
+    warmup_in_background([ext]).join(timeout=30)
+
+    assert registry[ext] is SimpleTxtProcessor
@@ -1,11 +1,13 @@
+from uuid import uuid4
+
 import pytest
 from langchain_core.documents import Document
-from quivr_core.files.file import FileExtension
+from quivr_core.files.file import FileExtension, QuivrFile
 from quivr_core.processor.implementations.simple_txt_processor import (
     SimpleTxtProcessor,
     recursive_character_splitter,
 )
-from quivr_core.processor.splitter import SplitterConfig
+from quivr_core.processor.splitter import SplitterConfig, get_tiktoken_encoding
 
 
 def test_recursive_character_splitter():
@@ -31,3 +33,146 @@ async def test_simple_processor(quivr_pdf, quivr_txt):
 
     assert len(docs) == 1
     assert docs[0].page_content == "This is some test data."
+
+
+@pytest.mark.asyncio
+async def test_chunk_size_counts_final_content(quivr_txt):
+    proc = SimpleTxtProcessor(
+        splitter_config=SplitterConfig(chunk_size=10, chunk_overlap=2)
+    )
+    # Special tokens in the content are counted as text
+    quivr_txt.path.write_text("some data <|endoftext|> and more data")
+
+    docs = await proc.process_file(quivr_txt)
+
+    enc = get_tiktoken_encoding()
+    assert len(docs) > 1
+    for doc in docs:
+        assert doc.metadata["chunk_size"] == len(enc.encode_ordinary(doc.page_content))
+
+
+@pytest.mark.asyncio
+async def test_chunks_counted_once(quivr_txt, monkeypatch):
+    import quivr_core.processor.processor_base as processor_base
+
+    counted: list[str] = []
+
+    def count_tokens(texts: list[str]) -> list[int]:
+        counted.extend(texts)
+        return [len(t) for t in texts]
+
+    monkeypatch.setattr(processor_base, "count_tokens", count_tokens)
+    proc = SimpleTxtProcessor(
+        splitter_config=SplitterConfig(chunk_size=10, chunk_overlap=2)
+    )
+    quivr_txt.path.write_text("some data\u0000 and more data")
+
+    docs = await proc.process_file(quivr_txt)
+    assert sorted(counted) == sorted(d.page_content for d in docs)
+
+    counted.clear()
+    batches = [b async for b in proc.stream_file(quivr_txt, batch_size=2)]
+    assert sorted(counted) == sorted(d.page_content for b in batches for d in b)
+
+
+def _reference_splitter(text: str, chunk_size: int, chunk_overlap: int) -> list[str]:
+    # Boundaries of the former recursive implementation
+    if len(text) <= chunk_size:
+        return [text]
+    return [text[:chunk_size]] + _reference_splitter(
+        text[chunk_size - chunk_overlap :], chunk_size, chunk_overlap
+    )
+
+
+@pytest.mark.parametrize(
+    "length,chunk_size,chunk_overlap",
+    [(0, 4, 1), (4, 4, 1), (5, 4, 1), (100, 10, 0), (101, 10, 3), (997, 40, 39)],
+)
+def test_character_splitter_boundaries(length, chunk_size, chunk_overlap):
+    text = "".join(chr(ord("a") + i % 26) for i in range(length))
+    doc = Document(page_content=text)
+
+    docs = recursive_character_splitter(doc, chunk_size, chunk_overlap)
+
+    assert [d.page_content for d in docs] == _reference_splitter(
+        text, chunk_size, chunk_overlap
+    )
+
+
+def test_character_splitter_large_input(benchmark):
+    # 5MB: ~16k chunks, past the recursion limit of the former implementation
+    doc = Document(page_content="quivr " * 900_000)
+
+    docs = benchmark(recursive_character_splitter, doc, 400, 100)
+
+    assert len(docs) == -(-(len(doc.page_content) - 100) // 300)
+    assert all(len(d.page_content) == 400 for d in docs[:-1])
+
+
+@pytest.mark.asyncio
+async def test_simple_processor_stream(tmp_path):
+    path = tmp_path / "large.txt"
+    path.write_text("".join(f"ligne {i} é ✓\n" for i in range(5000)))
+    qfile = QuivrFile(
+        id=uuid4(),
+        brain_id=uuid4(),
+        original_filename=path.name,
+        path=path,
+        file_extension=FileExtension.txt,
+        file_sha1="123",
+    )
+    proc = SimpleTxtProcessor(
+        splitter_config=SplitterConfig(chunk_size=100, chunk_overlap=20)
+    )
+    # Blocks much smaller than the file, not aligned on chunks
+    proc.stream_block_size = 333
+
+    batches = [batch async for batch in proc.stream_file(qfile, batch_size=50)]
+    docs = await proc.process_file(qfile)
+
+    assert len(batches) == -(-len(docs) // 50)
+    assert all(len(batch) == 50 for batch in batches[:-1])
+    streamed = [doc for batch in batches for doc in batch]
+    assert [d.page_content for d in streamed] == [d.page_content for d in docs]
+    assert [d.metadata for d in streamed] == [d.metadata for d in docs]
+
+
+def test_postprocess_metadata(quivr_txt):
+    proc = SimpleTxtProcessor()
+    docs = [
+        Document(page_content="a\u0000b"),
+        Document(page_content="café \ud800", metadata={"page": 2}),
+        Document(page_content="x", metadata={"original_file_name": "f.txt"}),
+    ]
+
+    proc._postprocess(quivr_txt, docs, start=5)
+
+    assert [d.page_content for d in docs] == [
+        "ab",
+        "café ?",
+        "Filename: f.txt Content: x",
+    ]
+    assert [d.metadata["chunk_index"] for d in docs] == [5, 6, 7]
+    assert docs[1].metadata["page"] == 2
+    assert "page" not in docs[0].metadata
+    for doc in docs:
+        assert doc.metadata["qfile_id"] == quivr_txt.id
+        assert doc.metadata["processor_cls"] == "SimpleTxtProcessor"
+    # Each chunk owns its metadata
+    docs[0].metadata["key"] = "value"
+    assert "key" not in docs[2].metadata
+
+
+@pytest.mark.slow
+def test_postprocess_large_corpus(benchmark, quivr_txt):
+    proc = SimpleTxtProcessor()
+    n_chunks = 100_000
+
+    def setup():
+        docs = [
+            Document(page_content=f"chunk {i} of some test data é")
+            for i in range(n_chunks)
+        ]
+        return (quivr_txt, docs), {}
+
+    benchmark.pedantic(proc._postprocess, setup=setup, rounds=3)
@@ -1,5 +1,11 @@
+import asyncio
+
+import httpx
 import pytest
-from quivr_core.processor.implementations.tika_processor import TikaProcessor
+from quivr_core.processor.implementations.tika_processor import (
+    TikaClient,
+    TikaProcessor,
+)
 
 # TODO: TIKA server should be set
 
@@ -22,3 +28,87 @@ async def test_send_parse_tika_exception(quivr_pdf):
         doc = await tparser.process_file(quivr_pdf)
         assert len(doc) > 0
         assert doc[0].page_content.strip("\n") == "Dummy PDF download"
+
+
+def _tika_stub(responses: list[int], received: list[bytes], in_flight: list[int]):
+    # Stub Tika server: answers with the given status codes, then 200
+    state = {"current": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["current"] += 1
+        in_flight.append(state["current"])
+        try:
+            received.append(await request.aread())
+            await asyncio.sleep(0.01)
+            status = responses.pop(0) if responses else 200
+            return httpx.Response(status, text="Dummy PDF download")
+        finally:
+            state["current"] -= 1
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_tika_client_retries_with_backoff(quivr_pdf):
+    received, in_flight, latencies = [], [], []
+    client = TikaClient(
+        "http://tika/tika",
+        backoff_base=0.001,
+        transport=_tika_stub([503, 429], received, in_flight),
+        on_request=latencies.append,
+    )
+    tparser = TikaProcessor(client=client)
+
+    docs = await tparser.process_file(quivr_pdf)
+
+    assert docs[0].page_content == "Dummy PDF download"
+    # The file is streamed again on each attempt
+    assert received == [quivr_pdf.path.read_bytes()] * 3
+    metrics = tparser.request_metrics
+    assert (metrics.n_requests, metrics.n_retries, metrics.n_failures) == (3, 2, 0)
+    assert len(latencies) == 3
+    assert metrics.total_latency == pytest.approx(sum(latencies))
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_tika_client_client_error_not_retried(quivr_pdf):
+    received, in_flight = [], []
+    client = TikaClient(
+        "http://tika/tika",
+        backoff_base=0.001,
+        transport=_tika_stub([422], received, in_flight),
+    )
+
+    with pytest.raises(RuntimeError) as exc_info:
+        await client.parse(quivr_pdf)
+
+    assert isinstance(exc_info.value.__cause__, httpx.HTTPStatusError)
+    assert len(received) == 1
+    assert client.metrics.n_failures == 1
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_tika_client_max_in_flight(quivr_pdf):
+    received, in_flight = [], []
+    client = TikaClient(
+        "http://tika/tika",
+        max_in_flight=2,
+        transport=_tika_stub([], received, in_flight),
+    )
+
+    texts = await asyncio.gather(*(client.parse(quivr_pdf) for _ in range(8)))
+
+    assert texts == ["Dummy PDF download"] * 8
+    assert max(in_flight) == 2
+    await client.aclose()
+
+
+def test_tika_client_timeout_grows_with_size():
+    client = TikaClient(timeout=5.0, timeout_per_mb=2.0)
+
+    small, large = client.request_timeout(0), client.request_timeout(10 * 2**20)
+
+    assert small.read == 5.0 and small.connect == 5.0
+    assert large.read == 25.0 and large.write == 25.0 and large.connect == 5.0
@@ -1,13 +1,18 @@
+import os
 from dataclasses import asdict
+from pathlib import Path
 from uuid import uuid4
 
 import pytest
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from quivr_core.brain import Brain
+from quivr_core.files.file import QuivrFile
 from quivr_core.rag.entities.chat import ChatHistory
 from quivr_core.llm import LLMEndpoint
-from quivr_core.storage.local_storage import TransparentStorage
+from quivr_core.processor.processor_base import ProcessorBase
+from quivr_core.processor.registry import register_processor
+from quivr_core.storage.local_storage import LocalStorage, TransparentStorage
 
 
 @pytest.mark.base
@@ -149,3 +154,260 @@ def test_brain_info_empty(fake_llm: LLMEndpoint, embedder, mem_vector_store):
         },
         "llm_info": asdict(fake_llm.info()),
     }
+
+
+@pytest.mark.asyncio
+async def test_brain_add_remove_file(
+    fake_llm: LLMEndpoint, embedder, temp_data_file, tmp_path, mem_vector_store
+):
+    brain = await Brain.afrom_files(
+        name="test_brain",
+        file_paths=[temp_data_file],
+        storage=TransparentStorage(),
+        embedder=embedder,
+        llm=fake_llm,
+        vector_db=mem_vector_store,
+    )
+    n_chunks = len(mem_vector_store.store)
+
+    other_file = tmp_path / "other.txt"
+    other_file.write_text("Some other test data.")
+    result = await brain.aadd_file(other_file)
+
+    assert result.success
+    assert brain.storage.nb_files() == 2
+    assert len(mem_vector_store.store) == n_chunks + result.n_chunks
+
+    await brain.aremove_file(result.file.id)
+
+    assert brain.storage.nb_files() == 1
+    assert len(mem_vector_store.store) == n_chunks
+    assert not set(result.chunk_ids) & set(mem_vector_store.store)
+
+    with pytest.raises(FileNotFoundError):
+        await brain.aremove_file(result.file.id)
+
+
+@pytest.mark.asyncio
+async def test_brain_replace_file(
+    fake_llm: LLMEndpoint, embedder, temp_data_file, tmp_path, mem_vector_store
+):
+    brain = await Brain.afrom_files(
+        name="test_brain",
+        file_paths=[temp_data_file],
+        storage=TransparentStorage(),
+        embedder=embedder,
+        llm=fake_llm,
+        vector_db=mem_vector_store,
+    )
+    (old_result,) = brain.ingestion_results
+
+    temp_data_file.write_text("This is some updated test data.")
+    result = await brain.areplace_file(old_result.file.id, temp_data_file)
+
+    files = await brain.storage.get_files()
+    assert [f.id for f in files] == [result.file.id]
+    assert set(mem_vector_store.store) == set(result.chunk_ids)
+    assert all("updated" in doc["text"] for doc in mem_vector_store.store.values())
+
+
+@pytest.mark.asyncio
+async def test_brain_replace_file_failure_keeps_old_file(
+    fake_llm: LLMEndpoint, embedder, temp_data_file, tmp_path, mem_vector_store
+):
+    brain = await Brain.afrom_files(
+        name="test_brain",
+        file_paths=[temp_data_file],
+        storage=TransparentStorage(),
+        embedder=embedder,
+        llm=fake_llm,
+        vector_db=mem_vector_store,
+    )
+    (old_result,) = brain.ingestion_results
+    unsupported = tmp_path / "new.unknown"
+    unsupported.write_text("can't be parsed")
+
+    with pytest.raises(Exception):
+        await brain.areplace_file(old_result.file.id, unsupported)
+
+    # The new version is not left in the storage
+    assert [f.id for f in await brain.storage.get_files()] == [old_result.file.id]
+    assert set(old_result.chunk_ids) <= set(mem_vector_store.store)
+
+
+@pytest.mark.asyncio
+async def test_brain_remove_file_unknown_chunks(
+    fake_llm: LLMEndpoint, embedder, temp_data_file, mem_vector_store
+):
+    brain = await Brain.afrom_files(
+        name="test_brain",
+        file_paths=[temp_data_file],
+        storage=TransparentStorage(),
+        embedder=embedder,
+        llm=fake_llm,
+        vector_db=mem_vector_store,
+    )
+    (result,) = brain.ingestion_results
+    # Another instance over the same stores didn't ingest the file
+    other = Brain(
+        name="other_brain",
+        id=brain.id,
+        llm=fake_llm,
+        embedder=embedder,
+        vector_db=mem_vector_store,
+        storage=brain.storage,
+    )
+
+    with pytest.raises(ValueError):
+        await other.aremove_file(result.file.id)
+
+    assert brain.storage.nb_files() == 1
+    assert set(result.chunk_ids) <= set(mem_vector_store.store)
+
+
+@pytest.mark.base
+@pytest.mark.asyncio
+async def test_brain_remove_file_faiss(
+    fake_llm: LLMEndpoint, embedder, temp_data_file, tmp_path
+):
+    other_file = tmp_path / "other.txt"
+    other_file.write_text("Some other test data.")
+    brain = await Brain.afrom_files(
+        name="test_brain",
+        file_paths=[temp_data_file, other_file],
+        storage=TransparentStorage(),
+        embedder=embedder,
+        llm=fake_llm,
+    )
+    kept, removed = brain.ingestion_results
+
+    # The file -> chunks map is rebuilt from the chunks metadata, on first use
+    loaded = Brain(
+        id=brain.id,
+        name="loaded",
+        llm=fake_llm,
+        embedder=embedder,
+        storage=brain.storage,
+        vector_db=brain.vector_db,
+    )
+    assert loaded._file_chunk_ids is None
+    await loaded.aremove_file(removed.file.id)
+
+    assert loaded.vector_db.index.ntotal == kept.n_chunks
+    assert set(loaded.vector_db.index_to_docstore_id.values()) == set(kept.chunk_ids)
+
+
+@pytest.mark.asyncio
+async def test_brain_sync_directory(
+    fake_llm: LLMEndpoint, embedder, tmp_path, mem_vector_store
+):
+    folder = tmp_path / "folder"
+    (folder / "sub").mkdir(parents=True)
+    for name in ("a.txt", "b.txt", "sub/c.txt"):
+        (folder / name).write_text(f"content of {name}")
+    brain = await Brain.afrom_files(
+        name="test_brain",
+        file_paths=sorted(folder.rglob("*.txt")),
+        storage=TransparentStorage(),
+        embedder=embedder,
+        llm=fake_llm,
+        vector_db=mem_vector_store,
+    )
+
+    result = await brain.async_directory(folder)
+    assert result.n_unchanged == 3
+    assert not (result.added or result.updated or result.removed)
+
+    (folder / "a.txt").write_text("new content of a.txt")
+    (folder / "sub" / "c.txt").unlink()
+    (folder / "d.txt").write_text("content of d.txt")
+    # Touched but identical: not re-indexed
+    os.utime(folder / "b.txt", ns=(0, 0))
+
+    result = await brain.async_directory(folder)
+
+    assert [r.file.original_filename for r in result.added] == ["d.txt"]
+    assert [r.file.original_filename for r in result.updated] == ["a.txt"]
+    assert [f.original_filename for f in result.removed] == ["c.txt"]
+    assert result.n_unchanged == 1
+    contents = sorted(doc["text"] for doc in mem_vector_store.store.values())
+    assert contents == [
+        "content of b.txt",
+        "content of d.txt",
+        "new content of a.txt",
+    ]
+
+    result = await brain.async_directory(folder)
+    assert result.n_unchanged == 3
+
+
+@pytest.mark.asyncio
+async def test_brain_sync_directory_duplicate_content(
+    fake_llm: LLMEndpoint, embedder, tmp_path, mem_vector_store
+):
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    (folder / "a.txt").write_text("shared content")
+    brain = await Brain.afrom_files(
+        name="test_brain",
+        file_paths=[folder / "a.txt"],
+        storage=LocalStorage(tmp_path / "storage"),
+        embedder=embedder,
+        llm=fake_llm,
+        vector_db=mem_vector_store,
+    )
+
+    # Same content as a stored file: added, not a storage conflict
+    (folder / "copy.txt").write_text("shared content")
+    result = await brain.async_directory(folder)
+
+    assert [r.file.original_filename for r in result.added] == ["copy.txt"]
+    assert len(await brain.storage.get_files()) == 2
+
+
+class FragileProcessor(ProcessorBase):
+    """One chunk per file, raises on files containing `fail`."""
+
+    supported_extensions = [".fragile"]
+
+    @property
+    def processor_metadata(self):
+        return {"processor_cls": "FragileProcessor"}
+
+    async def process_file_inner(self, file: QuivrFile) -> list[Document]:
+        content = Path(file.path).read_text()
+        if "fail" in content:
+            raise ValueError(f"can't parse {file}")
+        return [Document(page_content=content)]
+
+
+@pytest.mark.asyncio
+async def test_brain_sync_directory_failed_update(
+    fake_llm: LLMEndpoint, embedder, tmp_path, mem_vector_store
+):
+    register_processor(".fragile", FragileProcessor, override=True)
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    for name in ("a", "b", "c"):
+        (folder / f"{name}.fragile").write_text(f"content of {name}")
+    brain = await Brain.afrom_files(
+        name="test_brain",
+        file_paths=sorted(folder.iterdir()),
+        storage=TransparentStorage(),
+        embedder=embedder,
+        llm=fake_llm,
+        vector_db=mem_vector_store,
+    )
+
+    (folder / "a.fragile").write_text("new content of a")
+    (folder / "b.fragile").write_text("fail")
+    (folder / "c.fragile").unlink()
+    result = await brain.async_directory(folder, skip_file_error=True)
+
+    assert [r.success for r in result.updated] == [True, False]
+    assert [f.original_filename for f in result.removed] == ["c.fragile"]
+    # b.fragile keeps its previous version
+    contents = sorted(doc["text"] for doc in mem_vector_store.store.values())
+    assert contents == ["content of b", "new content of a"]
+    files = await brain.storage.get_files()
+    assert sorted(f.original_filename for f in files) == ["a.fragile", "b.fragile"]
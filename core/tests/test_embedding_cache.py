@@ -0,0 +1,99 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from quivr_core.embeddings.cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    n_embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.n_embedded += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        self.n_embedded += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def counting_embedder():
+    return CountingEmbedding(size=8)
+
+
+def test_cached_embeddings(tmp_path, counting_embedder):
+    embedder = CachedEmbeddings(counting_embedder, cache_dir=tmp_path)
+    texts = ["a", "b", "a", "c"]
+
+    vectors = embedder.embed_documents(texts)
+    # Duplicates are embedded once
+    assert counting_embedder.n_embedded == 3
+    assert vectors == [
+        pytest.approx(v) for v in counting_embedder.embed_documents(texts)
+    ]
+
+    counting_embedder.n_embedded = 0
+    assert embedder.embed_documents(["c", "b"]) == [vectors[3], vectors[1]]
+    assert counting_embedder.n_embedded == 0
+    assert (embedder.stats.hits, embedder.stats.misses) == (2, 4)
+
+
+def test_cached_embeddings_persistent(tmp_path, counting_embedder):
+    vectors = CachedEmbeddings(counting_embedder, cache_dir=tmp_path).embed_documents(
+        ["a", "b"]
+    )
+
+    counting_embedder.n_embedded = 0
+    embedder = CachedEmbeddings(counting_embedder, cache_dir=tmp_path)
+    assert embedder.embed_documents(["a", "b"]) == vectors
+    assert counting_embedder.n_embedded == 0
+
+
+def test_cached_embeddings_model_namespace(tmp_path, counting_embedder):
+    CachedEmbeddings(counting_embedder, cache_dir=tmp_path).embed_documents(["a"])
+
+    counting_embedder.n_embedded = 0
+    other = CachedEmbeddings(counting_embedder, cache_dir=tmp_path, model_name="other")
+    other.embed_documents(["a"])
+    assert counting_embedder.n_embedded == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_query(tmp_path, counting_embedder):
+    embedder = CachedEmbeddings(counting_embedder, cache_dir=tmp_path)
+
+    vector = await embedder.aembed_query("question")
+    assert await embedder.aembed_query("question") == vector
+    assert embedder.embed_query("question") == vector
+    assert counting_embedder.n_embedded == 1
+
+
+def test_embedding_cache_eviction(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_entries=3)
+    keys = [EmbeddingCache.key(str(i)) for i in range(4)]
+    cache.put(keys[:3], [[float(i)] * 2 for i in range(3)])
+    # Refresh key 0, key 1 becomes the least recently used
+    cache.get([keys[0]])
+    cache.put([keys[3]], [[3.0, 3.0]])
+
+    assert len(cache) == 3
+    assert cache.get(keys) == [[0.0, 0.0], None, [2.0, 2.0], [3.0, 3.0]]
+
+    reloaded = EmbeddingCache(tmp_path, max_entries=3)
+    assert reloaded.get(keys) == [[0.0, 0.0], None, [2.0, 2.0], [3.0, 3.0]]
+
+
+def test_embedding_cache_eviction_crash(tmp_path, monkeypatch):
+    cache = EmbeddingCache(tmp_path, max_entries=2)
+    keys = [EmbeddingCache.key(str(i)) for i in range(3)]
+    cache.put(keys[:2], [[0.0, 0.0], [1.0, 1.0]])
+
+    # Crash after the slot of key 0 is overwritten, before key 2 is bound to it
+    def crash():
+        raise OSError("crash")
+
+    monkeypatch.setattr(cache._vectors, "flush", crash)
+    with pytest.raises(OSError):
+        cache.put([keys[2]], [[2.0, 2.0]])
+
+    reloaded = EmbeddingCache(tmp_path, max_entries=2)
+    assert reloaded.get(keys) == [None, [1.0, 1.0], None]
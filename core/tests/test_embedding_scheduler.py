@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from quivr_core.embeddings.scheduler import (
+    EmbeddingScheduler,
+    EmbeddingSchedulerConfig,
+    _TokenBudget,
+)
+
+
+class FakeEmbeddingsServer(Embeddings):
+    """
+    Embeddings server. Requests are held until `release_at` requests are in
+    flight at the same time, then all are answered.
+    """
+
+    def __init__(self, release_at: int = 1, fail_on: int | None = None):
+        self.release_at = release_at
+        self.fail_on = fail_on
+        self.requests: list[list[str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.n_cancelled = 0
+        self._released = asyncio.Event()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [[float(len(t)), float(sum(map(ord, t)))] for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.requests.append(texts)
+        if len(self.requests) == self.fail_on:
+            raise RuntimeError("embedding failed")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.in_flight >= self.release_at:
+            self._released.set()
+        try:
+            await self._released.wait()
+        except asyncio.CancelledError:
+            self.n_cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return self.embed_documents(texts)
+
+
+def make_docs(n: int, chunk_size: int = 100) -> list[Document]:
+    return [
+        Document(page_content=f"chunk {i}", metadata={"chunk_size": chunk_size})
+        for i in range(n)
+    ]
+
+
+def test_pack_by_tokens():
+    scheduler = EmbeddingScheduler(
+        FakeEmbeddingsServer(),
+        EmbeddingSchedulerConfig(max_batch_tokens=250, max_batch_size=10),
+    )
+    docs = make_docs(5) + [Document(page_content="x" * 800)]
+
+    # 2 chunks of 100 tokens per batch, the last one is estimated from its length
+    assert scheduler.pack(docs) == [[0, 1], [2, 3], [4], [5]]
+
+
+@pytest.mark.asyncio
+async def test_embed_documents_order():
+    server = FakeEmbeddingsServer()
+    scheduler = EmbeddingScheduler(
+        server, EmbeddingSchedulerConfig(max_batch_tokens=300, max_concurrency=4)
+    )
+    docs = make_docs(20)
+
+    vectors = await scheduler.aembed_documents(docs)
+
+    assert len(server.requests) == 7
+    assert vectors == server.embed_documents([d.page_content for d in docs])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+async def test_concurrent_batches(max_concurrency):
+    # Requests are answered once max_concurrency of them are in flight
+    server = FakeEmbeddingsServer(release_at=max_concurrency)
+    scheduler = EmbeddingScheduler(
+        server,
+        EmbeddingSchedulerConfig(max_batch_tokens=400, max_concurrency=max_concurrency),
+    )
+
+    await asyncio.wait_for(scheduler.aembed_documents(make_docs(32)), timeout=5)
+
+    assert len(server.requests) == 8
+    assert server.max_in_flight == max_concurrency
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_cancels_others():
+    # The third request fails while the first two are held
+    server = FakeEmbeddingsServer(release_at=100, fail_on=3)
+    scheduler = EmbeddingScheduler(
+        server, EmbeddingSchedulerConfig(max_batch_tokens=400, max_concurrency=4)
+    )
+
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        await asyncio.wait_for(scheduler.aembed_documents(make_docs(32)), timeout=5)
+
+    # The other requests sent are cancelled, not answered in the background
+    assert server.n_cancelled == len(server.requests) - 1
+    assert server.in_flight == 0
+    # Batches still waiting for the semaphore are never sent
+    assert len(server.requests) < 8
+
+
+@pytest.mark.asyncio
+async def test_token_budget():
+    budget = _TokenBudget(tokens_per_minute=60_000)
+    await budget.acquire(60_000)
+
+    start = time.perf_counter()
+    await budget.acquire(500)
+
+    assert time.perf_counter() - start >= 0.4
@@ -0,0 +1,243 @@
+from uuid import uuid4
+
+import pytest
+from langchain_core.documents import Document
+from quivr_core.brain import Brain
+from quivr_core.rag.entities.config import HybridSearchConfig, RetrievalConfig
+from quivr_core.rag.quivr_rag_langgraph import QuivrQARAGLangGraph
+from quivr_core.storage.local_storage import TransparentStorage
+
+faiss = pytest.importorskip("faiss")
+
+from langchain_community.vectorstores import FAISS  # noqa: E402
+from quivr_core.vectorstore import (  # noqa: E402
+    BM25Index,
+    HybridRetriever,
+    VectorIndexConfig,
+    delete_chunks,
+    reciprocal_rank_fusion,
+)
+from quivr_core.vectorstore.bm25 import tokenize  # noqa: E402
+
+
+def make_docs(n=200):
+    docs = [
+        Document(page_content=f"maintenance notes {i} for the pump assembly")
+        for i in range(n)
+    ]
+    docs[137] = Document(page_content="replace the XJ-200 valve seal every year")
+    return docs
+
+
+@pytest.fixture
+def vector_db(embedder):
+    return FAISS.from_documents(make_docs(), embedder)
+
+
+def test_tokenize_identifiers():
+    assert tokenize("Call os.path.join on XJ-200, v1.2!") == [
+        "call",
+        "os.path.join",
+        "os",
+        "path",
+        "join",
+        "on",
+        "xj-200",
+        "xj",
+        "200",
+        "v1.2",
+        "v1",
+        "2",
+    ]
+
+
+def test_bm25_ranks_exact_terms():
+    index = BM25Index()
+    index.add(
+        ["a", "b", "c"],
+        ["the pump valve", "the XJ-200 valve", "the pump and the pump motor"],
+    )
+
+    assert [i for i, _ in index.search("xj-200", k=3)] == ["b"]
+    assert [i for i, _ in index.search("pump", k=3)] == ["c", "a"]
+    assert index.search("unknown", k=3) == []
+
+    index.delete(["c", "missing"])
+    assert len(index) == 2
+    assert [i for i, _ in index.search("pump", k=3)] == ["a"]
+    with pytest.raises(ValueError):
+        index.add(["a"], ["duplicate"])
+
+
+def test_bm25_concurrent_add_search():
+    from concurrent.futures import ThreadPoolExecutor
+
+    index = BM25Index()
+    index.add(["seed"], ["the XJ-200 valve"])
+
+    def add(batch: int):
+        ids = [f"{batch}-{i}" for i in range(100)]
+        index.add(ids, [f"pump {i} XJ-200 notes" for i in range(100)])
+
+    def search(_):
+        return index.search("xj-200 pump", k=10)
+
+    with ThreadPoolExecutor(8) as pool:
+        adds = [pool.submit(add, batch) for batch in range(20)]
+        searches = list(pool.map(search, range(200)))
+        for future in adds:
+            future.result()
+
+    assert len(index) == 2001
+    assert all(results for results in searches)
+    assert len(index.search("xj-200", k=5000)) == 2001
+
+
+def test_bm25_save_load(tmp_path):
+    index = BM25Index(k1=1.2)
+    index.add(
+        [f"id{i}" for i in range(50)], [f"chunk {i} part P-{i % 7}" for i in range(50)]
+    )
+    index.delete(["id3", "id10"])
+
+    index.save(tmp_path / "bm25")
+    loaded = BM25Index.load(tmp_path / "bm25")
+
+    assert loaded.k1 == 1.2
+    assert len(loaded) == 48 and "id3" not in loaded
+    for query in ["p-3", "chunk 12", "part"]:
+        assert loaded.search(query, k=10) == pytest.approx(index.search(query, k=10))
+    loaded.add(["id3"], ["chunk 3 part P-3"])
+    assert loaded.search("chunk 3", k=1)[0][0] == "id3"
+
+
+def test_reciprocal_rank_fusion():
+    dense = ["a", "b", "c"]
+    sparse = ["c", "d"]
+    # c: 1/63 + 1/61, a: 1/61, b: 1/62, d: 1/62
+    assert reciprocal_rank_fusion([dense, sparse], k=60) == ["c", "a", "b", "d"]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_retriever_finds_identifiers(vector_db):
+    sparse_index = BM25Index.from_faiss(vector_db)
+    target = vector_db.index_to_docstore_id[137]
+    query = "how often is the XJ-200 seal replaced?"
+
+    dense = await vector_db.as_retriever(search_kwargs={"k": 3}).ainvoke(query)
+    assert "XJ-200" not in " ".join(d.page_content for d in dense)
+
+    retriever = HybridRetriever(vector_store=vector_db, sparse_index=sparse_index, k=3)
+    docs = await retriever.ainvoke(query)
+    assert len(docs) == 3
+    # First of the BM25 ranking, tied with the first of the dense ranking
+    assert vector_db.docstore.search(target) in docs[:2]
+    assert retriever.invoke(query) == docs
+
+    delete_chunks(vector_db, [target])
+    sparse_index.delete([target])
+    docs = await retriever.ainvoke(query)
+    assert "XJ-200" not in " ".join(d.page_content for d in docs)
+
+
+def test_hybrid_retriever_depth_follows_k(vector_db):
+    retriever = HybridRetriever(
+        vector_store=vector_db,
+        sparse_index=BM25Index.from_faiss(vector_db),
+        k=10,
+        dense_k=2,
+        sparse_k=2,
+    )
+    # Rankings are at least k deep, e.g. when dynamic retrieval raises k
+    assert len(retriever.invoke("pump maintenance notes")) == 10
+
+
+@pytest.mark.asyncio
+async def test_rag_get_retriever(vector_db, fake_llm):
+    config = RetrievalConfig(hybrid_search=HybridSearchConfig(rrf_k=10))
+    rag = QuivrQARAGLangGraph(
+        retrieval_config=config,
+        llm=fake_llm,
+        vector_store=vector_db,
+        sparse_index=BM25Index.from_faiss(vector_db),
+    )
+    retriever = rag.get_retriever(search_kwargs={"k": 5})
+    assert isinstance(retriever, HybridRetriever)
+    assert retriever.k == 5 and retriever.rrf_k == 10
+
+    rag = QuivrQARAGLangGraph(
+        retrieval_config=config, llm=fake_llm, vector_store=vector_db
+    )
+    with pytest.raises(ValueError):
+        rag.get_retriever(search_kwargs={"k": 5})
+
+
+@pytest.mark.asyncio
+async def test_brain_sparse_index_ingestion(fake_llm, embedder, tmp_path, answers):
+    paths = []
+    for i, text in enumerate(["pump maintenance notes", "valve XJ-200 datasheet"]):
+        path = tmp_path / f"file_{i}.txt"
+        path.write_text(text)
+        paths.append(path)
+
+    brain = await Brain.afrom_files(
+        name="hybrid",
+        file_paths=paths,
+        embedder=embedder,
+        llm=fake_llm,
+        vector_index_config=VectorIndexConfig(sparse_index=True),
+    )
+    assert brain.sparse_index is not None
+    assert len(brain.sparse_index) == brain.vector_db.index.ntotal  # type: ignore
+    assert brain.sparse_index.search("xj-200", k=1)
+
+    datasheet = brain.ingestion_results[1].file
+    await brain.aremove_file(datasheet.id)
+    assert brain.sparse_index.search("xj-200", k=1) == []
+
+    response = ""
+    retrieval_config = RetrievalConfig(
+        llm_config=fake_llm.get_config(), hybrid_search=HybridSearchConfig()
+    )
+    async for chunk in brain.ask_streaming("question", retrieval_config):
+        response += chunk.answer
+    assert response == answers[1]
+
+
+@pytest.mark.asyncio
+async def test_brain_hybrid_search_requires_sparse_index(vector_db, fake_llm):
+    brain = Brain(id=uuid4(), name="dense", llm=fake_llm, vector_db=vector_db)
+    retrieval_config = RetrievalConfig(
+        llm_config=fake_llm.get_config(), hybrid_search=HybridSearchConfig()
+    )
+
+    # Not built on the first question
+    with pytest.raises(ValueError):
+        async for _ in brain.ask_streaming("question", retrieval_config):
+            pass
+    assert brain.sparse_index is None
+
+
+@pytest.mark.asyncio
+async def test_brain_save_load_sparse_index(vector_db, fake_llm, tmp_path, monkeypatch):
+    from langchain_openai import OpenAIEmbeddings
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    brain = Brain(
+        id=uuid4(),
+        name="hybrid",
+        llm=fake_llm,
+        embedder=OpenAIEmbeddings(),
+        vector_db=vector_db,
+        storage=TransparentStorage(),
+        vector_index_config=VectorIndexConfig(sparse_index=True),
+    )
+    assert brain.sparse_index is not None and len(brain.sparse_index) == 200
+
+    path = await brain.save(tmp_path)
+    brain_loaded = Brain.load(path)
+
+    assert brain_loaded.sparse_index is not None
+    assert brain_loaded.sparse_index.search("xj-200", k=5) == pytest.approx(
+        brain.sparse_index.search("xj-200", k=5)
+    )
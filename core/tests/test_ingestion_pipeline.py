@@ -0,0 +1,451 @@
+import asyncio
+import hashlib
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from quivr_core.files.file import QuivrFile
+from quivr_core.ingestion.checkpoint import IngestionCheckpoint
+from quivr_core.ingestion.pipeline import IngestionPipeline, PipelineConfig
+from quivr_core.processor.isolation import TaskTimeoutError
+from quivr_core.processor.processor_base import ProcessorBase
+from quivr_core.processor.registry import register_processor
+from quivr_core.storage.local_storage import TransparentStorage
+
+EXT = ".ingest"
+
+
+class SlowLineProcessor(ProcessorBase):
+    """One chunk per line, raises on files containing `fail`."""
+
+    supported_extensions = [EXT]
+    in_flight = 0
+    max_in_flight = 0
+    processed: list[str] = []
+
+    @property
+    def processor_metadata(self):
+        return {"processor_cls": "SlowLineProcessor"}
+
+    async def process_file_inner(self, file: QuivrFile) -> list[Document]:
+        cls = type(self)
+        cls.in_flight += 1
+        cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        cls.processed.append(file.original_filename)
+        try:
+            await asyncio.sleep(0.01)
+            content = Path(file.path).read_text()
+            if "fail" in content:
+                raise ValueError(f"can't parse {file}")
+            return [Document(page_content=line) for line in content.splitlines()]
+        finally:
+            cls.in_flight -= 1
+
+
+HANG_EXT = ".hang"
+
+
+class HangLineProcessor(SlowLineProcessor):
+    """CPU bound line processor, hangs on files containing `hang`."""
+
+    supported_extensions = [HANG_EXT]
+    cpu_bound = True
+
+    async def process_file_inner(self, file: QuivrFile) -> list[Document]:
+        if "hang" in Path(file.path).read_text():
+            time.sleep(60)
+        return await super().process_file_inner(file)
+
+
+STREAM_EXT = ".stream"
+
+
+class StreamLineProcessor(ProcessorBase):
+    """Streams one chunk per line, logging when each line is read."""
+
+    supported_extensions = [STREAM_EXT]
+    supports_streaming = True
+    events: list[str] = []
+
+    @property
+    def processor_metadata(self):
+        return {"processor_cls": "StreamLineProcessor"}
+
+    async def process_file_inner(self, file: QuivrFile) -> list[Document]:
+        raise NotImplementedError
+
+    async def stream_file_inner(self, file: QuivrFile):
+        with open(file.path) as f:
+            for line in f:
+                await asyncio.sleep(0)
+                type(self).events.append("read")
+                yield Document(page_content=line.strip())
+
+
+class EventEmbedder(DeterministicFakeEmbedding):
+    async def aembed_documents(self, texts):
+        StreamLineProcessor.events.append("embed")
+        return await super().aembed_documents(texts)
+
+
+@pytest.fixture(autouse=True)
+def line_processor():
+    register_processor(STREAM_EXT, StreamLineProcessor, override=True)
+    StreamLineProcessor.events = []
+    register_processor(EXT, SlowLineProcessor, override=True)
+    SlowLineProcessor.in_flight = 0
+    SlowLineProcessor.max_in_flight = 0
+    SlowLineProcessor.processed = []
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"file_{i}{EXT}"
+        path.write_text("\n".join(f"file {i} line {j}" for j in range(i + 1)))
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.asyncio
+async def test_pipeline_ingests_all_files(files, embedder, mem_vector_store):
+    storage = TransparentStorage()
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=storage,
+        embedder=embedder,
+        vector_db=mem_vector_store,
+    )
+    results = await pipeline.run(files)
+
+    assert [r.path for r in results] == files
+    assert all(r.success for r in results)
+    assert [r.n_chunks for r in results] == list(range(1, 11))
+    assert all(len(r.chunk_ids) == r.n_chunks for r in results)
+    assert storage.nb_files() == len(files)
+    assert len(mem_vector_store.store) == sum(range(1, 11))
+
+
+@pytest.mark.asyncio
+async def test_pipeline_extra_hashes(files, embedder, mem_vector_store):
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=TransparentStorage(),
+        embedder=embedder,
+        vector_db=mem_vector_store,
+        config=PipelineConfig(extra_hashes=("blake2b",)),
+    )
+    results = await pipeline.run(files[:2])
+
+    for result in results:
+        assert result.file is not None
+        digest = hashlib.blake2b(result.path.read_bytes()).hexdigest()
+        assert result.file.metadata["file_blake2b"] == digest
+    with pytest.raises(ValueError):
+        PipelineConfig(extra_hashes=("unknown",))
+
+
+@pytest.mark.asyncio
+async def test_pipeline_bounded_parse_concurrency(files, embedder, mem_vector_store):
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=TransparentStorage(),
+        embedder=embedder,
+        vector_db=mem_vector_store,
+        config=PipelineConfig(parse_concurrency=3, queue_size=2),
+    )
+    await pipeline.run(files)
+
+    assert SlowLineProcessor.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skip_file_error(files, tmp_path, embedder, mem_vector_store):
+    bad_file = tmp_path / f"bad{EXT}"
+    bad_file.write_text("fail")
+    storage = TransparentStorage()
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=storage,
+        embedder=embedder,
+        vector_db=mem_vector_store,
+        skip_file_error=True,
+    )
+    results = await pipeline.run([bad_file, *files])
+
+    assert not results[0].success
+    assert isinstance(results[0].error, ValueError)
+    assert all(r.success for r in results[1:])
+    # The failed file is removed from the storage
+    assert {f.id for f in await storage.get_files()} == {r.file.id for r in results[1:]}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_parse_timeout(tmp_path, embedder, mem_vector_store):
+    register_processor(HANG_EXT, HangLineProcessor, override=True)
+    paths = []
+    for name, content in [("a", "one\ntwo"), ("hung", "hang"), ("b", "three")]:
+        path = tmp_path / f"{name}{HANG_EXT}"
+        path.write_text(content)
+        paths.append(path)
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=TransparentStorage(),
+        embedder=embedder,
+        vector_db=mem_vector_store,
+        skip_file_error=True,
+        config=PipelineConfig(parse_workers=1, parse_timeout=1.0),
+    )
+
+    start = time.monotonic()
+    results = await pipeline.run(paths)
+
+    assert time.monotonic() - start < 30
+    assert [r.success for r in results] == [True, False, True]
+    assert isinstance(results[1].error, TaskTimeoutError)
+    assert [r.n_chunks for r in results] == [2, 0, 1]
+    assert pipeline.metrics.files_failed == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_file_error(files, tmp_path, embedder, mem_vector_store):
+    bad_file = tmp_path / f"bad{EXT}"
+    bad_file.write_text("fail")
+    storage = TransparentStorage()
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=storage,
+        embedder=embedder,
+        vector_db=mem_vector_store,
+    )
+    with pytest.raises(ValueError):
+        await pipeline.run([*files, bad_file])
+
+    # Files left incomplete by the failed run are removed as well
+    embedded = {doc["metadata"]["qfile_id"] for doc in mem_vector_store.store.values()}
+    assert {f.id for f in await storage.get_files()} == embedded
+
+
+@pytest.mark.base
+@pytest.mark.asyncio
+async def test_pipeline_default_vectordb(files, embedder):
+    from langchain_community.vectorstores import FAISS
+
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(), storage=TransparentStorage(), embedder=embedder
+    )
+    results = await pipeline.run(files)
+
+    assert isinstance(pipeline.vector_db, FAISS)
+    assert pipeline.vector_db.index.ntotal == sum(r.n_chunks for r in results)
+    ids = {i for r in results for i in r.chunk_ids}
+    assert ids == set(pipeline.vector_db.index_to_docstore_id.values())
+
+
+@pytest.mark.base
+@pytest.mark.asyncio
+async def test_pipeline_resume_from_checkpoint(files, tmp_path, embedder):
+    bad_file = tmp_path / f"bad{EXT}"
+    bad_file.write_text("fail")
+    checkpoint_dir = tmp_path / "checkpoint"
+    brain_id = uuid4()
+    pipeline = IngestionPipeline(
+        brain_id=brain_id,
+        storage=TransparentStorage(),
+        embedder=embedder,
+        config=PipelineConfig(parse_concurrency=1, embed_concurrency=1),
+        checkpoint=IngestionCheckpoint(checkpoint_dir, flush_every=2),
+    )
+    with pytest.raises(ValueError):
+        await pipeline.run([*files, bad_file])
+
+    checkpoint = IngestionCheckpoint(checkpoint_dir)
+    done = {p.name for p in checkpoint.records}
+    assert checkpoint.brain_id == brain_id
+    assert done
+    assert checkpoint.load_vector_db(embedder).index.ntotal == sum(
+        len(r.chunk_ids) for r in checkpoint.records.values()
+    )
+
+    # Resume after fixing the file: completed files are not parsed again
+    bad_file.write_text("fixed")
+    SlowLineProcessor.processed = []
+    storage = TransparentStorage()
+    pipeline = IngestionPipeline(
+        brain_id=brain_id,
+        storage=storage,
+        embedder=embedder,
+        checkpoint=checkpoint,
+    )
+    results = await pipeline.run([*files, bad_file])
+
+    assert all(r.success for r in results)
+    assert not done & set(SlowLineProcessor.processed)
+    assert storage.nb_files() == len(files) + 1
+    ids = {i for r in results for i in r.chunk_ids}
+    assert ids == set(pipeline.vector_db.index_to_docstore_id.values())
+    assert len(IngestionCheckpoint(checkpoint_dir).records) == len(files) + 1
+
+
+def test_checkpoint_concurrent_flushes(quivr_txt, tmp_path, embedder):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from langchain_community.vectorstores import FAISS
+
+    vector_db = FAISS.from_texts(["a", "b"], embedder)
+    checkpoint = IngestionCheckpoint(tmp_path / "checkpoint")
+    for i in range(8):
+        checkpoint.add(tmp_path / f"{i}.txt", quivr_txt, [str(i)])
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda _: checkpoint.flush(vector_db), range(4)))
+
+    # Each file is committed once, only the last snapshot is kept
+    reloaded = IngestionCheckpoint(tmp_path / "checkpoint")
+    assert len(reloaded.records) == 8
+    snapshots = list((tmp_path / "checkpoint").glob("vector_store_*"))
+    assert snapshots == [reloaded.snapshot_path]
+    assert reloaded.load_vector_db(embedder).index.ntotal == 2
+
+
+def test_checkpoint_failed_flush_keeps_pending(quivr_txt, tmp_path):
+    checkpoint = IngestionCheckpoint(tmp_path / "checkpoint")
+    checkpoint.add(tmp_path / "a.txt", quivr_txt, ["0"])
+    checkpoint._journal_path = tmp_path / "missing" / "journal.jsonl"
+
+    with pytest.raises(FileNotFoundError):
+        checkpoint.flush(None)
+
+    assert [r.path for r in checkpoint._pending] == [tmp_path / "a.txt"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_metrics(files, tmp_path, embedder, mem_vector_store):
+    bad_file = tmp_path / f"bad{EXT}"
+    bad_file.write_text("fail")
+    progress = []
+
+    async def on_progress(metrics):
+        progress.append(metrics.progress)
+
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=TransparentStorage(),
+        embedder=embedder,
+        vector_db=mem_vector_store,
+        skip_file_error=True,
+        progress_callback=on_progress,
+    )
+    results = await pipeline.run([bad_file, *files])
+    metrics = pipeline.metrics
+
+    assert progress == sorted(progress)
+    assert len(progress) == len(files) + 1
+    assert progress[-1] == 1.0
+    assert metrics.files_done == len(files)
+    assert metrics.failures_by_extension == {EXT: 1}
+    assert metrics.chunks_done == sum(r.n_chunks for r in results)
+    assert metrics.bytes_done == sum(f.stat().st_size for f in files)
+    assert metrics.embedding_tokens > 0
+    assert metrics.files_per_second > 0
+    assert set(metrics.stages) == {"load", "upload", "parse", "embed"}
+    assert metrics.stages["parse"].n_items == len(files) + 1
+    assert metrics.parse_latency["SlowLineProcessor"].count == len(files) + 1
+    assert metrics.parse_latency["SlowLineProcessor"].quantile(0.5) >= 0.01
+    assert metrics.to_dict()["files_failed"] == 1
+
+
+@pytest.mark.base
+@pytest.mark.asyncio
+async def test_pipeline_streaming(tmp_path):
+    path = tmp_path / f"large{STREAM_EXT}"
+    path.write_text("\n".join(f"line {i}" for i in range(100)))
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=TransparentStorage(),
+        embedder=EventEmbedder(size=20),
+        config=PipelineConfig(streaming=True, stream_batch_size=10, queue_size=1),
+    )
+    (result,) = await pipeline.run([path])
+
+    assert result.n_chunks == 100
+    assert len(result.chunk_ids) == 100
+    assert pipeline.vector_db.index.ntotal == 100
+    assert pipeline.metrics.files_done == 1
+    # Chunks are embedded while the file is still being read
+    events = StreamLineProcessor.events
+    assert events.count("embed") == 10
+    assert events.index("embed") < len(events) - 1 - events[::-1].index("read")
+    indices = sorted(
+        doc.metadata["chunk_index"]
+        for doc in pipeline.vector_db.docstore._dict.values()
+    )
+    assert indices == list(range(1, 101))
+
+
+@pytest.mark.base
+@pytest.mark.asyncio
+async def test_pipeline_streaming_error(tmp_path, embedder):
+    path = tmp_path / f"bad{STREAM_EXT}"
+    path.write_text("\n".join(f"line {i}" for i in range(30)))
+    other = tmp_path / f"good{STREAM_EXT}"
+    other.write_text("ok")
+
+    class FailingStreamProcessor(StreamLineProcessor):
+        async def stream_file_inner(self, file: QuivrFile):
+            async for doc in super().stream_file_inner(file):
+                if doc.page_content == "line 25":
+                    raise ValueError("truncated file")
+                yield doc
+
+    register_processor(STREAM_EXT, FailingStreamProcessor, override=True)
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=TransparentStorage(),
+        embedder=embedder,
+        skip_file_error=True,
+        config=PipelineConfig(streaming=True, stream_batch_size=10),
+    )
+    bad, good = await pipeline.run([path, other])
+
+    assert isinstance(bad.error, ValueError)
+    assert bad.chunk_ids == []
+    # Chunks embedded before the error are removed
+    assert set(pipeline.vector_db.index_to_docstore_id.values()) == set(good.chunk_ids)
+
+
+@pytest.mark.base
+@pytest.mark.asyncio
+async def test_pipeline_streaming_timeout(tmp_path, embedder):
+    path = tmp_path / f"hung{STREAM_EXT}"
+    path.write_text("line 0\nhang\nline 2")
+    other = tmp_path / f"good{STREAM_EXT}"
+    other.write_text("ok")
+
+    class HangStreamProcessor(StreamLineProcessor):
+        async def stream_file_inner(self, file: QuivrFile):
+            async for doc in super().stream_file_inner(file):
+                if doc.page_content == "hang":
+                    await asyncio.sleep(60)
+                yield doc
+
+    register_processor(STREAM_EXT, HangStreamProcessor, override=True)
+    pipeline = IngestionPipeline(
+        brain_id=uuid4(),
+        storage=TransparentStorage(),
+        embedder=embedder,
+        skip_file_error=True,
+        config=PipelineConfig(streaming=True, stream_batch_size=1, parse_timeout=0.5),
+    )
+
+    start = time.monotonic()
+    hung, good = await pipeline.run([path, other])
+
+    assert time.monotonic() - start < 30
+    assert isinstance(hung.error, TimeoutError)
+    assert good.success
+    assert set(pipeline.vector_db.index_to_docstore_id.values()) == set(good.chunk_ids)
@@ -0,0 +1,200 @@
+from uuid import uuid4
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from quivr_core.brain import Brain
+
+faiss = pytest.importorskip("faiss")
+
+from langchain_community.vectorstores import FAISS  # noqa: E402
+from quivr_core.vectorstore import (  # noqa: E402
+    MetadataIndex,
+    VectorIndexConfig,
+    build_faiss_store,
+    delete_chunks,
+    filtered_similarity_search,
+    load_paged_faiss,
+    save_paged_faiss,
+)
+
+
+@pytest.fixture
+def file_ids():
+    return [uuid4() for _ in range(10)]
+
+
+def make_docs(file_ids, n=500):
+    return [
+        Document(
+            page_content=f"chunk {i}",
+            metadata={
+                "qfile_id": file_ids[i % len(file_ids)],
+                "file_extension": ".pdf" if i % 2 else ".txt",
+                "chunk_index": i,
+                "tags": ["a"],
+            },
+        )
+        for i in range(n)
+    ]
+
+
+def make_store(embedder, docs, config=None):
+    vectors = np.random.default_rng(0).normal(size=(len(docs), 20)).astype("float32")
+    return build_faiss_store(
+        texts=[d.page_content for d in docs],
+        embeddings=vectors.tolist(),
+        metadatas=[d.metadata for d in docs],
+        embedder=embedder,
+        config=config or VectorIndexConfig(),
+    )
+
+
+def exact_top_k(docs, query, k, accept):
+    vectors = np.random.default_rng(0).normal(size=(len(docs), 20)).astype("float32")
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    matching = [i for i, doc in enumerate(docs) if accept(doc.metadata)]
+    return sorted(matching, key=lambda i: distances[i])[:k]
+
+
+def test_metadata_index_select(embedder, file_ids):
+    vector_db = make_store(embedder, make_docs(file_ids))
+    index = MetadataIndex(vector_db)
+
+    selected = index.select({"qfile_id": file_ids[3]})
+    assert selected.tolist() == list(range(3, 500, 10))
+    # Ids match as UUID or str, lists match any of their values
+    assert index.select({"qfile_id": str(file_ids[3])}).tolist() == selected.tolist()
+    assert len(index.select({"qfile_id": file_ids[:2]})) == 100
+    both = index.select({"qfile_id": file_ids[:2], "file_extension": ".pdf"})
+    assert both.tolist() == list(range(1, 500, 10))
+    assert len(index.select({"qfile_id": uuid4()})) == 0
+    assert index.select({"tags": ["a"]}) is None
+
+
+def test_metadata_index_follows_store(embedder, file_ids):
+    vector_db = make_store(embedder, make_docs(file_ids))
+    index = MetadataIndex(vector_db)
+    assert len(index.select({"qfile_id": file_ids[0]})) == 50
+
+    new_file = uuid4()
+    vector_db.add_embeddings(
+        [("new chunk", [0.0] * 20)], metadatas=[{"qfile_id": new_file}]
+    )
+    assert index.select({"qfile_id": new_file}).tolist() == [500]
+
+    ids = list(vector_db.index_to_docstore_id.values())
+    delete_chunks(vector_db, ids[:10])
+    assert index.select({"qfile_id": new_file}).tolist() == [490]
+    assert len(index.select({"qfile_id": file_ids[0]})) == 49
+
+
+def test_metadata_index_concurrent_select(embedder, file_ids):
+    from concurrent.futures import ThreadPoolExecutor
+
+    vector_db = make_store(embedder, make_docs(file_ids))
+    index = MetadataIndex(vector_db)
+    filters = [
+        {"qfile_id": file_ids[i % 10], "file_extension": [".pdf", ".txt"]}
+        for i in range(40)
+    ]
+
+    # Fields are indexed lazily by the first selections, from several threads
+    with ThreadPoolExecutor(8) as pool:
+        selected = list(pool.map(index.select, filters))
+
+    expected = MetadataIndex(vector_db)
+    assert [s.tolist() for s in selected] == [
+        expected.select(f).tolist() for f in filters
+    ]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat", "ivf_pq", "sq8"])
+def test_filtered_search_exact(embedder, file_ids, index_type):
+    config = VectorIndexConfig(index_type=index_type, train_size=500, nprobe=1)
+    docs = make_docs(file_ids)
+    vector_db = make_store(embedder, docs, config)
+    query = np.random.default_rng(1).normal(size=20).astype("float32")
+    filter = {"qfile_id": file_ids[7], "file_extension": ".pdf"}
+
+    results = filtered_similarity_search(
+        vector_db, query.tolist(), 10, filter, MetadataIndex(vector_db)
+    )
+
+    assert len(results) == 10
+    assert all(doc.metadata["qfile_id"] == file_ids[7] for doc, _ in results)
+    if index_type not in ("sq8", "ivf_pq"):
+        expected = exact_top_k(
+            docs,
+            query,
+            10,
+            lambda m: m["qfile_id"] == file_ids[7] and m["file_extension"] == ".pdf",
+        )
+        assert [doc.metadata["chunk_index"] for doc, _ in results] == expected
+    # The post-filter of FAISS only finds the matches among the fetch_k nearest
+    post_filtered = vector_db.similarity_search_with_score_by_vector(
+        query.tolist(), k=10, filter=filter, fetch_k=20
+    )
+    assert len(post_filtered) < 10
+
+
+def test_filtered_search_ivf_delete(embedder, file_ids):
+    config = VectorIndexConfig(index_type="ivf_flat", train_size=500, nprobe=1)
+    docs = make_docs(file_ids)
+    vector_db = make_store(embedder, docs, config)
+    query = np.random.default_rng(1).normal(size=20).astype("float32")
+    filter = {"qfile_id": file_ids[3]}
+    filtered_similarity_search(
+        vector_db, query.tolist(), 5, filter, MetadataIndex(vector_db)
+    )
+
+    # The direct map follows the compacted positions
+    ids = list(vector_db.index_to_docstore_id.values())
+    delete_chunks(vector_db, ids[:100])
+    results = filtered_similarity_search(
+        vector_db, query.tolist(), 5, filter, MetadataIndex(vector_db)
+    )
+
+    expected = exact_top_k(
+        docs,
+        query,
+        5,
+        lambda m: m["qfile_id"] == file_ids[3] and m["chunk_index"] >= 100,
+    )
+    assert [doc.metadata["chunk_index"] for doc, _ in results] == expected
+
+
+def test_filtered_search_paged_store(embedder, file_ids, tmp_path):
+    vector_db = make_store(embedder, make_docs(file_ids))
+    save_paged_faiss(vector_db, tmp_path)
+    loaded = load_paged_faiss(tmp_path, embedder)
+    query = [0.1] * 20
+
+    expected = filtered_similarity_search(
+        vector_db, query, 5, {"qfile_id": file_ids[2]}, MetadataIndex(vector_db)
+    )
+    results = filtered_similarity_search(
+        loaded, query, 5, {"qfile_id": file_ids[2]}, MetadataIndex(loaded)
+    )
+
+    assert [d for d, _ in results] == [d for d, _ in expected]
+    # Fields are read from the chunk columns, chunks are only materialized for hits
+    assert len(loaded.docstore._cache) == 5
+
+
+@pytest.mark.asyncio
+async def test_brain_asearch_filter(embedder, fake_llm, file_ids):
+    docs = make_docs(file_ids, n=200)
+    brain = Brain(
+        name="filtered",
+        llm=fake_llm,
+        embedder=embedder,
+        vector_db=FAISS.from_documents(docs, embedder),
+    )
+
+    results = await brain.asearch(
+        "chunk 1", n_results=8, filter={"qfile_id": file_ids[4]}, fetch_n_neighbors=8
+    )
+
+    assert len(results) == 8
+    assert {r.chunk.metadata["qfile_id"] for r in results} == {file_ids[4]}
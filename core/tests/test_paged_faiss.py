@@ -0,0 +1,186 @@
+import json
+import pickle
+from uuid import uuid4
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from quivr_core.brain import Brain
+
+faiss = pytest.importorskip("faiss")
+
+from langchain_community.docstore.in_memory import InMemoryDocstore  # noqa: E402
+from langchain_community.vectorstores import FAISS  # noqa: E402
+from quivr_core.vectorstore import (  # noqa: E402
+    PagedDocstore,
+    is_paged_faiss,
+    load_paged_faiss,
+    save_paged_faiss,
+)
+from quivr_core.vectorstore import faiss_store as faiss_store_module  # noqa: E402
+from quivr_core.vectorstore.docstore import write_paged_docstore  # noqa: E402
+
+
+@pytest.fixture
+def file_ids():
+    return [uuid4(), uuid4()]
+
+
+@pytest.fixture
+def faiss_store(embedder, file_ids):
+    docs = [
+        Document(
+            page_content=f"chunk {i}",
+            metadata={"qfile_id": file_ids[i % 2], "chunk_index": i},
+        )
+        for i in range(20)
+    ]
+    return FAISS.from_documents(docs, embedder)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_paged_faiss_roundtrip(faiss_store, embedder, tmp_path, mmap):
+    save_paged_faiss(faiss_store, tmp_path)
+    assert is_paged_faiss(tmp_path)
+
+    loaded = load_paged_faiss(tmp_path, embedder, mmap=mmap)
+
+    assert isinstance(loaded.docstore, PagedDocstore)
+    assert loaded.index.ntotal == faiss_store.index.ntotal
+    assert loaded.index_to_docstore_id == faiss_store.index_to_docstore_id
+    expected = faiss_store.similarity_search_with_score("chunk 3", k=4)
+    assert loaded.similarity_search_with_score("chunk 3", k=4) == expected
+
+
+def test_paged_docstore_lazy(faiss_store, embedder, tmp_path):
+    save_paged_faiss(faiss_store, tmp_path)
+    docstore = load_paged_faiss(tmp_path, embedder).docstore
+    assert isinstance(docstore, PagedDocstore)
+    docstore.cache_size = 2
+
+    assert len(docstore._cache) == 0
+    for doc_id in docstore.ids[:5]:
+        assert isinstance(docstore.search(doc_id), Document)
+    assert len(docstore._cache) == 2
+    assert docstore.search("unknown") == "ID unknown not found."
+
+
+def test_paged_faiss_update_and_save(faiss_store, embedder, tmp_path, file_ids):
+    save_paged_faiss(faiss_store, tmp_path)
+    loaded = load_paged_faiss(tmp_path, embedder, mmap=False)
+
+    chunk_ids = loaded.docstore.file_chunk_ids()
+    assert {k: len(v) for k, v in chunk_ids.items()} == {
+        file_ids[0]: 10,
+        file_ids[1]: 10,
+    }
+    loaded.delete(chunk_ids[file_ids[0]])
+    new_ids = loaded.add_texts(["new chunk"], metadatas=[{"qfile_id": file_ids[0]}])
+    assert len(loaded.docstore) == 11
+
+    # Saved over the files it was loaded from
+    save_paged_faiss(loaded, tmp_path)
+    reloaded = load_paged_faiss(tmp_path, embedder)
+
+    assert reloaded.index.ntotal == 11
+    assert reloaded.docstore.file_chunk_ids()[file_ids[0]] == new_ids
+    assert reloaded.docstore.search(new_ids[0]).page_content == "new chunk"
+    # The files of the previous save are removed
+    assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 1
+
+
+def test_paged_faiss_save_atomic(faiss_store, embedder, tmp_path, monkeypatch):
+    save_paged_faiss(faiss_store, tmp_path)
+    faiss_store.add_texts(["new chunk"])
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(faiss_store_module, "write_paged_docstore", fail)
+    with pytest.raises(OSError, match="disk full"):
+        save_paged_faiss(faiss_store, tmp_path)
+
+    # The previous save is intact, the partial one is removed
+    loaded = load_paged_faiss(tmp_path, embedder)
+    assert loaded.index.ntotal == 20
+    assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 1
+
+
+def test_paged_docstore_pickle(faiss_store, embedder, tmp_path):
+    save_paged_faiss(faiss_store, tmp_path)
+    docstore = load_paged_faiss(tmp_path, embedder).docstore
+
+    copy = pickle.loads(pickle.dumps(docstore))
+
+    assert isinstance(copy, InMemoryDocstore)
+    assert copy._dict == dict(docstore.items())
+
+
+@pytest.mark.asyncio
+async def test_brain_paged_file_chunks(
+    faiss_store, embedder, fake_llm, tmp_path, file_ids
+):
+    save_paged_faiss(faiss_store, tmp_path)
+    brain = Brain(
+        name="paged",
+        llm=fake_llm,
+        embedder=embedder,
+        vector_db=load_paged_faiss(tmp_path, embedder, mmap=False),
+    )
+
+    await brain.aremove_file(file_ids[1])
+
+    assert brain.vector_db.index.ntotal == 10
+    assert all(
+        brain.vector_db.docstore.search(i).metadata["qfile_id"] == file_ids[0]
+        for i in brain.vector_db.index_to_docstore_id.values()
+    )
+
+
+def test_paged_docstore_columnar_metadata(tmp_path):
+    file_metadata = {
+        "qfile_id": uuid4(),
+        "original_file_name": "file.txt",
+        "splitter": {"chunk_size": 400, "chunk_overlap": 100},
+    }
+    docs = [
+        Document(
+            page_content=f"chunk {i} é",
+            metadata={**file_metadata, "chunk_index": i, "chunk_size": 10 + i},
+        )
+        for i in range(10)
+    ]
+    docs[3].metadata["page"] = "iv"
+    del docs[5].metadata["original_file_name"]
+    docs.append(Document(page_content="no metadata"))
+    write_paged_docstore(tmp_path, ((str(i), d) for i, d in enumerate(docs)))
+
+    docstore = PagedDocstore(tmp_path)
+
+    assert [doc for _, doc in docstore.items()] == docs
+    # File level metadata is stored once, not per chunk
+    with open(tmp_path / "chunks_metadata.pkl", "rb") as f:
+        stored = pickle.load(f)
+    assert len(stored["files"]) == 2
+    assert set(stored["columns"]) == {"chunk_index", "chunk_size", "page"}
+    # Materialized chunks don't share mutable values
+    docstore.search("0").metadata["splitter"]["chunk_size"] = 0
+    assert docstore.search("1").metadata["splitter"]["chunk_size"] == 400
+
+
+def test_paged_docstore_reads_v1(tmp_path):
+    records = [pickle.dumps((f"chunk {i}", {"chunk_index": i})) for i in range(3)]
+    (tmp_path / "chunks.bin").write_bytes(b"".join(records))
+    np.save(
+        tmp_path / "chunks_offsets.npy",
+        np.cumsum([0] + [len(r) for r in records]).astype(np.int64),
+    )
+    (tmp_path / "chunks_ids.json").write_text(
+        json.dumps({"ids": ["a", "b", "c"], "qfile_ids": [None] * 3})
+    )
+
+    docstore = PagedDocstore(tmp_path)
+
+    assert docstore.search("b") == Document(
+        page_content="chunk 1", metadata={"chunk_index": 1}
+    )
@@ -1,7 +1,10 @@
+import hashlib
+import os
 from pathlib import Path
 from uuid import uuid4
 
-from quivr_core.files.file import FileExtension, QuivrFile
+import pytest
+from quivr_core.files.file import FileExtension, QuivrFile, hash_file, load_qfile
 
 
 def test_create_file():
@@ -36,3 +39,27 @@ def test_create_file_add_metadata():
     )
 
     assert qfile.metadata["other_id"] == "id"
+
+
+def test_hash_file_blocks(tmp_path):
+    data = os.urandom(3 * 1024 + 17)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    digests = hash_file(path, algorithms=("sha1", "blake2b"), block_size=1024)
+
+    assert digests == {
+        "sha1": hashlib.sha1(data).hexdigest(),
+        "blake2b": hashlib.blake2b(data).hexdigest(),
+    }
+
+
+@pytest.mark.asyncio
+async def test_load_qfile_hashes(temp_data_file):
+    data = temp_data_file.read_bytes()
+
+    qfile = await load_qfile(uuid4(), temp_data_file, extra_hashes=("blake2b",))
+
+    assert qfile.file_sha1 == hashlib.sha1(data).hexdigest()
+    assert qfile.file_size == len(data)
+    assert qfile.metadata["file_blake2b"] == hashlib.blake2b(data).hexdigest()
@@ -0,0 +1,226 @@
+import time
+from uuid import uuid4
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from quivr_core.brain import Brain
+
+faiss = pytest.importorskip("faiss")
+
+from quivr_core.brain.brain_defaults import build_default_vectordb  # noqa: E402
+from quivr_core.brain.serialization import FAISSConfig  # noqa: E402
+from quivr_core.storage.local_storage import TransparentStorage  # noqa: E402
+from quivr_core.vectorstore.index import (  # noqa: E402
+    VectorIndexConfig,
+    VectorIndexType,
+    build_faiss_store,
+    create_index,
+    delete_chunks,
+    set_search_params,
+    train_index,
+    with_search_params,
+)
+
+
+def clustered_vectors(n: int, dim: int, n_clusters: int = 32, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype("float32")
+    labels = rng.integers(n_clusters, size=n)
+    return centers[labels] + 0.3 * rng.normal(size=(n, dim)).astype("float32")
+
+
+def build_store(embedder, vectors, config):
+    return build_faiss_store(
+        texts=[f"chunk {i}" for i in range(len(vectors))],
+        embeddings=vectors.tolist(),
+        metadatas=[{"chunk_index": i} for i in range(len(vectors))],
+        embedder=embedder,
+        config=config,
+    )
+
+
+@pytest.mark.parametrize("index_type", list(VectorIndexType))
+def test_build_faiss_store_index_type(embedder, index_type):
+    vectors = clustered_vectors(600, 16)
+    config = VectorIndexConfig(index_type=index_type, train_size=500)
+
+    vector_db = build_store(embedder, vectors, config)
+
+    expected = {
+        VectorIndexType.FLAT: faiss.IndexFlat,
+        VectorIndexType.HNSW: faiss.IndexHNSWFlat,
+        VectorIndexType.IVF_FLAT: faiss.IndexIVFFlat,
+        VectorIndexType.IVF_PQ: faiss.IndexIVFPQ,
+        VectorIndexType.SQ8: faiss.IndexScalarQuantizer,
+    }[index_type]
+    assert isinstance(faiss.downcast_index(vector_db.index), expected)
+    assert vector_db.index.ntotal == 600
+    # Vectors keep their position: chunk i is found by its own vector
+    _, labels = vector_db.index.search(vectors[:20], 1)
+    if index_type != VectorIndexType.IVF_PQ:
+        assert labels.ravel().tolist() == list(range(20))
+
+
+def test_train_on_ingest(embedder):
+    vectors = clustered_vectors(300, 16)
+    config = VectorIndexConfig(index_type=VectorIndexType.IVF_FLAT, train_size=200)
+    vector_db = build_store(embedder, vectors[:100], config)
+    assert isinstance(faiss.downcast_index(vector_db.index), faiss.IndexFlat)
+
+    vector_db.add_embeddings(
+        zip([f"chunk {i}" for i in range(100, 300)], vectors[100:].tolist())
+    )
+    assert train_index(vector_db, config)
+
+    index = faiss.downcast_index(vector_db.index)
+    assert isinstance(index, faiss.IndexIVFFlat)
+    assert index.ntotal == 300
+    assert index.nprobe == min(config.nprobe, index.nlist)
+    assert not train_index(vector_db, config)
+
+
+def test_set_search_params():
+    config = VectorIndexConfig(
+        index_type=VectorIndexType.HNSW, ef_search=128, nprobe=4, nlist=8
+    )
+    hnsw = create_index(16, config)
+    assert hnsw.hnsw.efSearch == 128
+
+    ivf = create_index(16, config.model_copy(update={"index_type": "ivf_flat"}))
+    assert ivf.nprobe == 4
+    set_search_params(ivf, VectorIndexConfig(nprobe=100))
+    assert ivf.nprobe == 8
+
+
+def test_with_search_params(embedder):
+    vectors = clustered_vectors(400, 16)
+    config = VectorIndexConfig(
+        index_type=VectorIndexType.IVF_FLAT, train_size=400, nlist=16, nprobe=1
+    )
+    vector_db = build_store(embedder, vectors, config)
+
+    view = with_search_params(vector_db, VectorIndexConfig(nprobe=16))
+
+    # Exhaustive on the view, the shared index keeps its nprobe
+    assert faiss.downcast_index(vector_db.index).nprobe == 1
+    exact = faiss.IndexFlat(16)
+    exact.add(vectors)
+    _, expected = exact.search(vectors[:50] + 0.5, 5)
+    _, labels = view.index.search(vectors[:50] + 0.5, 5)
+    assert (labels == expected).all()
+    assert view.index.ntotal == 400 and view.docstore is vector_db.docstore
+    assert with_search_params(vector_db, config).index is not vector_db.index
+    flat_db = build_store(embedder, vectors[:10], VectorIndexConfig())
+    assert with_search_params(flat_db, config) is flat_db
+
+
+@pytest.mark.parametrize(
+    "index_type", [VectorIndexType.HNSW, VectorIndexType.IVF_FLAT, VectorIndexType.SQ8]
+)
+def test_delete_chunks(embedder, index_type):
+    vectors = clustered_vectors(400, 16)
+    config = VectorIndexConfig(index_type=index_type, train_size=400)
+    vector_db = build_store(embedder, vectors, config)
+    ids = list(vector_db.index_to_docstore_id.values())
+
+    delete_chunks(vector_db, ids[:10] + ids[200:250])
+
+    assert vector_db.index.ntotal == 340
+    assert list(vector_db.index_to_docstore_id.values()) == ids[10:200] + ids[250:]
+    # Positions are compacted: the remaining chunks are still found by their vector
+    kept = np.r_[10:200, 250:400]
+    _, labels = vector_db.index.search(vectors[kept[::17]], 1)
+    found = [vector_db.index_to_docstore_id[i] for i in labels.ravel()]
+    assert found == [ids[i] for i in kept[::17]]
+
+    # Only the tail moves, the mapping stays contiguous
+    before = vector_db.index_to_docstore_id
+    delete_chunks(vector_db, ids[390:] + ids[300:310])
+    assert list(vector_db.index_to_docstore_id) == list(range(320))
+    assert list(vector_db.index_to_docstore_id.values()) == (
+        ids[10:200] + ids[250:300] + ids[310:390]
+    )
+    # Replaced, not mutated: views of the store keep a consistent mapping
+    assert len(before) == 340
+    with pytest.raises(ValueError):
+        delete_chunks(vector_db, [ids[0]])
+    assert vector_db.index.ntotal == 320
+
+
+def test_faiss_config_roundtrip():
+    config = FAISSConfig(
+        vectordb_folder_path="vector_store",
+        storage_format="paged",
+        index_config=VectorIndexConfig(
+            index_type=VectorIndexType.IVF_PQ, nprobe=32, pq_m=8
+        ),
+    )
+    assert FAISSConfig.model_validate_json(config.model_dump_json()) == config
+    # Configs saved before index types default to flat
+    legacy = FAISSConfig.model_validate({"vectordb_folder_path": "vector_store"})
+    assert legacy.index_config.index_type == VectorIndexType.FLAT
+
+
+@pytest.mark.asyncio
+async def test_brain_save_load_index_config(embedder, fake_llm, tmp_path, monkeypatch):
+    from langchain_openai import OpenAIEmbeddings
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    docs = [Document(page_content=f"chunk {i}") for i in range(50)]
+    config = VectorIndexConfig(index_type=VectorIndexType.HNSW, ef_search=100)
+    vector_db = await build_default_vectordb(docs, embedder, index_config=config)
+    brain = Brain(
+        id=uuid4(),
+        name="hnsw",
+        llm=fake_llm,
+        # Only OpenAI embedders are serialized, queries are not embedded here
+        embedder=OpenAIEmbeddings(),
+        vector_db=vector_db,
+        storage=TransparentStorage(),
+        vector_index_config=config,
+    )
+
+    path = await brain.save(tmp_path)
+    brain_loaded = Brain.load(path)
+
+    assert brain_loaded.vector_index_config == config
+    index = faiss.downcast_index(brain_loaded.vector_db.index)
+    assert isinstance(index, faiss.IndexHNSWFlat)
+    assert index.hnsw.efSearch == 100
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        VectorIndexConfig(index_type="flat"),
+        VectorIndexConfig(index_type="hnsw", ef_search=64),
+        VectorIndexConfig(index_type="ivf_flat", nlist=64, nprobe=8),
+        VectorIndexConfig(index_type="ivf_pq", nlist=64, nprobe=8, pq_m=16),
+        VectorIndexConfig(index_type="sq8"),
+    ],
+    ids=lambda c: c.index_type.value,
+)
+def test_index_recall_latency(benchmark, config):
+    """Recall@10 against an exact search and search latency, per index type."""
+    dim, k = 64, 10
+    vectors = clustered_vectors(20_200, dim, n_clusters=64)
+    vectors, queries = vectors[:20_000], vectors[20_000:]
+
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    index = create_index(dim, config, n_train=len(vectors))
+    start = time.perf_counter()
+    index.train(vectors)
+    index.add(vectors)
+    build_time = time.perf_counter() - start
+
+    _, labels = benchmark(index.search, queries, k)
+
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(labels, truth)])
+    benchmark.extra_info.update(
+        recall=round(float(recall), 3), build_seconds=round(build_time, 2)
+    )
+    assert recall >= {"ivf_pq": 0.4}.get(config.index_type.value, 0.8)